@@ -1,8 +1,14 @@
 import json
+import os
+import queue
+import threading
+import time
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from collections import defaultdict
 
+from backend.file_lock import locked
+
 # ---------------------------------------------------------------
 # Paths
 # ---------------------------------------------------------------
@@ -12,48 +18,208 @@ DATA_DIR.mkdir(exist_ok=True)
 
 FEEDBACK_FILE = DATA_DIR / "feedback.jsonl"
 
+# Rotated segments + running totals of everything rotated out
+FEEDBACK_ARCHIVE_DIR = DATA_DIR / "feedback_archive"
+FEEDBACK_SUMMARY_FILE = DATA_DIR / "feedback_summary.json"
+
+# Group commit + rotation limits (override via environment)
+FEEDBACK_BATCH_MAX = int(os.getenv("FEEDBACK_BATCH_MAX", 512))
+FEEDBACK_BATCH_WAIT_MS = float(os.getenv("FEEDBACK_BATCH_WAIT_MS", 5))
+FEEDBACK_SEGMENT_MB = float(os.getenv("FEEDBACK_SEGMENT_MB", 16))
+
 # Ensure file exists
 if not FEEDBACK_FILE.exists():
     FEEDBACK_FILE.write_text("", encoding="utf-8")
 
+
 # ---------------------------------------------------------------
-# Save Feedback
+# Group-Commit Feedback Writer
 # ---------------------------------------------------------------
-def save_feedback(hypothesis: str, accepted: bool) -> bool:
+class FeedbackWriter:
+    """
+    Serializes feedback appends through one background thread.
+
+    Entries queued within FEEDBACK_BATCH_WAIT_MS of each other (up to
+    FEEDBACK_BATCH_MAX) are written as one append under an exclusive file
+    lock, followed by a single fsync, so concurrent sessions and
+    processes never interleave partial lines. When the active segment
+    passes FEEDBACK_SEGMENT_MB it is rotated into FEEDBACK_ARCHIVE_DIR and
+    its counts are compacted into FEEDBACK_SUMMARY_FILE.
+    """
+
+    def __init__(self, path: Path = FEEDBACK_FILE,
+                 archive_dir: Path = FEEDBACK_ARCHIVE_DIR,
+                 summary_path: Path = FEEDBACK_SUMMARY_FILE,
+                 batch_max: int = FEEDBACK_BATCH_MAX,
+                 batch_wait: float = FEEDBACK_BATCH_WAIT_MS / 1000,
+                 segment_bytes: int = int(FEEDBACK_SEGMENT_MB * 1024 * 1024)):
+        self.path = Path(path)
+        self.archive_dir = Path(archive_dir)
+        self.summary_path = Path(summary_path)
+        self.batch_max = batch_max
+        self.batch_wait = batch_wait
+        self.segment_bytes = segment_bytes
+
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="feedback-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, entry: Dict[str, Any], timeout: Optional[float] = 10.0) -> bool:
+        """
+        Queues one entry and waits until its batch is durable.
+        Returns False on write error or timeout.
+        """
+        done = threading.Event()
+        result = {"ok": False}
+        self._queue.put((json.dumps(entry, ensure_ascii=False) + "\n", done, result))
+        return done.wait(timeout) and result["ok"]
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.batch_wait
+            while len(batch) < self.batch_max:
+                remaining = deadline - time.monotonic()
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, remaining)) if remaining > 0
+                                 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            ok = True
+            try:
+                self._commit("".join(line for line, _, _ in batch).encode("utf-8"))
+            except Exception as e:
+                print(f"[feedback error] {e}")
+                ok = False
+
+            for _, done, result in batch:
+                result["ok"] = ok
+                done.set()
+
+    def _commit(self, payload: bytes):
+        with locked(self.path):
+            with self.path.open("ab") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+
+            if size >= self.segment_bytes:
+                self._rotate()
+
+    def _rotate(self):
+        """
+        Folds the active segment's counts into the summary, then moves it
+        to the archive and starts an empty segment. Caller holds the lock.
+        """
+        summary = read_feedback_summary(self.summary_path)
+        generation = summary["generation"] + 1
+
+        with self.path.open("rb") as f:
+            for line in f:
+                hyp, accepted = _parse_feedback_line(line)
+                if hyp is None:
+                    continue
+                summary["totals"][hyp] = summary["totals"].get(hyp, 0) + 1
+                if accepted:
+                    summary["accepts"][hyp] = summary["accepts"].get(hyp, 0) + 1
+        summary["generation"] = generation
+
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.summary_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(summary, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.summary_path)
+
+        os.replace(self.path, self.archive_dir / f"feedback-{generation:06d}.jsonl")
+        self.path.write_text("", encoding="utf-8")
+
+
+def read_feedback_summary(path: Path = FEEDBACK_SUMMARY_FILE) -> Dict[str, Any]:
+    """
+    Compacted counts of all rotated segments (empty if nothing rotated yet).
     """
-    Append feedback as a JSONL entry.
+    try:
+        summary = json.loads(Path(path).read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        summary = {}
+    return {
+        "generation": summary.get("generation", 0),
+        "accepts": summary.get("accepts", {}),
+        "totals": summary.get("totals", {}),
+    }
+
+
+def _parse_feedback_line(line: bytes):
+    """
+    Returns (hypothesis, accepted) for one JSONL line, or (None, None).
     """
+    line = line.strip()
+    if not line:
+        return None, None
     try:
-        entry = {"hypothesis": hypothesis, "accepted": bool(accepted)}
+        fb = json.loads(line)
+        return fb["hypothesis"], bool(fb.get("accepted"))
+    except (json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError):
+        return None, None
 
-        with FEEDBACK_FILE.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
-            f.flush()   # IMPORTANT: prevents missing writes
 
-        return True
+_FEEDBACK_WRITER = None
+_FEEDBACK_WRITER_LOCK = threading.Lock()
 
-    except Exception as e:
-        print(f"[feedback error] {e}")
-        return False
+
+def get_feedback_writer() -> FeedbackWriter:
+    global _FEEDBACK_WRITER
+    if _FEEDBACK_WRITER is None:
+        with _FEEDBACK_WRITER_LOCK:
+            if _FEEDBACK_WRITER is None:
+                _FEEDBACK_WRITER = FeedbackWriter()
+    return _FEEDBACK_WRITER
+
+
+# ---------------------------------------------------------------
+# Save Feedback
+# ---------------------------------------------------------------
+def save_feedback(hypothesis: str, accepted: bool,
+                  user_id: Optional[str] = None, session_id: Optional[str] = None) -> bool:
+    """
+    Append feedback as a JSONL entry (timestamped, with optional
+    user / session IDs). Returns once the entry is fsynced.
+    """
+    entry = {
+        "hypothesis": hypothesis,
+        "accepted": bool(accepted),
+        "ts": time.time(),
+        "user_id": user_id,
+        "session_id": session_id,
+    }
+    return get_feedback_writer().submit(entry)
 
 
 # ---------------------------------------------------------------
 # Load Feedback
 # ---------------------------------------------------------------
 def load_feedback() -> List[Dict[str, Any]]:
-    if not FEEDBACK_FILE.exists():
-        return []
+    """
+    All feedback entries: archived segments (oldest first), then the
+    active segment.
+    """
+    segments = sorted(FEEDBACK_ARCHIVE_DIR.glob("feedback-*.jsonl")) if FEEDBACK_ARCHIVE_DIR.exists() else []
+    segments.append(FEEDBACK_FILE)
 
     entries = []
-    with FEEDBACK_FILE.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                entries.append(json.loads(line))
-            except json.JSONDecodeError:
-                continue
+    for segment in segments:
+        if not segment.exists():
+            continue
+        with segment.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
 
     return entries
 
@@ -81,6 +247,112 @@ def compute_acceptance_score(feedback_entries: List[Dict[str, Any]]) -> Dict[str
     return scores
 
 
+# ---------------------------------------------------------------
+# Incremental Feedback Store
+# ---------------------------------------------------------------
+class FeedbackStore:
+    """
+    Per-hypothesis accept / total counters kept in memory and updated
+    incrementally from feedback.jsonl.
+
+    refresh() only parses bytes appended since the last call (complete
+    lines only), so a rerank costs O(new feedback + hypotheses) instead
+    of re-reading the whole file. If the file shrinks or is replaced
+    (e.g. rotated by FeedbackWriter), counters are rebuilt from the
+    compacted summary plus the new active segment.
+    """
+
+    def __init__(self, path: Path = FEEDBACK_FILE, summary_path: Path = FEEDBACK_SUMMARY_FILE):
+        self.path = Path(path)
+        self.summary_path = Path(summary_path)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self, file_id=None, summary=None):
+        summary = summary or {"accepts": {}, "totals": {}}
+        self.accepts = defaultdict(int, summary["accepts"])
+        self.totals = defaultdict(int, summary["totals"])
+        self.offset = 0
+        self.file_id = file_id
+
+    def _rebuild(self):
+        """
+        Reads summary + active segment identity under the writer's lock,
+        so a concurrent rotation cannot be counted twice or missed.
+        """
+        with locked(self.path):
+            summary = read_feedback_summary(self.summary_path)
+            try:
+                st = os.stat(self.path)
+                file_id = (st.st_dev, st.st_ino)
+            except FileNotFoundError:
+                file_id = None
+        self._reset(file_id, summary)
+
+    def refresh(self):
+        with self._lock:
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                self._reset()
+                return
+
+            file_id = (st.st_dev, st.st_ino)
+            if file_id != self.file_id or st.st_size < self.offset:
+                self._rebuild()
+                if self.file_id != file_id:
+                    # Rotated again meanwhile; pick it up on the next call
+                    return
+            if st.st_size == self.offset:
+                return
+
+            with self.path.open("rb") as f:
+                opened = os.fstat(f.fileno())
+                if (opened.st_dev, opened.st_ino) != self.file_id:
+                    return
+                f.seek(self.offset)
+                chunk = f.read(st.st_size - self.offset)
+
+            # A partially written last line is picked up next time
+            end = chunk.rfind(b"\n") + 1
+            for line in chunk[:end].splitlines():
+                self._count(line)
+            self.offset += end
+
+    def _count(self, line: bytes):
+        hyp, accepted = _parse_feedback_line(line)
+        if hyp is None:
+            return
+        self.totals[hyp] += 1
+        if accepted:
+            self.accepts[hyp] += 1
+
+    def score(self, hypothesis: str, default: float = 0.5) -> float:
+        total = self.totals.get(hypothesis, 0)
+        if not total:
+            return default
+        return self.accepts.get(hypothesis, 0) / total
+
+    def scores(self) -> Dict[str, float]:
+        return {hyp: self.accepts.get(hyp, 0) / n for hyp, n in self.totals.items()}
+
+
+_FEEDBACK_STORE = None
+_FEEDBACK_STORE_LOCK = threading.Lock()
+
+
+def get_feedback_store() -> FeedbackStore:
+    """
+    Process-wide store, so hot counters survive between reranks.
+    """
+    global _FEEDBACK_STORE
+    if _FEEDBACK_STORE is None:
+        with _FEEDBACK_STORE_LOCK:
+            if _FEEDBACK_STORE is None:
+                _FEEDBACK_STORE = FeedbackStore()
+    return _FEEDBACK_STORE
+
+
 # ---------------------------------------------------------------
 # Re-Rank Hypotheses
 # ---------------------------------------------------------------
@@ -88,11 +360,11 @@ def rerank_hypotheses(hypotheses: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """
     Boost hypotheses with positive feedback.
     """
-    feedback = load_feedback()
-    scores = compute_acceptance_score(feedback)
+    store = get_feedback_store()
+    store.refresh()
 
     for h in hypotheses:
         text = h.get("text")
-        h["feedback_score"] = scores.get(text, 0.5)
+        h["feedback_score"] = store.score(text)
 
     return sorted(hypotheses, key=lambda x: x["feedback_score"], reverse=True)
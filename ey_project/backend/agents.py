@@ -1,12 +1,17 @@
 import os
-import json
-import requests
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
+from backend.context_packer import pack_context
+from backend.json_utils import JSONArrayStreamParser, repair_json
+from backend.llm_cache import get_llm_cache, make_key
+from backend.llm_client import LLMError, get_llm_client
 from backend.retriever import retrieve
 from backend.prompts import (
     LIT_AGENT_PROMPT,
     SCORER_PROMPT,
+    BATCH_SCORER_PROMPT,
     EXPERIMENT_PROMPT
 )
 
@@ -17,53 +22,91 @@ load_dotenv()
 # ---------------------------------------------------------------
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
 
+# Max simultaneous LLM calls issued by run_hypothesis_tasks
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))
+
+# ---------------------------------------------------------------
+# CACHE ACCESS (a broken cache never fails an LLM call)
+# ---------------------------------------------------------------
+def _cache_get(cache, key: str):
+    if cache is None:
+        return None
+    try:
+        return cache.get(key)
+    except sqlite3.Error as e:
+        print(f"[llm cache read failed, calling the model] {e}")
+        return None
+
+
+def _cache_put(cache, key: str, text: str):
+    if cache is None or not text:
+        return
+    try:
+        cache.put(key, OLLAMA_MODEL, text)
+    except sqlite3.Error as e:
+        print(f"[llm cache write failed] {e}")
+
 # ---------------------------------------------------------------
 # LOW‑LEVEL LLM CALLER (Ollama only)
 # ---------------------------------------------------------------
-def llm(prompt: str) -> str:
+def llm(prompt: str, options: dict = None, use_cache: bool = True, format=None) -> str:
     """
-    Calls a local Ollama model running at:
-        http://localhost:11434/api/generate
+    Calls the local Ollama model (OLLAMA_HOST, default
+    http://localhost:11434) through the shared pooled client.
+
+    Responses are served from the persistent LLM cache when the same
+    (model, prompt, options, format) was generated before. `format` is
+    passed to Ollama as-is ("json" or a JSON schema) to constrain output.
 
     Returns raw string text.
+    Raises LLMError subclasses (timeout, overload, circuit open, ...).
     """
-    try:
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": OLLAMA_MODEL,
-                "prompt": prompt,
-                "stream": False,
-            },
-            timeout=120,
-        )
-        response.raise_for_status()
+    cache = get_llm_cache() if use_cache else None
+    key = make_key(OLLAMA_MODEL, prompt, options, format)
+
+    cached = _cache_get(cache, key)
+    if cached is not None:
+        return cached
 
-        data = response.json()
-        return data.get("response", "").strip()
+    text = get_llm_client().generate(prompt, OLLAMA_MODEL, options, format).strip()
 
-    except Exception as e:
-        return f"OLLAMA_ERROR: {e}"
+    _cache_put(cache, key, text)
+    return text
 
 # ---------------------------------------------------------------
-# LITERATURE → HYPOTHESES AGENT
+# STREAMING LLM CALLER (Ollama NDJSON token stream)
 # ---------------------------------------------------------------
-def literature_agent(query: str):
+def llm_stream(prompt: str, options: dict = None, use_cache: bool = True):
     """
-    Retrieves documents + asks the LLM to produce:
-        - hypotheses
-        - evidence mapping
-        - JSON output ONLY
+    Same as llm(), but yields partial text as Ollama generates it.
 
-    Returns: (parsed_dict, docs_list)
+    A cache hit yields the whole response at once. The complete
+    response is written to the cache when the stream finishes.
     """
+    cache = get_llm_cache() if use_cache else None
+    key = make_key(OLLAMA_MODEL, prompt, options)
 
-    docs = retrieve(query, k=5)
+    cached = _cache_get(cache, key)
+    if cached is not None:
+        yield cached
+        return
 
-    doc_text = "\n\n".join(
-        f"ID:{d['id']}\n{d['text']}"
-        for d in docs
-    )
+    parts = []
+    for token in get_llm_client().stream(prompt, OLLAMA_MODEL, options):
+        parts.append(token)
+        yield token
+
+    _cache_put(cache, key, "".join(parts).strip())
+
+# ---------------------------------------------------------------
+# LITERATURE → HYPOTHESES AGENT
+# ---------------------------------------------------------------
+def _literature_prompt(query: str, docs):
+    """
+    Builds the literature prompt with docs packed into the context budget.
+    Returns (prompt, context_report).
+    """
+    doc_text, report = pack_context(query, docs)
 
     prompt = (
         LIT_AGENT_PROMPT
@@ -71,19 +114,84 @@ def literature_agent(query: str):
         + "Return ONLY VALID JSON. No extra words.\n\n"
         + f"QUERY: {query}\n\nDOCUMENTS:\n{doc_text}"
     )
+    return prompt, report
+
+
+def _llm_error(e: LLMError) -> dict:
+    return {"error": "LLM_UNAVAILABLE", "error_type": type(e).__name__, "detail": str(e)}
 
-    raw = llm(prompt)
 
+def _parse_literature_output(raw: str):
     try:
-        parsed = json.loads(raw)
-    except Exception:
-        parsed = {
+        parsed = repair_json(raw)
+    except ValueError:
+        parsed = None
+
+    # Some models drop the wrapper object and return the bare list
+    if isinstance(parsed, list):
+        parsed = {"hypotheses": parsed}
+
+    if not isinstance(parsed, dict):
+        return {
             "error": "JSON_PARSE_FAILED",
             "raw_response": raw
         }
+    return parsed
+
+
+def literature_agent(query: str):
+    """
+    Retrieves documents + asks the LLM to produce:
+        - hypotheses
+        - evidence mapping
+        - JSON output ONLY
+
+    Returns: (parsed_dict, docs_list)
+    """
+
+    docs = retrieve(query, k=5)
+    prompt, report = _literature_prompt(query, docs)
 
+    try:
+        raw = llm(prompt)
+    except LLMError as e:
+        return _llm_error(e), docs
+
+    parsed = _parse_literature_output(raw)
+    parsed["context_report"] = report
     return parsed, docs
 
+
+def literature_agent_stream(query: str):
+    """
+    Streaming variant of literature_agent. Yields (event, payload):
+        ("docs", docs_list)        retrieved documents, before generation
+        ("context", report)        what the context packer kept / dropped
+        ("hypothesis", dict)       each hypothesis as soon as it is complete
+        ("done", parsed_dict)      final parse of the full response
+    """
+    docs = retrieve(query, k=5)
+    yield "docs", docs
+
+    prompt, report = _literature_prompt(query, docs)
+    yield "context", report
+
+    parser = JSONArrayStreamParser("hypotheses")
+    parts = []
+
+    try:
+        for chunk in llm_stream(prompt):
+            parts.append(chunk)
+            for hypothesis in parser.feed(chunk):
+                yield "hypothesis", hypothesis
+    except LLMError as e:
+        yield "done", _llm_error(e)
+        return
+
+    parsed = _parse_literature_output("".join(parts).strip())
+    parsed["context_report"] = report
+    yield "done", parsed
+
 # ---------------------------------------------------------------
 # SCORE A HYPOTHESIS USING EVIDENCE
 # ---------------------------------------------------------------
@@ -104,13 +212,97 @@ def evidence_scorer(hypothesis: str, evidence):
         + f"HYPOTHESIS:\n{hypothesis}\n\nEVIDENCE:\n{evidence_text}"
     )
 
-    raw = llm(prompt)
+    try:
+        raw = llm(prompt)
+    except LLMError as e:
+        return _llm_error(e)
 
     try:
-        return json.loads(raw)
-    except Exception:
+        return repair_json(raw)
+    except ValueError:
         return {"raw": raw, "error": "JSON_PARSE_FAILED"}
 
+
+# ---------------------------------------------------------------
+# SCORE ALL HYPOTHESES IN ONE CONSTRAINED-JSON CALL
+# ---------------------------------------------------------------
+BATCH_SCORE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "scores": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "index": {"type": "integer"},
+                    "score": {"type": "number"},
+                    "reason": {"type": "string"},
+                },
+                "required": ["index", "score", "reason"],
+            },
+        }
+    },
+    "required": ["scores"],
+}
+
+
+def evidence_scorer_batch(items):
+    """
+    Scores many (hypothesis, evidence) pairs with a single LLM request.
+    Output is constrained by BATCH_SCORE_SCHEMA through Ollama's `format`;
+    anything still malformed is repaired rather than regenerated.
+
+    Returns a list of score dicts aligned with `items`.
+    """
+    items = list(items)
+    if not items:
+        return []
+
+    blocks = []
+    for i, (hypothesis, evidence) in enumerate(items):
+        if isinstance(evidence, (list, tuple)):
+            evidence_text = "\n".join(f"- {e}" for e in evidence)
+        else:
+            evidence_text = str(evidence)
+        blocks.append(f"[{i}] HYPOTHESIS:\n{hypothesis}\nEVIDENCE:\n{evidence_text}")
+
+    prompt = (
+        BATCH_SCORER_PROMPT
+        + "\n\nYou are a local model running via Ollama. "
+        + "Return ONLY JSON.\n\n"
+        + "\n\n".join(blocks)
+    )
+
+    try:
+        raw = llm(prompt, format=BATCH_SCORE_SCHEMA)
+    except LLMError as e:
+        return [_llm_error(e) for _ in items]
+
+    try:
+        parsed = repair_json(raw)
+    except ValueError:
+        return [{"raw": raw, "error": "JSON_PARSE_FAILED"} for _ in items]
+
+    entries = parsed.get("scores", []) if isinstance(parsed, dict) else parsed
+    by_index = {}
+    for position, entry in enumerate(entries if isinstance(entries, list) else []):
+        if not isinstance(entry, dict):
+            continue
+        # A null / non-integer index falls back to the entry's position
+        try:
+            idx = int(entry.get("index", position))
+        except (TypeError, ValueError, OverflowError):
+            idx = position
+        if not 0 <= idx < len(items):
+            continue
+        try:
+            score = min(1.0, max(0.0, float(entry.get("score"))))
+        except (TypeError, ValueError):
+            continue
+        by_index[idx] = {"score": score, "reason": entry.get("reason", "")}
+
+    return [by_index.get(i, {"error": "MISSING_SCORE"}) for i in range(len(items))]
+
 # ---------------------------------------------------------------
 # EXPERIMENT RECOMMENDER
 # ---------------------------------------------------------------
@@ -130,4 +322,54 @@ def experiment_recommender(hypothesis: str, evidence):
         + f"HYPOTHESIS:\n{hypothesis}\n\nEVIDENCE:\n{evidence_text}"
     )
 
-    return llm(prompt)
+    try:
+        return llm(prompt)
+    except LLMError as e:
+        return f"LLM_UNAVAILABLE ({type(e).__name__}): {e}"
+
+
+# ---------------------------------------------------------------
+# CONCURRENT SCORING + EXPERIMENTS FOR ALL HYPOTHESES
+# ---------------------------------------------------------------
+def run_hypothesis_tasks(items, max_workers: int = LLM_MAX_CONCURRENCY,
+                         batch_scoring: bool = True):
+    """
+    Fans out scoring + experiment_recommender for every
+    (hypothesis_text, evidence) pair on a bounded thread pool.
+
+    With batch_scoring, all hypotheses are scored by one
+    evidence_scorer_batch call; otherwise by one evidence_scorer call each.
+
+    Yields (index, task, result) as each call finishes, where task is
+    "score" or "experiment". Wall-clock time approaches the slowest
+    call instead of the sum of all calls.
+    """
+    items = list(items)
+    if not items:
+        return
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {}
+
+        if batch_scoring:
+            futures[pool.submit(evidence_scorer_batch, items)] = (None, "score")
+        else:
+            for i, (text, evidence) in enumerate(items):
+                futures[pool.submit(evidence_scorer, text, evidence)] = (i, "score")
+
+        for i, (text, evidence) in enumerate(items):
+            futures[pool.submit(experiment_recommender, text, evidence)] = (i, "experiment")
+
+        for future in as_completed(futures):
+            i, name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"error": str(e)} if name == "score" else f"ERROR: {e}"
+
+            if i is None:
+                results = result if isinstance(result, list) else [result] * len(items)
+                for j, score in enumerate(results):
+                    yield j, name, score
+            else:
+                yield i, name, result
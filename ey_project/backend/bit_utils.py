@@ -0,0 +1,18 @@
+import numpy as np
+
+_BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+# ---------------------------------------------------------------
+# Set-bit counts of packed uint64 rows (fingerprints, binary codes)
+# ---------------------------------------------------------------
+def popcount(words: np.ndarray) -> np.ndarray:
+    """
+    Number of set bits per row of a packed (..., n_words) uint64 array.
+    """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int32)
+
+    # NumPy < 2.0: byte lookup table
+    as_bytes = np.ascontiguousarray(words).view(np.uint8)
+    return _BYTE_POPCOUNT[as_bytes].sum(axis=-1, dtype=np.int32)
@@ -1,6 +1,28 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from pathlib import Path
+
+import numpy as np
 from rdkit import Chem
 from rdkit.Chem import AllChem, DataStructs
 
+from backend.bit_utils import popcount
+from backend.file_lock import locked
+
+# -----------------------------------------------------------
+# PATHS + FINGERPRINT SETTINGS
+# -----------------------------------------------------------
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DATA_DIR = PROJECT_ROOT / "data"
+MOLECULES_FILE = DATA_DIR / "molecules.jsonl"
+FP_CACHE_DIR = Path(os.getenv("FP_CACHE_DIR", DATA_DIR / "fp_cache"))
+
+FP_RADIUS = 2
+FP_BITS = 2048
+FP_WORDS = FP_BITS // 64
+
 # -----------------------------------------------------------
 # SAFE MOLECULE LOADING  (prevents RDKit crashes)
 # -----------------------------------------------------------
@@ -38,20 +60,641 @@ def compute_similarity(smiles1: str, smiles2: str):
     Returns None if either is invalid.
     No RDKit exceptions escape this function.
     """
-    mol1 = safe_mol_from_smiles(smiles1)
-    mol2 = safe_mol_from_smiles(smiles2)
+    fp1 = cached_fingerprint(smiles1)
+    fp2 = cached_fingerprint(smiles2)
 
-    if mol1 is None or mol2 is None:
+    if fp1 is None or fp2 is None:
+        return None
+
+    return float(tanimoto_many(fp1, fp2[None, :])[0])
+
+
+# -----------------------------------------------------------
+# PACKED FINGERPRINTS  (NumPy uint64 words)
+# -----------------------------------------------------------
+def _pack_bitvect(fp) -> np.ndarray:
+    """
+    Converts an RDKit ExplicitBitVect into FP_WORDS packed uint64 words.
+    """
+    bits = np.zeros((fp.GetNumBits(),), dtype=np.uint8)
+    DataStructs.ConvertToNumpyArray(fp, bits)
+    return np.packbits(bits).view(np.uint64)
+
+
+def morgan_fingerprint(smi: str):
+    """
+    Returns the packed Morgan fingerprint of a SMILES string,
+    or None if the molecule cannot be parsed.
+    """
+    return _morgan_from_mol(safe_mol_from_smiles(smi))
+
+
+def _morgan_from_mol(mol):
+    if mol is None:
         return None
 
     try:
-        fp1 = AllChem.GetMorganFingerprintAsBitVect(mol1, 2, nBits=2048)
-        fp2 = AllChem.GetMorganFingerprintAsBitVect(mol2, 2, nBits=2048)
-        return DataStructs.TanimotoSimilarity(fp1, fp2)
+        fp = AllChem.GetMorganFingerprintAsBitVect(mol, FP_RADIUS, nBits=FP_BITS)
+        return _pack_bitvect(fp)
     except Exception:
         return None
 
 
+def _pattern_from_mol(mol):
+    """
+    Packed RDKit pattern fingerprint, used for substructure pre-screening.
+    Works for both molecules and SMARTS query molecules.
+    """
+    if mol is None:
+        return None
+
+    try:
+        return _pack_bitvect(Chem.PatternFingerprint(mol, fpSize=FP_BITS))
+    except Exception:
+        return None
+
+
+FINGERPRINTERS = {
+    "morgan": _morgan_from_mol,
+    "pattern": _pattern_from_mol,
+}
+
+
+def tanimoto_many(query: np.ndarray, fps: np.ndarray, fp_counts: np.ndarray = None,
+                  chunk_size: int = 65536) -> np.ndarray:
+    """
+    Tanimoto similarity of one packed fingerprint against every row of `fps`.
+    Processed in chunks so the temporary AND matrix stays small.
+    """
+    if fp_counts is None:
+        fp_counts = popcount(fps)
+
+    q_count = int(popcount(query[None, :])[0])
+    sims = np.empty(len(fps), dtype=np.float64)
+
+    for start in range(0, len(fps), chunk_size):
+        stop = start + chunk_size
+        common = popcount(fps[start:stop] & query)
+        union = fp_counts[start:stop] + q_count - common
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sims[start:stop] = np.where(union > 0, common / union, 0.0)
+
+    return sims
+
+
+# -----------------------------------------------------------
+# PERSISTENT FINGERPRINT STORE  (memory-mapped, shared across processes)
+# -----------------------------------------------------------
+class FingerprintStore:
+    """
+    On-disk fingerprint cache keyed by canonical SMILES.
+    `name` selects the fingerprint kind (see FINGERPRINTERS).
+
+    Layout inside `directory`:
+        <name>.u64        append-only packed fingerprints, FP_WORDS per row
+        <name>.index.tsv  append-only "key<TAB>row" lines (row -1 = invalid)
+
+    The data file is opened with np.memmap, so every process reading the
+    store shares the same OS pages. Raw input SMILES are recorded as
+    aliases of their canonical form, so a repeated lookup of the same
+    string never touches RDKit. Keys containing tabs or line breaks are
+    never stored (they would corrupt the index).
+    """
+
+    ROW_BYTES = FP_WORDS * 8
+
+    def __init__(self, directory: Path = FP_CACHE_DIR, name: str = "morgan"):
+        self.fingerprint_fn = FINGERPRINTERS[name]
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.data_path = self.directory / f"{name}.u64"
+        self.index_path = self.directory / f"{name}.index.tsv"
+        self.data_path.touch(exist_ok=True)
+        self.index_path.touch(exist_ok=True)
+
+        self._rows = {}
+        self._index_offset = 0
+        self._matrix = np.zeros((0, FP_WORDS), dtype=np.uint64)
+
+    def __len__(self):
+        return self.data_path.stat().st_size // self.ROW_BYTES
+
+    # -------------------------------------------------------
+    # Index + memory map refresh (picks up other writers)
+    # -------------------------------------------------------
+    def refresh(self):
+        """
+        Picks up keys other processes appended: one stat when the index
+        has not grown. Batch lookups call this once, then get(refresh=False).
+        """
+        if os.stat(self.index_path).st_size <= self._index_offset:
+            return
+        with self.index_path.open("rb") as f:
+            f.seek(self._index_offset)
+            chunk = f.read()
+
+        # Only consume complete lines; a concurrent writer may be mid-line
+        end = chunk.rfind(b"\n") + 1
+        if end == 0:
+            return
+
+        for line in chunk[:end].decode("utf-8").split("\n"):
+            key, _, row = line.rpartition("\t")
+            if key:
+                self._rows[key] = int(row)
+
+        self._index_offset += end
+
+    def _rows_view(self, row: int) -> np.ndarray:
+        if row >= len(self._matrix):
+            n_rows = len(self)
+            if n_rows > 0:
+                self._matrix = np.memmap(
+                    self.data_path, dtype=np.uint64, mode="r",
+                    shape=(n_rows, FP_WORDS)
+                )
+        return self._matrix
+
+    # -------------------------------------------------------
+    # Lookup
+    # -------------------------------------------------------
+    def get(self, key: str, refresh: bool = True):
+        """
+        Returns (found, fingerprint). A found key with fingerprint None
+        means the SMILES was previously recorded as invalid. A miss
+        re-checks the index for other writers' keys unless `refresh` is
+        False (the caller refreshed for the whole batch).
+        """
+        row = self._rows.get(key)
+        if row is None and refresh:
+            self.refresh()
+            row = self._rows.get(key)
+        if row is None:
+            return False, None
+
+        if row < 0:
+            return True, None
+
+        matrix = self._rows_view(row)
+        if row >= len(matrix):
+            return False, None
+        return True, matrix[row]
+
+    def get_or_compute(self, smi: str):
+        """
+        Returns the packed fingerprint for `smi`, computing and storing
+        it on a miss. Returns None for invalid SMILES.
+        """
+        if not smi or not isinstance(smi, str):
+            return None
+
+        found, fp = self.get(smi)
+        if found:
+            return fp
+
+        mol = safe_mol_from_smiles(smi)
+        canonical = _canonical_smiles(mol)
+
+        if canonical is not None and canonical != smi:
+            found, fp = self.get(canonical)
+            if found:
+                self.put_many([([smi], None, canonical)])
+                return fp
+
+        fp = self.fingerprint_fn(mol)
+        keys = [smi] if canonical is None else [canonical, smi]
+        self.put_many([(keys, fp, None)])
+        return fp
+
+    # -------------------------------------------------------
+    # Append (cross-process safe)
+    # -------------------------------------------------------
+    def put_many(self, items):
+        """
+        Appends fingerprints to the store.
+
+        items: iterable of (keys, fingerprint, alias_of)
+            - keys        strings that should resolve to this fingerprint
+            - fingerprint packed uint64 row, or None for invalid SMILES
+            - alias_of    existing key to point `keys` at instead of a new row
+        """
+        with locked(self.data_path):
+            self.refresh()
+            next_row = len(self)
+
+            blobs, lines = [], []
+            for keys, fp, alias_of in items:
+                keys = [k for k in dict.fromkeys(keys) if k not in self._rows and _storable(k)]
+                if not keys:
+                    continue
+
+                if alias_of is not None:
+                    row = self._rows.get(alias_of, -1)
+                elif fp is None:
+                    row = -1
+                else:
+                    row = next_row
+                    next_row += 1
+                    blobs.append(np.ascontiguousarray(fp, dtype=np.uint64).tobytes())
+
+                for k in keys:
+                    self._rows[k] = row
+                    lines.append(f"{k}\t{row}\n")
+
+            # Data first, index second: an index line never points past the data
+            if blobs:
+                with self.data_path.open("ab") as f:
+                    f.write(b"".join(blobs))
+            if lines:
+                with self.index_path.open("ab") as f:
+                    f.write("".join(lines).encode("utf-8"))
+                    self._index_offset = f.tell()
+
+
+def _storable(key: str) -> bool:
+    return not any(c in key for c in "\t\n\r")
+
+
+def _canonical_smiles(mol):
+    if mol is None:
+        return None
+    try:
+        return Chem.MolToSmiles(mol)
+    except Exception:
+        return None
+
+
+_FINGERPRINT_STORES = {}
+
+
+def get_fingerprint_store(kind: str = "morgan") -> FingerprintStore:
+    if kind not in _FINGERPRINT_STORES:
+        _FINGERPRINT_STORES[kind] = FingerprintStore(name=kind)
+    return _FINGERPRINT_STORES[kind]
+
+
+def cached_fingerprint(smi: str):
+    """
+    Packed Morgan fingerprint for `smi`, served from the shared on-disk
+    store when available. Falls back to direct computation if the store
+    cannot be used (e.g. read-only data directory).
+    """
+    try:
+        return get_fingerprint_store().get_or_compute(smi)
+    except OSError:
+        return morgan_fingerprint(smi)
+
+
+# -----------------------------------------------------------
+# BATCH FINGERPRINTING  (process pool, packed arrays + validity mask)
+# -----------------------------------------------------------
+BATCH_CHUNK_SIZE = 2048
+
+
+def _fingerprint_chunk(smiles_list, kind: str = "morgan"):
+    """
+    Worker: fingerprints one chunk of SMILES with FINGERPRINTERS[kind].
+    Returns (packed fps, valid mask, canonical SMILES list).
+    """
+    fingerprint_fn = FINGERPRINTERS[kind]
+    fps = np.zeros((len(smiles_list), FP_WORDS), dtype=np.uint64)
+    valid = np.zeros(len(smiles_list), dtype=bool)
+    canonical = [None] * len(smiles_list)
+
+    for i, smi in enumerate(smiles_list):
+        mol = safe_mol_from_smiles(smi)
+        fp = fingerprint_fn(mol)
+        if fp is not None:
+            fps[i] = fp
+            valid[i] = True
+            canonical[i] = _canonical_smiles(mol)
+
+    return fps, valid, canonical
+
+
+def _chunks(items, chunk_size):
+    for start in range(0, len(items), chunk_size):
+        yield items[start:start + chunk_size]
+
+
+def _map_chunks(func, items, n_jobs=None, chunk_size=BATCH_CHUNK_SIZE):
+    """
+    Applies `func` to fixed-size chunks of `items`, in order.
+    Small inputs (or n_jobs=1) run in-process to avoid pool start-up cost.
+    """
+    if n_jobs == 1 or len(items) <= chunk_size:
+        return [func(chunk) for chunk in _chunks(items, chunk_size)]
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        return list(pool.map(func, _chunks(items, chunk_size)))
+
+
+def compute_fingerprints_batch(smiles, n_jobs=None, chunk_size: int = BATCH_CHUNK_SIZE,
+                               use_cache: bool = True, kind: str = "morgan"):
+    """
+    Fingerprints many SMILES at once.
+
+    Returns:
+        fps    (n, FP_WORDS) uint64 packed fingerprints (Morgan by default)
+        valid  (n,) bool mask — False rows are invalid SMILES (all-zero fps)
+
+    Cached fingerprints are served from the on-disk store; the rest are
+    sharded across a process pool and written back to the store.
+    """
+    smiles = list(smiles)
+    fps = np.zeros((len(smiles), FP_WORDS), dtype=np.uint64)
+    valid = np.zeros(len(smiles), dtype=bool)
+
+    store = None
+    if use_cache:
+        try:
+            store = get_fingerprint_store(kind)
+        except OSError:
+            store = None
+
+    if store is not None:
+        store.refresh()
+
+    todo = []
+    for i, smi in enumerate(smiles):
+        if not smi or not isinstance(smi, str):
+            continue
+        if store is not None:
+            found, fp = store.get(smi, refresh=False)
+            if found:
+                if fp is not None:
+                    fps[i] = fp
+                    valid[i] = True
+                continue
+        todo.append(i)
+
+    if not todo:
+        return fps, valid
+
+    todo_smiles = [smiles[i] for i in todo]
+    worker = partial(_fingerprint_chunk, kind=kind)
+    results = _map_chunks(worker, todo_smiles, n_jobs, chunk_size)
+
+    new_items = []
+    offset = 0
+    for chunk_fps, chunk_valid, chunk_canonical in results:
+        rows = todo[offset:offset + len(chunk_valid)]
+        fps[rows] = chunk_fps
+        valid[rows] = chunk_valid
+
+        for j, row in enumerate(rows):
+            fp = chunk_fps[j] if chunk_valid[j] else None
+            keys = [k for k in (chunk_canonical[j], smiles[row]) if k]
+            new_items.append((keys, fp, None))
+        offset += len(chunk_valid)
+
+    if store is not None:
+        try:
+            store.put_many(new_items)
+        except OSError:
+            pass
+
+    return fps, valid
+
+
+def tanimoto_matrix(fps_a: np.ndarray, fps_b: np.ndarray,
+                    max_block_words: int = 1 << 24) -> np.ndarray:
+    """
+    Pairwise Tanimoto similarity between two packed fingerprint matrices.
+    Rows of `fps_a` are processed in blocks to bound temporary memory.
+    """
+    counts_a = popcount(fps_a)
+    counts_b = popcount(fps_b)
+    sims = np.zeros((len(fps_a), len(fps_b)), dtype=np.float64)
+
+    block = max(1, max_block_words // max(1, len(fps_b) * FP_WORDS))
+    for start in range(0, len(fps_a), block):
+        stop = start + block
+        common = popcount(fps_a[start:stop, None, :] & fps_b[None, :, :])
+        union = counts_a[start:stop, None] + counts_b[None, :] - common
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sims[start:stop] = np.where(union > 0, common / union, 0.0)
+
+    return sims
+
+
+def similarity_matrix(smiles_a, smiles_b=None, n_jobs=None):
+    """
+    Pairwise Tanimoto similarity between two SMILES lists
+    (or within one list if `smiles_b` is None).
+
+    Returns (sims, valid_a, valid_b). Rows/columns belonging to invalid
+    SMILES are NaN and flagged False in the masks.
+    """
+    fps_a, valid_a = compute_fingerprints_batch(smiles_a, n_jobs=n_jobs)
+    if smiles_b is None:
+        fps_b, valid_b = fps_a, valid_a
+    else:
+        fps_b, valid_b = compute_fingerprints_batch(smiles_b, n_jobs=n_jobs)
+
+    sims = tanimoto_matrix(fps_a, fps_b)
+    sims[~valid_a, :] = np.nan
+    sims[:, ~valid_b] = np.nan
+    return sims, valid_a, valid_b
+
+
+# -----------------------------------------------------------
+# FINGERPRINT INDEX  (built once, searched many times)
+# -----------------------------------------------------------
+class FingerprintIndex:
+    """
+    In-memory Morgan fingerprint index for a molecule library.
+
+    Fingerprints are stored as a packed (n, FP_WORDS) uint64 matrix with
+    precomputed popcounts, so a top-k Tanimoto search is a single
+    vectorized pass instead of one RDKit round trip per molecule.
+    """
+
+    def __init__(self, names, smiles, fps: np.ndarray):
+        self.names = list(names)
+        self.smiles = list(smiles)
+        self.fps = np.ascontiguousarray(fps, dtype=np.uint64).reshape(-1, FP_WORDS)
+        self.counts = popcount(self.fps)
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Builds the index from (name, smiles) pairs, skipping invalid SMILES.
+        """
+        records = list(records)
+        fps, valid = compute_fingerprints_batch([smi for _, smi in records])
+
+        names = [r[0] for r, ok in zip(records, valid) if ok]
+        smiles = [r[1] for r, ok in zip(records, valid) if ok]
+        return cls(names, smiles, fps[valid])
+
+    @classmethod
+    def from_jsonl(cls, path: Path = MOLECULES_FILE):
+        return cls.from_records(load_molecule_records(path))
+
+    def search(self, query_smiles: str, top_k: int = 3):
+        """
+        Returns sorted list of (name, smiles, similarity_score).
+        """
+        query = morgan_fingerprint(query_smiles)
+        if query is None or len(self) == 0 or top_k <= 0:
+            return []
+
+        sims = tanimoto_many(query, self.fps, self.counts)
+
+        k = min(top_k, len(sims))
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top], kind="stable")]
+
+        return [(self.names[i], self.smiles[i], float(sims[i])) for i in top]
+
+
+def load_molecule_records(path: Path = MOLECULES_FILE):
+    """
+    Yields (name, smiles) pairs from molecules.jsonl.
+    Falls back to the built-in MOLECULE_DB if the file is missing.
+    """
+    if not path.exists():
+        yield from MOLECULE_DB.items()
+        return
+
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if rec.get("smiles"):
+                yield rec.get("name") or rec.get("id"), rec["smiles"]
+
+
+# -----------------------------------------------------------
+# SUBSTRUCTURE SEARCH  (pattern-fingerprint screen → RDKit confirm)
+# -----------------------------------------------------------
+def _substructure_chunk(smarts: str, candidates):
+    """
+    Worker: confirms (row, smiles) candidates with HasSubstructMatch.
+    Returns the rows that really contain the pattern.
+    """
+    pattern = Chem.MolFromSmarts(smarts)
+    if pattern is None:
+        return []
+
+    hits = []
+    for row, smi in candidates:
+        mol = safe_mol_from_smiles(smi)
+        if mol is None:
+            continue
+        try:
+            if mol.HasSubstructMatch(pattern):
+                hits.append(row)
+        except Exception:
+            continue
+    return hits
+
+
+class SubstructureIndex:
+    """
+    Pattern-fingerprint index for SMARTS substructure queries.
+
+    Stage 1: a vectorized bit screen keeps only molecules whose pattern
+             fingerprint contains every bit of the query's fingerprint.
+    Stage 2: RDKit HasSubstructMatch confirms the survivors, in parallel.
+    """
+
+    def __init__(self, names, smiles, fps: np.ndarray):
+        self.names = list(names)
+        self.smiles = list(smiles)
+        self.fps = np.ascontiguousarray(fps, dtype=np.uint64).reshape(-1, FP_WORDS)
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_records(cls, records, n_jobs=None):
+        records = list(records)
+        fps, valid = compute_fingerprints_batch(
+            [smi for _, smi in records], n_jobs=n_jobs, kind="pattern"
+        )
+
+        names = [r[0] for r, ok in zip(records, valid) if ok]
+        smiles = [r[1] for r, ok in zip(records, valid) if ok]
+        return cls(names, smiles, fps[valid])
+
+    @classmethod
+    def from_jsonl(cls, path: Path = MOLECULES_FILE):
+        return cls.from_records(load_molecule_records(path))
+
+    def screen(self, smarts: str, chunk_size: int = 65536) -> np.ndarray:
+        """
+        Stage 1 only: row indices that may contain the pattern.
+        """
+        query = _pattern_from_mol(Chem.MolFromSmarts(smarts) if smarts else None)
+        if query is None:
+            return np.zeros(0, dtype=np.int64)
+
+        survivors = []
+        for start in range(0, len(self.fps), chunk_size):
+            block = self.fps[start:start + chunk_size]
+            keep = np.all((block & query) == query, axis=1)
+            survivors.append(np.flatnonzero(keep) + start)
+
+        return np.concatenate(survivors) if survivors else np.zeros(0, dtype=np.int64)
+
+    def search(self, smarts: str, n_jobs=None, chunk_size: int = 256):
+        """
+        Yields (name, smiles) for every library molecule containing `smarts`.
+        Confirmed hits are streamed as each chunk finishes, so results
+        may arrive out of library order. Invalid SMARTS yields nothing.
+        """
+        rows = self.screen(smarts)
+        if len(rows) == 0:
+            return
+
+        candidates = [(int(r), self.smiles[r]) for r in rows]
+
+        if n_jobs == 1 or len(candidates) <= chunk_size:
+            for row in _substructure_chunk(smarts, candidates):
+                yield self.names[row], self.smiles[row]
+            return
+
+        pool = ProcessPoolExecutor(max_workers=n_jobs)
+        try:
+            futures = [
+                pool.submit(_substructure_chunk, smarts, chunk)
+                for chunk in _chunks(candidates, chunk_size)
+            ]
+            for future in as_completed(futures):
+                for row in future.result():
+                    yield self.names[row], self.smiles[row]
+        finally:
+            # Stop pending work if the caller abandons the generator early
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+_SUBSTRUCTURE_INDEX = None
+
+
+def get_substructure_index() -> SubstructureIndex:
+    global _SUBSTRUCTURE_INDEX
+    if _SUBSTRUCTURE_INDEX is None:
+        _SUBSTRUCTURE_INDEX = SubstructureIndex.from_jsonl()
+    return _SUBSTRUCTURE_INDEX
+
+
+def substructure_search(smarts: str, n_jobs=None):
+    """
+    Yields (name, smiles) of library molecules containing the SMARTS pattern.
+    """
+    yield from get_substructure_index().search(smarts, n_jobs=n_jobs)
+
+
 # -----------------------------------------------------------
 # TOP‑K MOST SIMILAR MOLECULES
 # -----------------------------------------------------------
@@ -63,15 +706,21 @@ MOLECULE_DB = {
     "Erlotinib": "CN(C)CCOc1c(OC)nc(Nc2cccc(Cl)c2)n1"
 }
 
-def find_similar_molecules(query_smiles: str, top_k: int = 3):
+_MOLECULE_INDEX = None
+
+
+def get_molecule_index() -> FingerprintIndex:
     """
-    Returns sorted list of (name, smiles, similarity_score).
+    Builds the library index from molecules.jsonl on first use.
     """
-    results = []
+    global _MOLECULE_INDEX
+    if _MOLECULE_INDEX is None:
+        _MOLECULE_INDEX = FingerprintIndex.from_jsonl()
+    return _MOLECULE_INDEX
 
-    for name, smi in MOLECULE_DB.items():
-        sim = compute_similarity(query_smiles, smi)
-        if sim is not None:
-            results.append((name, smi, sim))
 
-    return sorted(results, key=lambda x: x[2], reverse=True)[:top_k]
+def find_similar_molecules(query_smiles: str, top_k: int = 3):
+    """
+    Returns sorted list of (name, smiles, similarity_score).
+    """
+    return get_molecule_index().search(query_smiles, top_k)
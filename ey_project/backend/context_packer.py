@@ -0,0 +1,168 @@
+import math
+import os
+import re
+
+# ---------------------------------------------------------------
+# Token budget for retrieved context in LLM prompts
+# ---------------------------------------------------------------
+LIT_CONTEXT_TOKENS = int(os.getenv("LIT_CONTEXT_TOKENS", 1500))
+
+# Sentences whose word sets overlap at least this much count as duplicates
+NEAR_DUPLICATE_JACCARD = 0.8
+
+# A sentence that does not fit is cut to the remaining budget if at least
+# this many tokens are left; smaller leftovers are not worth a fragment
+MIN_TRUNCATED_TOKENS = 16
+
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(\[\"'])")
+_WORD_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has",
+    "in", "is", "it", "its", "of", "on", "or", "that", "the", "to", "was",
+    "were", "which", "with", "what", "how", "does", "do", "role",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token for English + symbols).
+    """
+    if not text:
+        return 0
+    return max(1, math.ceil(len(text) / 4))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cuts `text` at a word boundary so estimate_tokens(result) <= max_tokens,
+    marking the cut with "…".
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max(0, max_tokens * 4 - 1)]
+    space = cut.rfind(" ")
+    if space > len(cut) // 2:
+        cut = cut[:space]
+    return cut.rstrip() + "…"
+
+
+def split_sentences(text: str):
+    return [s.strip() for s in _SENTENCE_SPLIT_RE.split(text or "") if s.strip()]
+
+
+def _words(text: str):
+    return set(_WORD_RE.findall(text.lower())) - STOPWORDS
+
+
+# ---------------------------------------------------------------
+# CONTEXT PACKER
+# ---------------------------------------------------------------
+def pack_context(query: str, docs, token_budget: int = LIT_CONTEXT_TOKENS):
+    """
+    Packs retrieved docs into at most `token_budget` estimated tokens.
+
+    - splits docs into sentences and drops exact / near-duplicate passages
+    - ranks sentences by IDF-weighted overlap with the query
+      (earlier-ranked docs and leading sentences break ties)
+    - greedily keeps the best sentences that fit; the best one that does
+      not fit is cut to the remaining budget instead of dropped whole
+    - renders the kept sentences per doc in their original order as
+      "ID:<id>\\n<sentences>"
+
+    Returns (doc_text, report) where report says how much was dropped.
+    """
+    query_words = _words(query)
+
+    sentences = []          # (doc_rank, position, doc_id, text, words)
+    seen_exact = set()
+    kept_word_sets = []
+    duplicates = 0
+    total_tokens = 0
+
+    for rank, d in enumerate(docs):
+        for pos, sent in enumerate(split_sentences(d.get("text", ""))):
+            total_tokens += estimate_tokens(sent)
+            words = _words(sent)
+
+            norm = " ".join(sorted(words)) or sent.lower()
+            if norm in seen_exact:
+                duplicates += 1
+                continue
+
+            if any(_jaccard(words, other) >= NEAR_DUPLICATE_JACCARD for other in kept_word_sets):
+                duplicates += 1
+                continue
+
+            seen_exact.add(norm)
+            kept_word_sets.append(words)
+            sentences.append((rank, pos, str(d.get("id")), sent, words))
+
+    # IDF over the candidate sentences
+    df = {}
+    for *_, words in sentences:
+        for w in words:
+            df[w] = df.get(w, 0) + 1
+    n = max(1, len(sentences))
+
+    def relevance(item):
+        rank, pos, _, _, words = item
+        overlap = sum(math.log(1 + n / df[w]) for w in words & query_words)
+        return overlap + 0.1 / (1 + rank) + (0.05 if pos == 0 else 0.0)
+
+    ranked = sorted(sentences, key=lambda it: (-relevance(it), it[0], it[1]))
+
+    selected = []
+    used = 0
+    truncated = 0
+    docs_opened = set()
+    for item in ranked:
+        rank, pos, doc_id, sent, words = item
+        header = 0 if doc_id in docs_opened else estimate_tokens(f"ID:{doc_id}\n") + 1
+        cost = header + estimate_tokens(sent)
+        if used + cost > token_budget:
+            remaining = token_budget - used - header
+            if truncated or remaining < MIN_TRUNCATED_TOKENS:
+                continue
+            sent = truncate_to_tokens(sent, remaining)
+            item = (rank, pos, doc_id, sent, words)
+            cost = header + estimate_tokens(sent)
+            truncated += 1
+        selected.append(item)
+        docs_opened.add(doc_id)
+        used += cost
+
+    # Render in original doc / sentence order
+    selected.sort(key=lambda it: (it[0], it[1]))
+    blocks, current_id, current = [], None, []
+    for _, _, doc_id, sent, _ in selected:
+        if doc_id != current_id and current:
+            blocks.append(f"ID:{current_id}\n" + " ".join(current))
+            current = []
+        current_id = doc_id
+        current.append(sent)
+    if current:
+        blocks.append(f"ID:{current_id}\n" + " ".join(current))
+
+    packed_tokens = sum(estimate_tokens(s) for *_, s, _ in selected)
+    report = {
+        "token_budget": token_budget,
+        "total_tokens": total_tokens,
+        "packed_tokens": packed_tokens,
+        "dropped_tokens": total_tokens - packed_tokens,
+        "dropped_fraction": round(1 - packed_tokens / total_tokens, 3) if total_tokens else 0.0,
+        "duplicate_sentences": duplicates,
+        "truncated_sentences": truncated,
+        "sentences_kept": len(selected),
+        "sentences_total": len(sentences) + duplicates,
+        "docs_included": len(docs_opened),
+        "docs_total": len(docs),
+    }
+
+    return "\n\n".join(blocks), report
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
@@ -0,0 +1,206 @@
+import math
+import os
+import pickle
+import threading
+from itertools import combinations
+from pathlib import Path
+
+import networkx as nx
+
+from backend.context_packer import split_sentences
+from backend.entity_extractor import GENE_TYPES, get_entity_extractor
+
+# ---------------------------------------------------------------
+# Path (kept alongside the vector DB, like the BM25 index)
+# ---------------------------------------------------------------
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+COOC_INDEX_PATH = Path(os.getenv("COOC_INDEX_PATH", PROJECT_ROOT / "chroma_db" / "cooccurrence.pkl"))
+
+
+def profile_text(title: str, text: str, extractor=None):
+    """
+    Entity profile of one document:
+        entities  set of canonical gene / family symbols
+        pairs     {(a, b): sentences mentioning both}, a < b
+    The title counts as its own sentence.
+    """
+    extractor = extractor or get_entity_extractor()
+    entities, pairs = set(), {}
+
+    sentences = ([title] if title else []) + split_sentences(text)
+    for sent in sentences:
+        found = sorted(extractor.extract_symbols(sent, types=GENE_TYPES))
+        entities.update(found)
+        for a, b in combinations(found, 2):
+            pairs[(a, b)] = pairs.get((a, b), 0) + 1
+
+    # Pairs that only meet across sentences still co-occur at doc level
+    for a, b in combinations(sorted(entities), 2):
+        pairs.setdefault((a, b), 0)
+
+    return entities, pairs
+
+
+# ---------------------------------------------------------------
+# Sparse co-occurrence index (incremental)
+# ---------------------------------------------------------------
+class CooccurrenceIndex:
+    """
+    Entity co-occurrence counts at document and sentence level.
+
+    Global counts live in sparse dict-of-keys matrices keyed by symbol
+    pairs; each doc's own profile is kept too, so docs can be replaced
+    or removed and a query's pathway graph is a slice over its
+    retrieved doc ids rather than a rescan of their text.
+    """
+
+    def __init__(self):
+        self.n_docs = 0
+        self.entity_docs = {}       # symbol → docs mentioning it
+        self.pair_docs = {}         # (a, b) → docs mentioning both
+        self.pair_sents = {}        # (a, b) → sentences mentioning both
+        self.doc_entities = {}      # doc id → frozenset of symbols
+        self.doc_pairs = {}         # doc id → {(a, b): sentence count}
+
+    def __len__(self):
+        return self.n_docs
+
+    # -----------------------------------------------------------
+    # Updates
+    # -----------------------------------------------------------
+    def add_docs(self, docs, extractor=None):
+        """
+        Adds docs (id, text, title optional); an existing id is replaced.
+        """
+        for d in docs:
+            doc_id = str(d["id"])
+            self._remove(doc_id)
+
+            entities, pairs = profile_text(d.get("title") or "", d.get("text", ""), extractor)
+            self.doc_entities[doc_id] = frozenset(entities)
+            self.doc_pairs[doc_id] = pairs
+            self.n_docs += 1
+
+            for e in entities:
+                self.entity_docs[e] = self.entity_docs.get(e, 0) + 1
+            for pair, sents in pairs.items():
+                self.pair_docs[pair] = self.pair_docs.get(pair, 0) + 1
+                self.pair_sents[pair] = self.pair_sents.get(pair, 0) + sents
+
+    def remove_docs(self, ids):
+        for doc_id in ids:
+            self._remove(str(doc_id))
+
+    def _remove(self, doc_id: str):
+        entities = self.doc_entities.pop(doc_id, None)
+        if entities is None:
+            return
+        pairs = self.doc_pairs.pop(doc_id)
+        self.n_docs -= 1
+
+        for e in entities:
+            _decrement(self.entity_docs, e, 1)
+        for pair, sents in pairs.items():
+            _decrement(self.pair_docs, pair, 1)
+            _decrement(self.pair_sents, pair, sents)
+
+    # -----------------------------------------------------------
+    # Weights
+    # -----------------------------------------------------------
+    def pmi(self, a: str, b: str) -> float:
+        """
+        Document-level pointwise mutual information:
+            log( N * docs(a, b) / (docs(a) * docs(b)) )
+        """
+        pair = (a, b) if a < b else (b, a)
+        joint = self.pair_docs.get(pair, 0)
+        if not joint:
+            return 0.0
+        return math.log(self.n_docs * joint / (self.entity_docs[a] * self.entity_docs[b]))
+
+    # -----------------------------------------------------------
+    # Pathway graph slice
+    # -----------------------------------------------------------
+    def subgraph(self, doc_ids, extra_profiles=(), weight: str = "pmi", min_count: int = 1):
+        """
+        Weighted gene graph over the given docs (plus ad-hoc profiles,
+        e.g. hypothesis text). Edge attributes:
+            count      sentence-level co-mentions inside the slice
+            docs       slice docs (or profiles) mentioning both
+            pmi        corpus-level PMI
+            weight     pmi or count, per `weight`
+        Pairs seen in fewer than `min_count` slice docs are dropped.
+        """
+        profiles = [(self.doc_entities[d], self.doc_pairs[d])
+                    for d in map(str, doc_ids) if d in self.doc_entities]
+        profiles += list(extra_profiles)
+
+        G = nx.Graph()
+        counts, docs = {}, {}
+        for entities, pairs in profiles:
+            G.add_nodes_from(entities)
+            for pair, sents in pairs.items():
+                counts[pair] = counts.get(pair, 0) + sents
+                docs[pair] = docs.get(pair, 0) + 1
+
+        for (a, b), n_docs in docs.items():
+            if n_docs < min_count:
+                continue
+            pmi = round(self.pmi(a, b), 4)
+            G.add_edge(a, b, count=counts[(a, b)], docs=n_docs, pmi=pmi,
+                       weight=pmi if weight == "pmi" else counts[(a, b)])
+        return G
+
+    # -----------------------------------------------------------
+    # Persistence
+    # -----------------------------------------------------------
+    def save(self, path: Path = COOC_INDEX_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with tmp.open("wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path = COOC_INDEX_PATH):
+        """
+        Loads a saved index, or returns an empty one if there is none.
+        """
+        path = Path(path)
+        if not path.exists():
+            return cls()
+        try:
+            with path.open("rb") as f:
+                index = pickle.load(f)
+        except Exception as e:
+            print(f"[cooccurrence index unreadable, starting empty] {e}")
+            return cls()
+        return index if isinstance(index, cls) else cls()
+
+
+def _decrement(counter: dict, key, by: int):
+    left = counter.get(key, 0) - by
+    if left > 0:
+        counter[key] = left
+    else:
+        counter.pop(key, None)
+
+
+# ---------------------------------------------------------------
+# Process-wide index (reloaded when the indexer saves a new one)
+# ---------------------------------------------------------------
+_INDEX = None
+_INDEX_MTIME = None
+_INDEX_LOCK = threading.Lock()
+
+
+def get_cooccurrence_index() -> CooccurrenceIndex:
+    global _INDEX, _INDEX_MTIME
+    mtime = COOC_INDEX_PATH.stat().st_mtime if COOC_INDEX_PATH.exists() else None
+    if _INDEX is None or mtime != _INDEX_MTIME:
+        with _INDEX_LOCK:
+            if _INDEX is None or mtime != _INDEX_MTIME:
+                _INDEX = CooccurrenceIndex.load(COOC_INDEX_PATH)
+                _INDEX_MTIME = mtime
+    return _INDEX
@@ -1,49 +1,144 @@
-import json
+import threading
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
-import chromadb
-from chromadb.config import Settings
-from chromadb.utils import embedding_functions
+
+from backend.lexical_index import BM25Index
+from backend.vector_store import VECTOR_BACKEND, open_vector_store, store_directory
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+# ---------------------------------------------------------------
+# Shared embedding model (one per process, loaded on first use)
+# ---------------------------------------------------------------
+_MODEL = None
+_MODEL_LOCK = threading.Lock()
+
+
+def get_model():
+    """
+    Returns the process-wide SentenceTransformer, loading it on first use.
+    Indexing and querying both go through this one instance.
+    """
+    global _MODEL
+    if _MODEL is None:
+        with _MODEL_LOCK:
+            if _MODEL is None:
+                from sentence_transformers import SentenceTransformer
+                _MODEL = SentenceTransformer(MODEL_NAME)
+    return _MODEL
+
+
+def warm_up():
+    """
+    Optional hook: load the model and run one tiny encode now, so the
+    first real query does not pay the load + first-call cost.
+    """
+    get_model().encode(["warm-up"], show_progress_bar=False)
+
+
+def shared_embedding_function():
+    """
+    Chroma embedding function backed by the shared model.
+    Built lazily so the NumPy backend never imports chromadb.
+    """
+    from chromadb.api.types import EmbeddingFunction
+
+    class SharedEmbeddingFunction(EmbeddingFunction):
+        def __call__(self, input):
+            return get_model().encode(list(input), show_progress_bar=False).tolist()
+
+    return SharedEmbeddingFunction()
+
 
 # ---------------------------------------------------------------
 # Embedder Class (Optimized A2 Version)
 # ---------------------------------------------------------------
 class Embedder:
-    def __init__(self):
+    def __init__(self, backend: str = VECTOR_BACKEND, db_path: Path = None):
         """
-        Loads model + initializes persistent ChromaDB client once.
+        Sets up the persistent vector store location (Chroma or NumPy,
+        see backend.vector_store). The store is opened by
+        create_collection(); the embedding model is shared and only
+        loaded on first use. `db_path` defaults to ey_project/chroma_db.
         """
-        # Load lightweight transformer model (fast)
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
-
         # Persistent local DB → no re-indexing needed
         project_root = Path(__file__).resolve().parents[1]
-        db_path = project_root / "chroma_db"
-        db_path.mkdir(exist_ok=True)
+        db_path = Path(db_path) if db_path else project_root / "chroma_db"
+        db_path.mkdir(parents=True, exist_ok=True)
 
-        self.client = chromadb.PersistentClient(
-            path=str(db_path),
-            settings=Settings()
-        )
+        self.db_path = db_path
+        self.backend = backend
+        self.store = None
+        self.store_name = "ej_docs"
+
+        # BM25 index kept alongside the vector DB
+        self.lexical_path = db_path / "bm25.pkl"
+        self._lexical = None
+        self._lexical_mtime = None
+        self._lexical_dirty = False
 
-        self.collection = None
+    @property
+    def model(self):
+        return get_model()
+
+    # -----------------------------------------------------------
+    # Lexical (BM25) index
+    # -----------------------------------------------------------
+    @property
+    def lexical(self) -> BM25Index:
+        """
+        The BM25 index, reloaded when another process (e.g. the nightly
+        indexer) has saved a newer version and we hold no unsaved changes.
+        """
+        mtime = self.lexical_path.stat().st_mtime if self.lexical_path.exists() else None
+        if self._lexical is None or (mtime != self._lexical_mtime and not self._lexical_dirty):
+            self._lexical = BM25Index.load(self.lexical_path)
+            self._lexical_mtime = mtime
+        return self._lexical
+
+    def add_lexical(self, docs):
+        self.lexical.add_docs(docs)
+        self._lexical_dirty = True
+
+    def save_lexical_index(self):
+        if self._lexical is None or not self._lexical_dirty:
+            return
+        self._lexical.save(self.lexical_path)
+        self._lexical_mtime = self.lexical_path.stat().st_mtime
+        self._lexical_dirty = False
+
+    def lexical_search(self, text: str, k: int = 5):
+        """
+        Returns up to k (doc_id, bm25_score) pairs.
+        """
+        return self.lexical.search(text, k)
 
     # -----------------------------------------------------------
     # Create or load collection
     # -----------------------------------------------------------
     def create_collection(self, name: str = "ej_docs"):
         """
-        Creates or loads the Chroma collection.
-        Embedding is handled automatically using a SentenceTransformer.
+        Creates or loads the vector store for the configured backend.
+        Embedding is handled here by the shared SentenceTransformer.
         """
-        ef = embedding_functions.SentenceTransformerEmbeddingFunction(
-            model_name="all-MiniLM-L6-v2"
+        embedding_function = shared_embedding_function() if self.backend == "chroma" else None
+        self.store_name = name
+        self.store = open_vector_store(
+            self.db_path, name, backend=self.backend,
+            embedding_function=embedding_function
         )
 
-        self.collection = self.client.get_or_create_collection(
-            name=name,
-            embedding_function=ef
-        )
+    @property
+    def manifest_path(self) -> Path:
+        """
+        The indexer's manifest lives with the store it describes, so each
+        backend / store path tracks its own indexed docs.
+        """
+        return store_directory(self.db_path, self.store_name, self.backend) / "index_manifest.sqlite"
+
+    @property
+    def collection(self):
+        # Backwards-compatible alias for the open store
+        return self.store
 
     # -----------------------------------------------------------
     # Index documents (ONLY run once using index_docs.py)
@@ -53,18 +148,57 @@ class Embedder:
         Adds documents into the vector database.
         docs must contain: id, text, title(optional)
         """
-        if self.collection is None:
+        if self.store is None:
             self.create_collection()
 
-        ids = [str(d["id"]) for d in docs]
-        texts = [d["text"] for d in docs]
-        metas = [{"title": d.get("title", None)} for d in docs]
+        ids, texts, metas = _doc_fields(docs)
 
-        self.collection.add(
-            ids=ids,
-            documents=texts,
-            metadatas=metas
-        )
+        self.store.add(ids, self.embed(texts), texts, metas)
+
+        self.add_lexical(docs)
+        self.save_lexical_index()
+
+    # -----------------------------------------------------------
+    # Incremental updates (used by the incremental indexer)
+    # -----------------------------------------------------------
+    def upsert_docs(self, docs):
+        """
+        Inserts new docs and re-embeds changed ones (matched by id).
+        The BM25 index is updated too; call save_lexical_index() to persist.
+        """
+        if not docs:
+            return
+        if self.store is None:
+            self.create_collection()
+
+        ids, texts, metas = _doc_fields(docs)
+
+        self.store.upsert(ids, self.embed(texts), texts, metas)
+
+        self.add_lexical(docs)
+
+    def delete_docs(self, ids):
+        """
+        Removes docs from the vector database by id.
+        """
+        if not ids:
+            return
+        if self.store is None:
+            self.create_collection()
+
+        self.store.delete([str(i) for i in ids])
+
+        self.lexical.remove_docs(ids)
+        self._lexical_dirty = True
+
+    def optimize_index(self) -> bool:
+        """
+        Offline index maintenance after indexing (e.g. compaction and IVF
+        rebuild for the NumPy backend). Returns True if anything was rebuilt.
+        """
+        if self.store is None:
+            self.create_collection()
+        return self.store.optimize()
 
     # -----------------------------------------------------------
     # QUERY DOCUMENTS
@@ -73,10 +207,47 @@ class Embedder:
         """
         Returns top-k matching documents.
         """
-        if self.collection is None:
+        return self.query_embeddings(self.embed([text]), k)
+
+    def embed(self, texts):
+        """
+        Embeds a batch of texts with the shared model in one call.
+        """
+        return get_model().encode(list(texts), show_progress_bar=False).tolist()
+
+    def get_docs(self, ids):
+        """
+        Fetches stored docs by id. Returns {id: {"text": ..., "meta": ...}}.
+        """
+        if not ids:
+            return {}
+        if self.store is None:
             self.create_collection()
 
-        return self.collection.query(
-            query_texts=[text],
-            n_results=k
-        )
+        got = self.store.get(ids)
+        metas = got.get("metadatas") or [{}] * len(got["ids"])
+        return {
+            doc_id: {"text": text, "meta": meta or {}}
+            for doc_id, text, meta in zip(got["ids"], got["documents"], metas)
+        }
+
+    def query_embeddings(self, embeddings, k: int = 5):
+        """
+        Top-k search for many precomputed query embeddings in one call.
+        Results hold one list per query, in input order.
+        """
+        if self.store is None:
+            self.create_collection()
+
+        return self.store.query(embeddings, k)
+
+
+def _doc_fields(docs):
+    """
+    Splits docs into the store's (ids, documents, metadatas) columns.
+    Chroma rejects None metadata values, so a missing title becomes "".
+    """
+    ids = [str(d["id"]) for d in docs]
+    texts = [d["text"] for d in docs]
+    metas = [{"title": d.get("title") or ""} for d in docs]
+    return ids, texts, metas
@@ -0,0 +1,330 @@
+import csv
+import json
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# ---------------------------------------------------------------
+# Paths (override via environment)
+# ---------------------------------------------------------------
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DATA_DIR = PROJECT_ROOT / "data"
+
+ENTITY_LEXICON_FILE = Path(os.getenv("ENTITY_LEXICON_FILE", DATA_DIR / "entity_lexicon.jsonl"))
+MOLECULES_FILE = DATA_DIR / "molecules.jsonl"
+# Optional full HGNC export (tab-separated, e.g. hgnc_complete_set.txt)
+HGNC_TSV_FILE = os.getenv("ENTITY_HGNC_TSV")
+
+BATCH_CHUNK_SIZE = 256
+
+GENE_TYPES = ("gene", "gene_family")
+
+
+def _spellings(form: str, case_sensitive: bool):
+    """
+    Exact spellings a form accepts: as written or ALL-CAPS when
+    case-sensitive ("REST", "CLOCK" and "MET" never match "rest", "clock"
+    or "met"), any casing (None) otherwise.
+    """
+    return frozenset({form, form.upper()}) if case_sensitive else None
+
+
+def _surface_variants(form: str):
+    """
+    Spelling variants of one surface form: "interleukin 6" also matches
+    "interleukin-6", and "IL-6" also matches "IL 6".
+    """
+    variants = {form}
+    if "-" in form:
+        variants.add(form.replace("-", " "))
+    if " " in form:
+        variants.add(form.replace(" ", "-"))
+    return variants
+
+
+def _fold(text: str) -> str:
+    """
+    Lowercases while keeping every character at its original offset.
+    """
+    folded = text.lower()
+    if len(folded) == len(text):
+        return folded
+    return "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+
+
+# ---------------------------------------------------------------
+# Aho-Corasick entity extractor
+# ---------------------------------------------------------------
+class EntityExtractor:
+    """
+    Dictionary-based entity tagger over an Aho-Corasick automaton.
+
+    Add entities (id, canonical symbol, type, aliases), call build(),
+    then extract(text) finds every dictionary form in one pass over the
+    lowercased text, linear in text length regardless of dictionary size.
+    Matches must sit on word boundaries. Symbols and aliases are
+    case-sensitive (as written, or all upper-case); full names match in
+    any casing. Overlaps resolve leftmost-longest.
+    """
+
+    def __init__(self):
+        self.entities = {}          # id → {"id", "symbol", "type"}
+        self.patterns = []          # [(form, entity_id, spellings or None, priority)]
+        self._form_index = {}       # folded form → pattern index
+        self._built = False
+
+    def __len__(self):
+        return len(self.patterns)
+
+    # -----------------------------------------------------------
+    # Dictionary
+    # -----------------------------------------------------------
+    def add(self, entity_id: str, symbol: str, type: str = "gene", aliases=(),
+            case_sensitive=None, names=()):
+        """
+        Registers an entity and its surface forms: the symbol and aliases
+        (case-sensitive) and full names (any casing). `case_sensitive`
+        overrides that for every form. The canonical symbol wins over
+        another entity's alias with the same spelling, and aliases over
+        names.
+        """
+        self.entities[entity_id] = {"id": entity_id, "symbol": symbol, "type": type}
+
+        forms = [(0, symbol, True)] + [(1, a, True) for a in aliases] + [(2, n, False) for n in names]
+        for priority, form, sensitive in forms:
+            form = (form or "").strip()
+            if not form:
+                continue
+            if case_sensitive is not None:
+                sensitive = case_sensitive
+            for variant in _surface_variants(form):
+                self._add_pattern(variant, entity_id, _spellings(variant, sensitive), priority)
+
+        self._built = False
+
+    def _add_pattern(self, form, entity_id, spellings, priority):
+        key = _fold(form)
+        existing = self._form_index.get(key)
+        if existing is not None:
+            _, old_id, old_spellings, old_priority = self.patterns[existing]
+            if old_id == entity_id and old_priority == priority:
+                # "K-RAS" and "K-Ras": one pattern accepting both spellings
+                merged = None if old_spellings is None or spellings is None else old_spellings | spellings
+                self.patterns[existing] = (form, entity_id, merged, priority)
+            elif priority < old_priority:
+                self.patterns[existing] = (form, entity_id, spellings, priority)
+            return
+        self._form_index[key] = len(self.patterns)
+        self.patterns.append((form, entity_id, spellings, priority))
+
+    # -----------------------------------------------------------
+    # Automaton
+    # -----------------------------------------------------------
+    def build(self):
+        """
+        Builds the trie, failure links and output links (BFS order).
+        """
+        goto = [{}]
+        output = [-1]           # pattern index ending exactly at this state
+
+        for idx, (form, *_rest) in enumerate(self.patterns):
+            state = 0
+            for ch in _fold(form):
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    output.append(-1)
+                state = nxt
+            output[state] = idx
+
+        fail = [0] * len(goto)
+        out_link = [-1] * len(goto)     # nearest proper suffix state with an output
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0) if goto[f].get(ch, 0) != nxt else 0
+                out_link[nxt] = fail[nxt] if output[fail[nxt]] >= 0 else out_link[fail[nxt]]
+                queue.append(nxt)
+
+        self._goto, self._fail, self._output, self._out_link = goto, fail, output, out_link
+        self._built = True
+        return self
+
+    # -----------------------------------------------------------
+    # Extraction
+    # -----------------------------------------------------------
+    def extract(self, text: str):
+        """
+        Entity mentions in `text`, in order:
+            [{"start", "end", "text", "id", "symbol", "type"}, ...]
+        """
+        if not text:
+            return []
+        if not self._built:
+            self.build()
+
+        goto, fail, output, out_link = self._goto, self._fail, self._output, self._out_link
+        folded = _fold(text)
+        n = len(text)
+
+        candidates = []         # (start, -length, pattern index)
+        state = 0
+        for i, ch in enumerate(folded):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+
+            hit = state if output[state] >= 0 else out_link[state]
+            while hit > 0:
+                idx = output[hit]
+                form, _, spellings, _ = self.patterns[idx]
+                start, end = i + 1 - len(form), i + 1
+                if self._accept(text, start, end, n, spellings):
+                    candidates.append((start, -len(form), idx))
+                hit = out_link[hit]
+
+        # Leftmost-longest, non-overlapping
+        mentions, last_end = [], 0
+        for start, neg_len, idx in sorted(candidates):
+            end = start - neg_len
+            if start < last_end:
+                continue
+            entity = self.entities[self.patterns[idx][1]]
+            mentions.append({"start": start, "end": end, "text": text[start:end], **entity})
+            last_end = end
+        return mentions
+
+    @staticmethod
+    def _accept(text, start, end, n, spellings):
+        if start > 0 and text[start - 1].isalnum():
+            return False
+        if end < n and text[end].isalnum():
+            return False
+        return spellings is None or text[start:end] in spellings
+
+    def extract_symbols(self, text: str, types=None):
+        """
+        Set of canonical symbols mentioned in `text` (optionally by type).
+        """
+        return {m["symbol"] for m in self.extract(text) if types is None or m["type"] in types}
+
+    def extract_ids(self, text: str, types=None):
+        """
+        Set of lexicon ids ("HGNC:6018") mentioned in `text` (optionally by type).
+        """
+        return {m["id"] for m in self.extract(text) if types is None or m["type"] in types}
+
+    def extract_batch(self, texts, n_jobs=1, chunk_size: int = BATCH_CHUNK_SIZE):
+        """
+        extract() over many texts, results in input order. With n_jobs != 1
+        chunks run in a process pool; each worker loads the default
+        extractor once (so this mode uses the default dictionary).
+        """
+        texts = list(texts)
+        if n_jobs == 1 or len(texts) <= chunk_size:
+            return [self.extract(t) for t in texts]
+
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            return [m for part in pool.map(_extract_chunk, chunks) for m in part]
+
+
+def _extract_chunk(texts):
+    extractor = get_entity_extractor()
+    return [extractor.extract(t) for t in texts]
+
+
+def extract_corpus(docs, extractor: EntityExtractor = None):
+    """
+    Streams (doc_id, mentions) over an iterable of docs (id, text, title).
+    """
+    extractor = extractor or get_entity_extractor()
+    for d in docs:
+        text = f"{d.get('title') or ''}\n{d.get('text', '')}"
+        yield str(d.get("id")), extractor.extract(text)
+
+
+# ---------------------------------------------------------------
+# Lexicon loaders
+# ---------------------------------------------------------------
+def load_lexicon_jsonl(extractor: EntityExtractor, path: Path = ENTITY_LEXICON_FILE):
+    """
+    JSONL rows: {"id", "symbol", "type", "aliases": [...], "names"?: [...],
+    "case_sensitive"?}
+    """
+    path = Path(path)
+    if not path.exists():
+        return extractor
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            extractor.add(row["id"], row["symbol"], row.get("type", "gene"),
+                          row.get("aliases", []), row.get("case_sensitive"), row.get("names", []))
+    return extractor
+
+
+def load_hgnc_tsv(extractor: EntityExtractor, path: Path):
+    """
+    HGNC complete-set export: uses hgnc_id, symbol, alias_symbol and
+    prev_symbol (case-sensitive) and name (any casing) columns
+    ("|"-separated lists). Withdrawn entries are skipped.
+    """
+    with Path(path).open("r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f, delimiter="\t"):
+            if row.get("status", "Approved") != "Approved":
+                continue
+            lists = {column: [a for a in (row.get(column) or "").strip('"').split("|") if a]
+                     for column in ("alias_symbol", "prev_symbol", "name")}
+            extractor.add(row["hgnc_id"], row["symbol"], "gene",
+                          lists["alias_symbol"] + lists["prev_symbol"], names=lists["name"])
+    return extractor
+
+
+def load_drug_names(extractor: EntityExtractor, path: Path = MOLECULES_FILE):
+    """
+    Drug names from molecules.jsonl ({"id", "name", ...}).
+    """
+    path = Path(path)
+    if not path.exists():
+        return extractor
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            mol = json.loads(line)
+            if mol.get("name"):
+                extractor.add(str(mol["id"]), mol["name"], "drug", case_sensitive=False)
+    return extractor
+
+
+_EXTRACTOR = None
+_EXTRACTOR_LOCK = threading.Lock()
+
+
+def get_entity_extractor() -> EntityExtractor:
+    """
+    Process-wide extractor: seed lexicon + drug names, plus the full HGNC
+    set when ENTITY_HGNC_TSV points to one. Built on first use.
+    """
+    global _EXTRACTOR
+    if _EXTRACTOR is None:
+        with _EXTRACTOR_LOCK:
+            if _EXTRACTOR is None:
+                extractor = EntityExtractor()
+                if HGNC_TSV_FILE and Path(HGNC_TSV_FILE).exists():
+                    load_hgnc_tsv(extractor, HGNC_TSV_FILE)
+                # Loaded after HGNC so curated symbols can claim alias spellings
+                load_lexicon_jsonl(extractor)
+                load_drug_names(extractor)
+                _EXTRACTOR = extractor.build()
+    return _EXTRACTOR
@@ -0,0 +1,211 @@
+import json
+import re
+
+
+# ---------------------------------------------------------------
+# INCREMENTAL JSON ARRAY PARSER (for streamed LLM output)
+# ---------------------------------------------------------------
+class JSONArrayStreamParser:
+    """
+    Incrementally extracts the objects of one JSON array from streamed text.
+
+    Feed chunks of the LLM response as they arrive; every element of
+    `"<array_key>": [ {...}, {...} ]` is returned as soon as its closing
+    brace has been received. Text before the array (code fences, stray
+    words) is ignored.
+
+        parser = JSONArrayStreamParser("hypotheses")
+        for chunk in stream:
+            for obj in parser.feed(chunk):
+                ...
+    """
+
+    def __init__(self, array_key: str):
+        self._start_re = re.compile(r'"%s"\s*:\s*\[' % re.escape(array_key))
+        self._buf = ""
+        self._pos = 0           # next char to scan
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._obj_start = None
+        self._in_string = False
+        self._escape = False
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def feed(self, chunk: str):
+        """
+        Consumes a chunk of text. Returns the list of objects completed by it.
+        """
+        if self._done or not chunk:
+            return []
+
+        self._buf += chunk
+        completed = []
+
+        if not self._in_array:
+            match = self._start_re.search(self._buf)
+            if match is None:
+                return []
+            self._in_array = True
+            self._pos = match.end()
+
+        buf = self._buf
+        i = self._pos
+        while i < len(buf):
+            ch = buf[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+
+            elif ch == '"':
+                self._in_string = True
+
+            elif ch == "{":
+                if self._depth == 0:
+                    self._obj_start = i
+                self._depth += 1
+
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0 and self._obj_start is not None:
+                    try:
+                        completed.append(json.loads(buf[self._obj_start:i + 1]))
+                    except json.JSONDecodeError:
+                        pass
+                    self._obj_start = None
+
+            elif ch == "]" and self._depth == 0:
+                self._done = True
+                break
+
+            i += 1
+
+        self._pos = i
+
+        # Drop consumed text that no pending object refers to
+        keep_from = self._obj_start if self._obj_start is not None else self._pos
+        self._buf = self._buf[keep_from:]
+        self._pos -= keep_from
+        if self._obj_start is not None:
+            self._obj_start = 0
+
+        return completed
+
+
+# ---------------------------------------------------------------
+# CHEAP REPAIR OF MALFORMED LLM JSON
+# ---------------------------------------------------------------
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_SMART_QUOTES = "“”"
+
+
+def _straighten_quotes(text: str) -> str:
+    """
+    Replaces curly double quotes used as JSON string delimiters
+    (“key”: “value”) with straight ones. Curly quotes and apostrophes
+    inside a properly quoted string ("patient’s", "“quoted”") are content
+    and stay as they are.
+    """
+    out = []
+    closers = None          # quotes that end the current string, None outside one
+    escape = False
+
+    for ch in text:
+        if closers is None:
+            if ch == '"' or ch in _SMART_QUOTES:
+                closers = '"' if ch == '"' else '"' + _SMART_QUOTES
+                ch = '"'
+        elif escape:
+            escape = False
+        elif ch == "\\":
+            escape = True
+        elif ch in closers:
+            closers = None
+            ch = '"'
+        out.append(ch)
+    return "".join(out)
+
+
+def _close_open_structures(text: str) -> str:
+    """
+    Closes an unterminated string and any open brackets, dropping a
+    dangling comma / key at the end (typical of truncated generations).
+    """
+    stack = []
+    in_string = False
+    escape = False
+
+    for ch in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]" and stack:
+            stack.pop()
+
+    if in_string:
+        text += '"'
+
+    text = re.sub(r'(,\s*"[^"]*"\s*:?\s*|,\s*|:\s*)$', "", text.rstrip())
+    return text + "".join(reversed(stack))
+
+
+def repair_json(raw: str):
+    """
+    Parses LLM output that is *almost* JSON.
+
+    Handles code fences, leading/trailing prose, curly quotes used as
+    delimiters, trailing commas and truncated output. Returns the parsed
+    value, or raises ValueError if nothing sensible can be recovered.
+    """
+    if not raw or not isinstance(raw, str):
+        raise ValueError("empty response")
+
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        pass
+
+    text = _FENCE_RE.sub("", raw.strip())
+
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        raise ValueError("no JSON object in response")
+    text = text[min(starts):]
+
+    end = max(text.rfind("}"), text.rfind("]"))
+    candidates = [text[:end + 1]] if end >= 0 else []
+    candidates.append(text)
+    # Curly quotes only change the text once it failed to parse as-is
+    candidates += [_straighten_quotes(c) for c in candidates if any(q in c for q in _SMART_QUOTES)]
+
+    for candidate in candidates:
+        for attempt in (candidate, _TRAILING_COMMA_RE.sub(r"\1", candidate)):
+            try:
+                return json.loads(attempt)
+            except json.JSONDecodeError:
+                pass
+
+        closed = _TRAILING_COMMA_RE.sub(r"\1", _close_open_structures(candidate))
+        try:
+            return json.loads(closed)
+        except json.JSONDecodeError:
+            pass
+
+    raise ValueError("could not repair JSON response")
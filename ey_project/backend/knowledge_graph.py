@@ -1,11 +1,17 @@
+import hashlib
 import json
 from pathlib import Path
 import networkx as nx
+import numpy as np
 from pyvis.network import Network
 import tempfile
 import os
 import re
 
+from backend.cooccurrence import get_cooccurrence_index, profile_text
+from backend.entity_extractor import GENE_TYPES, get_entity_extractor
+from backend.file_lock import locked
+
 # ============================================================
 # ROOT & DATA PATHS
 # ============================================================
@@ -13,30 +19,725 @@ ROOT = Path(__file__).resolve().parents[1]      # ey_project/
 DATA_DIR = ROOT / "data"
 DATA_DIR.mkdir(exist_ok=True)
 
-KG_JSON = DATA_DIR / "knowledge_graph.json"
+KG_JSON = DATA_DIR / "knowledge_graph.json"              # compacted snapshot
+KG_LOG = DATA_DIR / "knowledge_graph.log.jsonl"          # mutations since the snapshot
+
+# Fold the log into a new snapshot once it holds this many mutations
+KG_SNAPSHOT_EVERY = int(os.getenv("KG_SNAPSHOT_EVERY", 5000))
+
+_COUNTER_ID_RE = re.compile(r"^(HYP|doc)_(\d+)$")
+_TOKEN_RE = re.compile(r"[A-Za-z0-9]+", re.IGNORECASE)
+
+
+def _node_label(node) -> str:
+    return str(node.get("label") or node["id"])
+
+
+def _label_tokens(text: str):
+    """
+    Distinct casefolded alphanumeric runs, the units find_nodes matches on.
+    """
+    return list(dict.fromkeys(t.casefold() for t in _TOKEN_RE.findall(text)))
+
+
+def _term_pattern(term: str):
+    return re.compile(rf"(?<![A-Za-z0-9]){re.escape(term)}(?![A-Za-z0-9])", re.IGNORECASE)
 
 
 # ============================================================
-# LOAD KNOWLEDGE GRAPH
+# INDEXED KNOWLEDGE GRAPH
 # ============================================================
-def load_knowledge_graph():
+class KnowledgeGraph:
     """
-    Loads stored knowledge graph JSON into memory.
-    Returns: {"nodes": [...], "edges": [...]}
+    In-memory KG with a hash-indexed node table and adjacency lists.
+
+    - nodes: id → node dict; edges: list of edge dicts, deduplicated on
+      (source, target, label); out_edges / in_edges: id → edge indices
+    - label_index: label token → node ids, so find_nodes() only checks
+      nodes sharing a token with the term
+    - hypothesis / fallback doc IDs come from monotonic counters
+    - every mutation is queued for the append-only log; save() writes
+      only that delta and folds the log into a compact snapshot every
+      KG_SNAPSHOT_EVERY mutations
+    - save() first merges what other sessions saved since this one last
+      synced; ids this session minted that were taken meanwhile are
+      renumbered, and log seqs are assigned only then, under the lock
+
+    Still readable like the old dict: kg["nodes"], kg["edges"], kg.get(...).
     """
-    if KG_JSON.exists():
+
+    def __init__(self, json_path: Path = KG_JSON, log_path: Path = KG_LOG,
+                 snapshot_every: int = KG_SNAPSHOT_EVERY):
+        self.json_path = Path(json_path)
+        self.log_path = Path(log_path)
+        self.snapshot_every = snapshot_every
+        self._reset()
+
+    def _reset(self):
+        self.nodes = {}
+        self.edges = []
+        self.edge_keys = set()
+        self.out_edges = {}
+        self.in_edges = {}
+        self.label_index = {}
+        self.counters = {"HYP": 0, "doc": 0}
+        self._engine = None         # CSR snapshot, dropped by every mutation
+
+        self.version = 0            # mutations applied (snapshot + log + pending)
+        self.snapshot_version = 0   # mutations folded into the snapshot
+        self._pending = []          # log entries not yet saved
+        self._minted = set()        # ids from next_id() not yet saved
+        self._digest = hashlib.sha1()   # rolling hash of applied mutations
+
+        # What this session has seen on disk
+        self._snapshot_id = None
+        self._log_offset = 0
+        self._mark_synced()
+
+    def _mark_synced(self):
+        self.synced_version = self.version
+        self._synced_counters = dict(self.counters)
+        self._synced_digest = self._digest.copy()
+
+    # --------------------------------------------------------
+    # Dict-style compatibility
+    # --------------------------------------------------------
+    def __getitem__(self, key):
+        if key == "nodes":
+            return list(self.nodes.values())
+        if key == "edges":
+            return self.edges
+        raise KeyError(key)
+
+    def get(self, key, default=None):
         try:
-            return json.loads(KG_JSON.read_text())
+            return self[key]
+        except KeyError:
+            return default
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def to_dict(self):
+        return {"nodes": list(self.nodes.values()), "edges": list(self.edges)}
+
+    # --------------------------------------------------------
+    # Mutations
+    # --------------------------------------------------------
+    def next_id(self, prefix: str) -> str:
+        self.counters[prefix] = self.counters.get(prefix, 0) + 1
+        node_id = f"{prefix}_{self.counters[prefix]}"
+        self._minted.add(node_id)
+        return node_id
+
+    def add_node(self, node_id, label=None, type=None, **attrs) -> bool:
+        """
+        Adds a node unless it exists. Returns True if it was added.
+        """
+        if node_id in self.nodes:
+            return False
+        node = {"id": node_id, "label": label if label is not None else node_id, "type": type, **attrs}
+        self._apply({"op": "node", "node": node})
+        return True
+
+    def add_edge(self, source, target, label="") -> bool:
+        """
+        Adds a directed edge unless the same (source, target, label) exists.
+        """
+        if (source, target, label) in self.edge_keys:
+            return False
+        self._apply({"op": "edge", "edge": {"source": source, "target": target, "label": label}})
+        return True
+
+    def _apply(self, entry, record: bool = True):
+        if entry["op"] == "node":
+            node = entry["node"]
+            if node["id"] in self.nodes:
+                self._unindex_label(self.nodes[node["id"]])
+            self.nodes[node["id"]] = node
+            self._index_label(node)
+            self.out_edges.setdefault(node["id"], [])
+            self.in_edges.setdefault(node["id"], [])
+            self._bump_counter(node["id"])
+        else:
+            edge = entry["edge"]
+            key = (edge["source"], edge["target"], edge.get("label", ""))
+            if key in self.edge_keys:
+                return
+            self.edge_keys.add(key)
+            idx = len(self.edges)
+            self.edges.append(edge)
+            self.out_edges.setdefault(edge["source"], []).append(idx)
+            self.in_edges.setdefault(edge["target"], []).append(idx)
+
+        self.version += 1
+        self._engine = None
+        mutation = {k: v for k, v in entry.items() if k != "seq"}
+        self._digest.update(json.dumps(mutation, sort_keys=True).encode("utf-8"))
+        if record:
+            self._pending.append(entry)
+
+    def _index_label(self, node):
+        for token in _label_tokens(_node_label(node)):
+            self.label_index.setdefault(token, []).append(node["id"])
+
+    def _unindex_label(self, node):
+        for token in _label_tokens(_node_label(node)):
+            ids = self.label_index.get(token, [])
+            # Rollback removes the newest nodes first, so this is usually a pop
+            if ids and ids[-1] == node["id"]:
+                ids.pop()
+            elif node["id"] in ids:
+                ids.remove(node["id"])
+            if not ids:
+                self.label_index.pop(token, None)
+
+    def _bump_counter(self, node_id):
+        m = _COUNTER_ID_RE.match(str(node_id))
+        if m:
+            prefix, n = m.group(1), int(m.group(2))
+            self.counters[prefix] = max(self.counters.get(prefix, 0), n)
+
+    @property
+    def content_hash(self) -> str:
+        """
+        Changes with every applied mutation; identical graphs loaded in
+        different sessions share it.
+        """
+        return self._digest.hexdigest()
+
+    def degree(self, node_id) -> int:
+        return len(self.out_edges.get(node_id, ())) + len(self.in_edges.get(node_id, ()))
+
+    def neighbors(self, node_id, direction: str = "out"):
+        adj = self.out_edges if direction == "out" else self.in_edges
+        end = "target" if direction == "out" else "source"
+        return [self.edges[i][end] for i in adj.get(node_id, [])]
+
+    def find_nodes(self, term: str, node_type: str = None):
+        """
+        Node ids whose label mentions `term` as a whole word
+        (case-insensitive), oldest first. Only the nodes listed under the
+        term's rarest token are checked; the graph is never scanned
+        unless the term has no letters or digits.
+        """
+        tokens = _label_tokens(term)
+        if tokens:
+            candidates = min((self.label_index.get(t, []) for t in tokens), key=len)
+        else:
+            candidates = self.nodes
+
+        pattern = _term_pattern(term)
+        return [
+            n for n in candidates
+            if (node_type is None or (self.nodes[n].get("type") or "") == node_type)
+            and pattern.search(_node_label(self.nodes[n]))
+        ]
+
+    def query_engine(self) -> "KGQueryEngine":
+        """
+        CSR snapshot of the current graph. Mutations only drop it; it is
+        rebuilt by the first query that runs after the graph changed.
+        """
+        if self._engine is None:
+            self._engine = KGQueryEngine(self)
+        return self._engine
+
+    # --------------------------------------------------------
+    # Persistence: snapshot + append-only log
+    # --------------------------------------------------------
+    @classmethod
+    def load(cls, json_path: Path = KG_JSON, log_path: Path = KG_LOG, **kwargs):
+        """
+        Loads the snapshot (old {"nodes", "edges"} files included), then
+        replays logged mutations newer than it. A torn last log line
+        is ignored.
+        """
+        kg = cls(json_path, log_path, **kwargs)
+        with locked(kg.json_path):
+            kg._read_disk()
+        return kg
+
+    def _read_disk(self):
+        """
+        Replaces the in-memory graph with the snapshot + log on disk.
+        Caller holds the lock.
+        """
+        self._reset()
+        try:
+            st = os.stat(self.json_path)
+            self._snapshot_id = (st.st_ino, st.st_mtime_ns, st.st_size)
+            data = json.loads(self.json_path.read_text())
         except Exception:
-            return {"nodes": [], "edges": []}
-    return {"nodes": [], "edges": []}
+            data = {}
+
+        for node in data.get("nodes", []):
+            self._apply({"op": "node", "node": node}, record=False)
+        for edge in data.get("edges", []):
+            self._apply({"op": "edge", "edge": edge}, record=False)
+        for prefix, n in data.get("counters", {}).items():
+            self.counters[prefix] = max(self.counters.get(prefix, 0), n)
+        self.version = self.snapshot_version = data.get("version", self.version)
+
+        self._read_log()
+
+    def _read_log(self):
+        """
+        Applies complete log lines past `_log_offset` whose seq is newer
+        than what this session has. A torn last line is left for later.
+        """
+        if self.log_path.exists():
+            with self.log_path.open("rb") as f:
+                f.seek(self._log_offset)
+                chunk = f.read()
+
+            end = chunk.rfind(b"\n") + 1
+            for line in chunk[:end].splitlines():
+                try:
+                    entry = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    continue
+                if entry.get("seq", 0) > self.version:
+                    self._apply(entry, record=False)
+                    self.version = entry["seq"]
+            self._log_offset += end
+
+        self._mark_synced()
+
+    def _disk_changed(self) -> bool:
+        try:
+            st = os.stat(self.json_path)
+            snapshot_id = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            snapshot_id = None
+        log_size = self.log_path.stat().st_size if self.log_path.exists() else 0
+        return snapshot_id != self._snapshot_id or log_size != self._log_offset
+
+    def _sync(self):
+        """
+        Brings this session up to date with the disk. Unsaved mutations
+        are taken back out first and returned, to be re-applied on top.
+        Caller holds the lock.
+        """
+        if not self._disk_changed():
+            return []
+
+        pending, minted = self._rollback(), self._minted
+        try:
+            st = os.stat(self.json_path)
+            snapshot_id = (st.st_ino, st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            snapshot_id = None
+
+        if snapshot_id != self._snapshot_id:
+            # Another session compacted: start over from its snapshot
+            self._read_disk()
+        else:
+            self._read_log()
+        self._minted = minted
+        return pending
+
+    def _rollback(self):
+        """
+        Undoes unsaved mutations (all additions, newest first) and
+        returns them; the graph is back at its last synced state.
+        """
+        pending, self._pending = self._pending, []
+        for entry in reversed(pending):
+            if entry["op"] == "edge":
+                edge = self.edges.pop()
+                self.edge_keys.discard((edge["source"], edge["target"], edge.get("label", "")))
+                self.out_edges[edge["source"]].pop()
+                self.in_edges[edge["target"]].pop()
+                for adj, end in ((self.out_edges, edge["source"]), (self.in_edges, edge["target"])):
+                    if not adj[end] and end not in self.nodes:
+                        del adj[end]
+            else:
+                node_id = entry["node"]["id"]
+                self._unindex_label(self.nodes.pop(node_id))
+                if not self.out_edges.get(node_id):
+                    self.out_edges.pop(node_id, None)
+                if not self.in_edges.get(node_id):
+                    self.in_edges.pop(node_id, None)
+
+        self.version = self.synced_version
+        self._engine = None
+        self.counters = dict(self._synced_counters)
+        self._digest = self._synced_digest.copy()
+        return pending
+
+    def _rebase(self, pending):
+        """
+        Re-applies unsaved mutations on the synced graph. Minted ids
+        that another session has taken meanwhile get the next free one.
+        """
+        minted, self._minted = self._minted, set()
+        renamed = {}
+        for entry in pending:
+            if entry["op"] == "node":
+                node = dict(entry["node"])
+                if node["id"] in minted and node["id"] in self.nodes:
+                    renamed[node["id"]] = self.next_id(_COUNTER_ID_RE.match(node["id"]).group(1))
+                    node["id"] = renamed[node["id"]]
+                if node["id"] not in self.nodes:
+                    self._apply({"op": "node", "node": node})
+            else:
+                edge = dict(entry["edge"])
+                edge["source"] = renamed.get(edge["source"], edge["source"])
+                edge["target"] = renamed.get(edge["target"], edge["target"])
+                self._apply({"op": "edge", "edge": edge})
+
+    def _repair_log_tail(self):
+        """
+        Cuts a torn last line left by a crashed writer, so the next
+        append starts on a fresh line. Caller holds the lock.
+        """
+        if not self.log_path.exists():
+            return
+        with self.log_path.open("rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+
+            pos, end = size, 0
+            while pos > 0:
+                step = min(65536, pos)
+                pos -= step
+                f.seek(pos)
+                cut = f.read(step).rfind(b"\n")
+                if cut >= 0:
+                    end = pos + cut + 1
+                    break
+            f.truncate(end)
+        self._log_offset = min(self._log_offset, end)
+
+    def _save_locked(self):
+        """
+        Repairs a torn log tail, merges what other sessions saved since
+        our last sync, then assigns seqs and appends. Caller holds the lock.
+        """
+        self._repair_log_tail()
+        pending = self._sync()
+        if pending:
+            self._rebase(pending)
+        self._minted = set()
+
+        if self._pending:
+            first = self.synced_version + 1
+            lines = [
+                json.dumps({"seq": first + i, **entry}, ensure_ascii=False, separators=(",", ":"))
+                for i, entry in enumerate(self._pending)
+            ]
+            with self.log_path.open("ab") as f:
+                f.write(("\n".join(lines) + "\n").encode("utf-8"))
+                f.flush()
+                self._log_offset = f.tell()
+            self._pending = []
+        self._mark_synced()
+
+    def save(self):
+        """
+        Appends unsaved mutations to the log (O(delta)); compacts into a
+        fresh snapshot once the log is long enough.
+        """
+        if not self._pending:
+            return
+
+        with locked(self.json_path):
+            self._save_locked()
+            if self.version - self.snapshot_version >= self.snapshot_every:
+                self._write_snapshot()
+
+    def compact(self):
+        """
+        Writes a full snapshot of the merged state now and truncates the log.
+        """
+        with locked(self.json_path):
+            self._save_locked()
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        data = {
+            "version": self.version,
+            "counters": self.counters,
+            "nodes": list(self.nodes.values()),
+            "edges": self.edges,
+        }
+        tmp = self.json_path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+        os.replace(tmp, self.json_path)
+        # Snapshot is in place; the logged entries are now redundant
+        self.log_path.write_text("", encoding="utf-8")
+        self.snapshot_version = self.version
+
+        st = os.stat(self.json_path)
+        self._snapshot_id = (st.st_ino, st.st_mtime_ns, st.st_size)
+        self._log_offset = 0
+        self._mark_synced()
+
+
+# ============================================================
+# GRAPH QUERY ENGINE (CSR adjacency)
+# ============================================================
+class KGQueryEngine:
+    """
+    Read-only, array-backed snapshot of a KnowledgeGraph for queries.
+
+    Nodes are numbered 0..N-1; out- and in-adjacency are CSR arrays
+    (indptr, indices) with a parallel edge-type code per entry, so BFS
+    frontiers expand with vectorized gathers instead of per-edge Python.
+    Get one via kg.query_engine() (cached until the graph changes).
+    """
+
+    DIRECTIONS = ("out", "in", "both")
+
+    def __init__(self, kg: "KnowledgeGraph"):
+        self.kg = kg
+        self.graph_hash = kg.content_hash
+        self.ids = list(kg.nodes)
+        self.index = {node_id: i for i, node_id in enumerate(self.ids)}
+
+        self.node_types = sorted({kg.nodes[n].get("type") or "" for n in self.ids})
+        type_code = {t: i for i, t in enumerate(self.node_types)}
+        self.node_type = np.array([type_code[kg.nodes[n].get("type") or ""] for n in self.ids],
+                                  dtype=np.int16)
+
+        self.edge_types = sorted({e.get("label", "") for e in kg.edges})
+        label_code = {t: i for i, t in enumerate(self.edge_types)}
+
+        # Edges whose endpoints are not nodes are skipped
+        src, dst, etype = [], [], []
+        for e in kg.edges:
+            s_i, d_i = self.index.get(e["source"]), self.index.get(e["target"])
+            if s_i is None or d_i is None:
+                continue
+            src.append(s_i)
+            dst.append(d_i)
+            etype.append(label_code[e.get("label", "")])
+
+        src = np.array(src, dtype=np.int64)
+        dst = np.array(dst, dtype=np.int64)
+        etype = np.array(etype, dtype=np.int16)
+        self.n_edges = len(src)
+
+        self.out_indptr, self.out_indices, self.out_types = self._csr(src, dst, etype)
+        self.in_indptr, self.in_indices, self.in_types = self._csr(dst, src, etype)
+
+    def _csr(self, rows, cols, types):
+        order = np.argsort(rows, kind="stable")
+        counts = np.bincount(rows, minlength=len(self.ids))
+        indptr = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+        return indptr, cols[order].astype(np.int32), types[order]
+
+    # --------------------------------------------------------
+    # Helpers
+    # --------------------------------------------------------
+    def _type_mask(self, edge_types):
+        if edge_types is None:
+            return None
+        if isinstance(edge_types, str):
+            edge_types = [edge_types]
+        mask = np.zeros(max(1, len(self.edge_types)), dtype=bool)
+        for t in edge_types:
+            if t in self.edge_types:
+                mask[self.edge_types.index(t)] = True
+        return mask
+
+    def _expand(self, frontier, direction, type_mask):
+        """
+        All (neighbor, via) pairs of the frontier nodes as two arrays.
+        """
+        sides = []
+        if direction in ("out", "both"):
+            sides.append((self.out_indptr, self.out_indices, self.out_types))
+        if direction in ("in", "both"):
+            sides.append((self.in_indptr, self.in_indices, self.in_types))
+
+        nbrs, via = [], []
+        for indptr, indices, types in sides:
+            starts, ends = indptr[frontier], indptr[frontier + 1]
+            counts = ends - starts
+            total = int(counts.sum())
+            if not total:
+                continue
+            offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts)
+            pos = offsets + np.arange(total)
+            keep = type_mask[types[pos]] if type_mask is not None else slice(None)
+            nbrs.append(indices[pos][keep])
+            via.append(np.repeat(frontier, counts)[keep])
+
+        if not nbrs:
+            empty = np.zeros(0, dtype=np.int64)
+            return empty, empty
+        return np.concatenate(nbrs).astype(np.int64), np.concatenate(via).astype(np.int64)
+
+    def _bfs(self, start: int, direction, type_mask, max_hops=None, target=None, max_nodes=None):
+        """
+        Level-synchronous BFS. Returns (dist, parent) arrays (-1 = unreached).
+        """
+        n = len(self.ids)
+        dist = np.full(n, -1, dtype=np.int32)
+        parent = np.full(n, -1, dtype=np.int64)
+        dist[start] = 0
+        frontier = np.array([start], dtype=np.int64)
+        reached, hop = 1, 0
+
+        while len(frontier) and (max_hops is None or hop < max_hops):
+            nbrs, via = self._expand(frontier, direction, type_mask)
+            fresh = dist[nbrs] < 0
+            nbrs, via = nbrs[fresh], via[fresh]
+            nbrs, first = np.unique(nbrs, return_index=True)
+            if max_nodes is not None and reached + len(nbrs) > max_nodes:
+                nbrs, first = nbrs[:max_nodes - reached], first[:max_nodes - reached]
+
+            hop += 1
+            dist[nbrs] = hop
+            parent[nbrs] = via[first]
+            reached += len(nbrs)
+            frontier = nbrs
+
+            if target is not None and dist[target] >= 0:
+                break
+            if max_nodes is not None and reached >= max_nodes:
+                break
+
+        return dist, parent
+
+    def _check_direction(self, direction):
+        if direction not in self.DIRECTIONS:
+            raise ValueError(f"direction must be one of {self.DIRECTIONS}")
+
+    # --------------------------------------------------------
+    # Queries
+    # --------------------------------------------------------
+    def neighbors(self, node_id, direction: str = "both", edge_types=None):
+        self._check_direction(direction)
+        if node_id not in self.index:
+            return []
+        nbrs, _ = self._expand(np.array([self.index[node_id]]), direction, self._type_mask(edge_types))
+        return [self.ids[i] for i in np.unique(nbrs)]
+
+    def k_hop(self, node_id, k: int = 1, direction: str = "both", edge_types=None,
+              max_nodes: int = None):
+        """
+        Nodes within k edges of node_id → {id: hops}, nearest first
+        (the start node included at 0).
+        """
+        self._check_direction(direction)
+        if node_id not in self.index:
+            return {}
+        dist, _ = self._bfs(self.index[node_id], direction, self._type_mask(edge_types),
+                            max_hops=k, max_nodes=max_nodes)
+        found = np.flatnonzero(dist >= 0)
+        found = found[np.argsort(dist[found], kind="stable")]
+        return {self.ids[i]: int(dist[i]) for i in found}
+
+    def shortest_path(self, source, target, direction: str = "both", edge_types=None):
+        """
+        Node ids on one shortest (fewest-edge) path, or None if unreachable.
+        """
+        self._check_direction(direction)
+        if source not in self.index or target not in self.index:
+            return None
+        s_i, t_i = self.index[source], self.index[target]
+        dist, parent = self._bfs(s_i, direction, self._type_mask(edge_types), target=t_i)
+        if dist[t_i] < 0:
+            return None
+
+        path = [t_i]
+        while path[-1] != s_i:
+            path.append(int(parent[path[-1]]))
+        return [self.ids[i] for i in reversed(path)]
+
+    def degrees(self, direction: str = "both"):
+        self._check_direction(direction)
+        out_deg = np.diff(self.out_indptr)
+        in_deg = np.diff(self.in_indptr)
+        return {"out": out_deg, "in": in_deg, "both": out_deg + in_deg}[direction]
+
+    def top_degree(self, n: int = 10, direction: str = "both", node_type: str = None):
+        """
+        [(id, degree)] for the n best-connected nodes (optionally of one type).
+        """
+        deg = self.degrees(direction).astype(np.int64)
+        candidates = np.arange(len(self.ids))
+        if node_type is not None:
+            if node_type not in self.node_types:
+                return []
+            candidates = np.flatnonzero(self.node_type == self.node_types.index(node_type))
+        if len(candidates) > n:
+            candidates = candidates[np.argpartition(-deg[candidates], n - 1)[:n]]
+        candidates = candidates[np.argsort(-deg[candidates], kind="stable")]
+        return [(self.ids[i], int(deg[i])) for i in candidates]
+
+    def pagerank(self, damping: float = 0.85, iterations: int = 50, tol: float = 1e-8):
+        """
+        PageRank over out-edges by power iteration → {id: score}.
+        """
+        n = len(self.ids)
+        if n == 0:
+            return {}
+        out_deg = np.diff(self.out_indptr).astype(np.float64)
+        src = np.repeat(np.arange(n), np.diff(self.out_indptr))
+        dst = self.out_indices
+        dangling = out_deg == 0
+
+        rank = np.full(n, 1.0 / n)
+        for _ in range(iterations):
+            share = np.where(dangling, 0.0, rank / np.maximum(out_deg, 1))
+            new = np.bincount(dst, weights=share[src], minlength=n)
+            new = damping * (new + rank[dangling].sum() / n) + (1 - damping) / n
+            done = np.abs(new - rank).sum() < tol
+            rank = new
+            if done:
+                break
+        return {self.ids[i]: float(rank[i]) for i in range(n)}
+
+    def find_nodes(self, term: str, node_type: str = None):
+        """
+        Node ids whose label mentions `term` as a whole word (case-insensitive),
+        answered from the graph's label index.
+        """
+        return [n for n in self.kg.find_nodes(term, node_type) if n in self.index]
+
+    def documents_supporting(self, term: str, edge_type: str = "supports"):
+        """
+        Documents with a `supports` edge into any hypothesis that mentions
+        `term`, e.g. documents_supporting("STAT3").
+        """
+        hyps = [self.index[h] for h in self.find_nodes(term, node_type="hypothesis")]
+        if not hyps:
+            return []
+        nbrs, _ = self._expand(np.array(hyps, dtype=np.int64), "in", self._type_mask(edge_type))
+        nbrs = np.unique(nbrs)
+        if "document" in self.node_types:
+            nbrs = nbrs[self.node_type[nbrs] == self.node_types.index("document")]
+        return [self.ids[i] for i in nbrs]
+
+
+# ============================================================
+# LOAD KNOWLEDGE GRAPH
+# ============================================================
+def load_knowledge_graph():
+    """
+    Loads the stored knowledge graph (snapshot + mutation log).
+    Returns: KnowledgeGraph (kg["nodes"] / kg["edges"] still work)
+    """
+    return KnowledgeGraph.load()
 
 
 # ============================================================
 # SAVE KNOWLEDGE GRAPH
 # ============================================================
 def save_knowledge_graph(kg):
-    KG_JSON.write_text(json.dumps(kg, indent=2))
+    if isinstance(kg, KnowledgeGraph):
+        kg.save()
+        return
+    # Plain {"nodes", "edges"} dict
+    KG_JSON.write_text(json.dumps(kg, separators=(",", ":")))
 
 
 # ============================================================
@@ -45,103 +746,225 @@ def save_knowledge_graph(kg):
 def add_hypothesis_to_kg(kg, hypothesis_text, evidence_list):
     """
     Adds hypothesis node + evidence doc nodes + edges.
+    O(len(evidence_list)) on a KnowledgeGraph.
     """
+    if not isinstance(kg, KnowledgeGraph):
+        return _add_hypothesis_to_dict(kg, hypothesis_text, evidence_list)
 
-    # Create unique ID
-    hid = f"HYP_{len(kg['nodes']) + 1}"
+    hid = kg.next_id("HYP")
+    kg.add_node(hid, label=hypothesis_text, type="hypothesis")
 
-    kg["nodes"].append({
-        "id": hid,
-        "label": hypothesis_text,
-        "type": "hypothesis"
-    })
-
-    # Add evidence nodes
     for ev in evidence_list:
-        doc_id = ev.get("doc_id") or ev.get("source") or f"doc_{len(kg['nodes'])}"
+        doc_id = ev.get("doc_id") or ev.get("source") or kg.next_id("doc")
 
         # Create document node only once
-        if not any(n["id"] == doc_id for n in kg["nodes"]):
-            kg["nodes"].append({
-                "id": doc_id,
-                "label": doc_id,
-                "type": "document"
-            })
+        kg.add_node(doc_id, label=doc_id, type="document")
 
         # Edge: evidence → hypothesis
-        kg["edges"].append({
-            "source": doc_id,
-            "target": hid,
-            "label": "supports"
-        })
+        kg.add_edge(doc_id, hid, "supports")
+
+    return kg
+
+
+def _add_hypothesis_to_dict(kg, hypothesis_text, evidence_list):
+    """
+    Same as add_hypothesis_to_kg for a plain {"nodes", "edges"} dict.
+    """
+    node_ids = {n["id"] for n in kg["nodes"]}
+    hyp_numbers = [int(m.group(2)) for m in map(_COUNTER_ID_RE.match, node_ids) if m and m.group(1) == "HYP"]
+    hid = f"HYP_{max(hyp_numbers, default=0) + 1}"
+
+    kg["nodes"].append({"id": hid, "label": hypothesis_text, "type": "hypothesis"})
+    node_ids.add(hid)
+
+    for ev in evidence_list:
+        doc_id = ev.get("doc_id") or ev.get("source") or f"doc_{len(kg['nodes'])}"
+        if doc_id not in node_ids:
+            kg["nodes"].append({"id": doc_id, "label": doc_id, "type": "document"})
+            node_ids.add(doc_id)
+        kg["edges"].append({"source": doc_id, "target": hid, "label": "supports"})
 
     return kg
 
 
 # ============================================================
-# RENDER KNOWLEDGE GRAPH AS HTML (PyVis)
+# RENDER CACHE + SERVER-SIDE LAYOUT
 # ============================================================
-def draw_knowledge_graph_html(kg):
+# Rendered HTML per (graph hash, view); shared by sessions, never overwritten
+RENDER_CACHE_DIR = Path(os.getenv(
+    "KG_RENDER_CACHE_DIR", Path(tempfile.gettempdir()) / "ey_project_graph_renders"
+))
+RENDER_CACHE_MAX_FILES = int(os.getenv("KG_RENDER_CACHE_MAX_FILES", 200))
+KG_MAX_RENDER_NODES = int(os.getenv("KG_MAX_RENDER_NODES", 300))
+LAYOUT_SCALE = 600
+
+LOD_MODES = ("full", "top_degree", "neighborhood")
+
+
+def _render_key(kind: str, graph_hash: str, **view) -> str:
+    payload = json.dumps({"kind": kind, "graph": graph_hash, **view}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+def _cached_render(key: str, render) -> str:
     """
-    Creates an interactive PyVis HTML for display in Streamlit.
+    Returns the cached HTML path for `key`, rendering it once via
+    render(tmp_path) and publishing it atomically.
+    """
+    RENDER_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = RENDER_CACHE_DIR / f"{key}.html"
+    if path.exists():
+        return str(path)
+
+    fd, tmp = tempfile.mkstemp(dir=RENDER_CACHE_DIR, prefix=f"{key}.", suffix=".tmp.html")
+    os.close(fd)
+    try:
+        render(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    _prune_render_cache()
+    return str(path)
+
+
+def _prune_render_cache():
     """
+    Drops the oldest renders beyond RENDER_CACHE_MAX_FILES.
+    """
+    files = list(RENDER_CACHE_DIR.glob("*.html"))
+    if len(files) <= RENDER_CACHE_MAX_FILES:
+        return
 
-    G = nx.DiGraph()
+    def mtime(f):
+        try:
+            return f.stat().st_mtime
+        except FileNotFoundError:
+            return 0.0
 
-    # Add nodes
-    for n in kg.get("nodes", []):
-        G.add_node(
-            n["id"],
-            label=n.get("label", n["id"]),
-            title=n.get("label", "")
-        )
+    for old in sorted(files, key=mtime)[:len(files) - RENDER_CACHE_MAX_FILES]:
+        try:
+            old.unlink()
+        except FileNotFoundError:
+            pass
 
-    # Add edges
-    for e in kg.get("edges", []):
-        G.add_edge(e["source"], e["target"], label=e.get("label", ""))
 
-    # PyVis rendering
-    net = Network(height="420px", width="100%", directed=True, bgcolor="#FFFFFF")
-    net.barnes_hut()
-    net.from_nx(G)
+def _static_network(G, height: str = "420px") -> Network:
+    """
+    PyVis network with positions precomputed here (seeded spring layout),
+    so the browser runs no physics simulation.
+    """
+    pos = nx.spring_layout(G, seed=42, iterations=50) if len(G) else {}
 
-    # Style
+    net = Network(height=height, width="100%", directed=G.is_directed(), bgcolor="#FFFFFF")
+    net.from_nx(G.copy())   # from_nx writes default attributes into the graph
+    net.toggle_physics(False)
     for node in net.nodes:
-        if node["id"].startswith("HYP_"):
-            node["color"] = "#6c5ce7"
-            node["shape"] = "box"
-            node["borderWidth"] = 2
-        else:
-            node["color"] = "#00b894"
-            node["shape"] = "ellipse"
+        x, y = pos.get(node["id"], (0.0, 0.0))
+        node["x"] = float(x) * LAYOUT_SCALE
+        node["y"] = float(y) * LAYOUT_SCALE
+    return net
+
 
-    # Save temporary HTML
-    tmp = tempfile.gettempdir()
-    path = os.path.join(tmp, "knowledge_graph.html")
-    net.save_graph(path)
-    return path
+def _as_graph(kg) -> "KnowledgeGraph":
+    if isinstance(kg, KnowledgeGraph):
+        return kg
+    graph = KnowledgeGraph()
+    for node in kg.get("nodes", []):
+        graph._apply({"op": "node", "node": node}, record=False)
+    for edge in kg.get("edges", []):
+        graph._apply({"op": "edge", "edge": edge}, record=False)
+    return graph
 
 
 # ============================================================
-# ENTITY EXTRACTION FOR PATHWAY GRAPH
+# LEVEL-OF-DETAIL VIEWS
 # ============================================================
-KNOWN_GENES = {
-    "IL6", "JAK", "JAK1", "JAK2", "STAT3", "STAT1", "STAT5",
-    "EGFR", "VEGF", "TNFA", "TNF", "PI3K", "AKT", "MTOR"
-}
+def select_view_nodes(kg, mode: str = "full", center=None, hops: int = 1,
+                      max_nodes: int = KG_MAX_RENDER_NODES):
+    """
+    Node ids to draw for a view, at most max_nodes of them.
+        full          every node (falls back to top_degree when too big)
+        top_degree    the max_nodes best-connected nodes
+        neighborhood  BFS from `center` up to `hops` edges, either direction
+    """
+    kg = _as_graph(kg)
+    if mode not in LOD_MODES:
+        raise ValueError(f"unknown view mode: {mode!r}")
+
+    if mode == "neighborhood" and center in kg.nodes:
+        return list(kg.query_engine().k_hop(center, hops, max_nodes=max_nodes))
+
+    if mode == "full" and len(kg.nodes) <= max_nodes:
+        return list(kg.nodes)
+
+    return [n for n, _ in kg.query_engine().top_degree(max_nodes)]
+
+
+# ============================================================
+# RENDER KNOWLEDGE GRAPH AS HTML (PyVis)
+# ============================================================
+def draw_knowledge_graph_html(kg, mode: str = "full", center=None, hops: int = 1,
+                              max_nodes: int = KG_MAX_RENDER_NODES):
+    """
+    Creates an interactive PyVis HTML for display in Streamlit.
+    Rendered once per (graph content, view) and reused from the cache.
+    """
+    kg = _as_graph(kg)
+    key = _render_key("kg", kg.content_hash, mode=mode, center=center,
+                      hops=hops, max_nodes=max_nodes)
+
+    def render(path):
+        keep = set(select_view_nodes(kg, mode, center, hops, max_nodes))
 
-GENE_REGEX = r"\b[A-Z0-9\-]{3,8}\b"
+        G = nx.DiGraph()
 
+        # Add nodes
+        for node_id in keep:
+            n = kg.nodes[node_id]
+            G.add_node(
+                node_id,
+                label=n.get("label", node_id),
+                title=n.get("label", "")
+            )
 
+        # Add edges (only between drawn nodes)
+        for node_id in keep:
+            for i in kg.out_edges.get(node_id, []):
+                e = kg.edges[i]
+                if e["target"] in keep:
+                    G.add_edge(e["source"], e["target"], label=e.get("label", ""))
+
+        net = _static_network(G)
+
+        # Style
+        for node in net.nodes:
+            if node["id"].startswith("HYP_"):
+                node["color"] = "#6c5ce7"
+                node["shape"] = "box"
+                node["borderWidth"] = 2
+            else:
+                node["color"] = "#00b894"
+                node["shape"] = "ellipse"
+
+        net.save_graph(path)
+
+    return _cached_render(key, render)
+
+
+# ============================================================
+# ENTITY EXTRACTION FOR PATHWAY GRAPH
+# ============================================================
 def extract_entities(text: str):
     """
-    Extracts gene-like tokens using regex + whitelist.
+    Canonical gene / gene-family symbols mentioned in `text`
+    ("IL-6" → "IL6", "TNF-alpha" → "TNF"), via the dictionary extractor.
     """
     if not text:
         return set()
 
-    found = set(re.findall(GENE_REGEX, text))
-    return {g for g in found if g.upper() in KNOWN_GENES}
+    return get_entity_extractor().extract_symbols(text, types=GENE_TYPES)
 
 
 # ============================================================
@@ -149,32 +972,29 @@ def extract_entities(text: str):
 # ============================================================
 def build_dynamic_pathway_graph(hypotheses, docs):
     """
-    Builds a rough gene–gene pathway graph from hypotheses & docs.
+    Builds a weighted gene–gene co-occurrence graph for a query.
+
+    Retrieved docs are sliced out of the precomputed co-occurrence
+    index (see backend.cooccurrence); docs not indexed yet and the
+    hypothesis / evidence text are profiled on the fly.
+    Edges carry count, docs, pmi and weight attributes.
     """
+    index = get_cooccurrence_index()
 
-    G = nx.DiGraph()
-    entities = []
+    indexed = [str(d.get("id")) for d in docs if str(d.get("id")) in index.doc_entities]
+    extra = [profile_text(d.get("title") or "", d.get("text", ""))
+             for d in docs if str(d.get("id")) not in index.doc_entities]
 
-    # Extract from hypotheses
+    # Profile hypotheses (with their evidence snippets)
     for h in hypotheses:
-        entities += list(extract_entities(h.get("text", "")))
-
-        for ev in h.get("evidence", []):
-            entities += list(extract_entities(ev.get("snippet", "")))
+        snippets = " ".join(ev.get("snippet", "") for ev in h.get("evidence", []))
+        extra.append(profile_text(h.get("text", ""), snippets))
 
-    # Extract from docs
-    for d in docs:
-        entities += list(extract_entities(d.get("text", "")))
-
-    uniq = list(set(entities))
-
-    # Build simple pairwise edges
-    for i in range(len(uniq) - 1):
-        G.add_edge(uniq[i], uniq[i + 1])
+    G = index.subgraph(indexed, extra_profiles=extra)
 
     # Fallback graph if empty
     if len(G.nodes()) == 0:
-        fallback = [("IL6", "JAK"), ("JAK", "STAT3"), ("EGFR", "VEGF")]
+        fallback = [("IL6", "JAK"), ("JAK", "STAT3"), ("EGFR", "VEGFA")]
         for s, t in fallback:
             G.add_edge(s, t)
 
@@ -184,28 +1004,45 @@ def build_dynamic_pathway_graph(hypotheses, docs):
 # ============================================================
 # DRAW PATHWAY GRAPH AS HTML
 # ============================================================
-def draw_pathway_graph_html(G):
+def pathway_graph_hash(G) -> str:
+    payload = json.dumps({
+        "nodes": sorted(map(str, G.nodes())),
+        "edges": sorted((str(u), str(v), json.dumps(d, sort_keys=True, default=str))
+                        for u, v, d in G.edges(data=True)),
+    })
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def draw_pathway_graph_html(G, max_nodes: int = KG_MAX_RENDER_NODES):
     """
-    Renders dynamic pathway graph to HTML.
+    Renders dynamic pathway graph to HTML (cached per graph hash).
+    Only the max_nodes highest-degree genes are drawn.
     """
+    key = _render_key("pathway", pathway_graph_hash(G), max_nodes=max_nodes)
 
-    net = Network(height="420px", width="100%", directed=True, bgcolor="#FFFFFF")
-    net.barnes_hut()
-    net.from_nx(G)
+    def render(path):
+        H = G
+        if len(G) > max_nodes:
+            top = sorted(G.nodes(), key=lambda n: -G.degree(n))[:max_nodes]
+            H = G.subgraph(top)
 
-    # Style
-    for node in net.nodes:
-        node["shape"] = "dot"
-        node["color"] = "#0984e3"
-        node["size"] = 18
-        node["borderWidth"] = 2
-
-    for edge in net.edges:
-        edge["color"] = "#636e72"
-        edge["width"] = 2
-        edge["arrows"] = "to"
-
-    tmp = tempfile.gettempdir()
-    path = os.path.join(tmp, "dynamic_pathway.html")
-    net.save_graph(path)
-    return path
+        net = _static_network(H)
+
+        # Style
+        for node in net.nodes:
+            node["shape"] = "dot"
+            node["color"] = "#0984e3"
+            node["size"] = 18
+            node["borderWidth"] = 2
+
+        for edge in net.edges:
+            edge["color"] = "#636e72"
+            # Thicker edges for more co-mentions in the retrieved docs
+            edge["width"] = min(1 + edge.get("count", 1), 8)
+            edge["title"] = f"co-mentions: {edge.get('count', 0)}, PMI: {edge.get('pmi', 0)}"
+            if H.is_directed():
+                edge["arrows"] = "to"
+
+        net.save_graph(path)
+
+    return _cached_render(key, render)
@@ -0,0 +1,225 @@
+import math
+import os
+import pickle
+import re
+from array import array
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+# ---------------------------------------------------------------
+# Tokenizer (keeps gene / drug symbols intact: "STAT3", "IL-6" → "il6")
+# ---------------------------------------------------------------
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-/][a-z0-9]+)*")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "has",
+    "have", "in", "is", "it", "its", "of", "on", "or", "that", "the", "this",
+    "to", "was", "were", "which", "with",
+}
+
+
+def tokenize(text: str):
+    """
+    Lowercased word tokens. Hyphen/slash compounds emit their parts plus
+    the joined form, so "IL-6", "IL6" and "il-6" all match "il6".
+    """
+    tokens = []
+    for match in _TOKEN_RE.findall((text or "").lower()):
+        parts = re.split(r"[-/]", match)
+        if len(parts) > 1:
+            tokens.append("".join(parts))
+        tokens.extend(p for p in parts if len(p) > 1 and p not in STOPWORDS)
+    return tokens
+
+
+# ---------------------------------------------------------------
+# BM25 inverted index (array-backed postings, incremental)
+# ---------------------------------------------------------------
+class BM25Index:
+    """
+    In-process BM25 over an inverted index.
+
+    Postings are compact `array` columns (row ids + term frequencies) per
+    term; document lengths are precomputed. Adding a doc appends postings;
+    updating or removing one tombstones its row, and the index is rebuilt
+    without dead rows once they make up half of it.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids = []                   # row → doc id
+        self.id_to_row = {}                 # doc id → live row
+        self.alive = bytearray()            # row → 1 if live
+        self.doc_len = array("I")           # row → token count
+        self.vocab = {}                     # term → term index
+        self.post_rows = []                 # term index → array("I") of rows
+        self.post_tfs = []                  # term index → array("H") of tfs
+        self.total_len = 0
+        self.n_alive = 0
+
+    def __len__(self):
+        return self.n_alive
+
+    # -----------------------------------------------------------
+    # Updates
+    # -----------------------------------------------------------
+    def add_docs(self, docs):
+        """
+        Adds docs (id, text, title optional); an existing id is replaced.
+        """
+        for d in docs:
+            doc_id = str(d["id"])
+            self._tombstone(doc_id)
+
+            tokens = tokenize(f"{d.get('title') or ''} {d.get('text', '')}")
+            row = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+            self.id_to_row[doc_id] = row
+            self.alive.append(1)
+            self.doc_len.append(len(tokens))
+            self.total_len += len(tokens)
+            self.n_alive += 1
+
+            for term, tf in Counter(tokens).items():
+                idx = self.vocab.get(term)
+                if idx is None:
+                    idx = self.vocab[term] = len(self.post_rows)
+                    self.post_rows.append(array("I"))
+                    self.post_tfs.append(array("H"))
+                self.post_rows[idx].append(row)
+                self.post_tfs[idx].append(min(tf, 65535))
+
+        self._maybe_compact()
+
+    def remove_docs(self, ids):
+        for doc_id in ids:
+            self._tombstone(str(doc_id))
+        self._maybe_compact()
+
+    def _tombstone(self, doc_id: str):
+        row = self.id_to_row.pop(doc_id, None)
+        if row is None:
+            return
+        self.alive[row] = 0
+        self.total_len -= self.doc_len[row]
+        self.n_alive -= 1
+
+    def _maybe_compact(self):
+        dead = len(self.doc_ids) - self.n_alive
+        if dead > 1000 and dead > self.n_alive:
+            self.compact()
+
+    def compact(self):
+        """
+        Rebuilds postings without tombstoned rows.
+        """
+        alive = np.frombuffer(bytes(self.alive), dtype=np.uint8).astype(bool)
+        new_row = np.cumsum(alive) - 1
+
+        vocab, post_rows, post_tfs = {}, [], []
+        for term, idx in self.vocab.items():
+            rows = np.frombuffer(self.post_rows[idx], dtype=np.uint32)
+            keep = alive[rows]
+            if not keep.any():
+                continue
+            vocab[term] = len(post_rows)
+            post_rows.append(array("I", new_row[rows[keep]].astype(np.uint32).tobytes()))
+            post_tfs.append(array("H", np.frombuffer(self.post_tfs[idx], dtype=np.uint16)[keep].tobytes()))
+
+        self.doc_ids = [d for d, a in zip(self.doc_ids, alive) if a]
+        self.id_to_row = {d: i for i, d in enumerate(self.doc_ids)}
+        self.alive = bytearray(b"\x01" * len(self.doc_ids))
+        self.doc_len = array("I", np.frombuffer(self.doc_len, dtype=np.uint32)[alive].tobytes())
+        self.vocab, self.post_rows, self.post_tfs = vocab, post_rows, post_tfs
+
+    # -----------------------------------------------------------
+    # Search
+    # -----------------------------------------------------------
+    def search(self, query: str, k: int = 5):
+        """
+        Returns up to k (doc_id, bm25_score) pairs, best first.
+        """
+        if self.n_alive == 0 or k <= 0:
+            return []
+
+        terms = [self.vocab[t] for t in dict.fromkeys(tokenize(query)) if t in self.vocab]
+        if not terms:
+            return []
+
+        avgdl = self.total_len / self.n_alive or 1.0
+        doc_len = np.frombuffer(self.doc_len, dtype=np.uint32)
+        alive = np.frombuffer(self.alive, dtype=np.uint8).view(bool)
+
+        # Scores exist only for rows in some query term's postings
+        hit_rows, hit_scores = [], []
+        for idx in terms:
+            rows = np.frombuffer(self.post_rows[idx], dtype=np.uint32)
+            live = alive[rows]
+            rows = rows[live]
+            df = len(rows)
+            if df == 0:
+                continue
+            tfs = np.frombuffer(self.post_tfs[idx], dtype=np.uint16)[live].astype(np.float64)
+            idf = math.log(1 + (self.n_alive - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * doc_len[rows] / avgdl)
+            hit_rows.append(rows)
+            hit_scores.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+
+        if not hit_rows:
+            return []
+        rows, inverse = np.unique(np.concatenate(hit_rows), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(hit_scores), minlength=len(rows))
+
+        hits = np.flatnonzero(scores > 0)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+
+        return [(self.doc_ids[rows[h]], float(scores[h])) for h in hits]
+
+    # -----------------------------------------------------------
+    # Persistence
+    # -----------------------------------------------------------
+    def save(self, path: Path):
+        path = Path(path)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with tmp.open("wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path):
+        """
+        Loads a saved index, or returns an empty one if there is none.
+        """
+        path = Path(path)
+        if not path.exists():
+            return cls()
+        try:
+            with path.open("rb") as f:
+                index = pickle.load(f)
+        except Exception as e:
+            print(f"[bm25 index unreadable, starting empty] {e}")
+            return cls()
+        return index if isinstance(index, cls) else cls()
+
+
+# ---------------------------------------------------------------
+# Reciprocal rank fusion
+# ---------------------------------------------------------------
+RRF_K = int(os.getenv("RRF_K", 60))
+
+
+def reciprocal_rank_fusion(ranked_lists, k: int = RRF_K):
+    """
+    Merges ranked id lists: score(id) = Σ 1 / (k + rank).
+    Returns ids sorted by fused score, best first.
+    """
+    fused = {}
+    for ranking in ranked_lists:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused, key=lambda d: -fused[d])
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+# ---------------------------------------------------------------
+# Paths + limits (override via environment)
+# ---------------------------------------------------------------
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DATA_DIR = PROJECT_ROOT / "data"
+
+LLM_CACHE_PATH = Path(os.getenv("LLM_CACHE_PATH", DATA_DIR / "llm_cache.sqlite"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", 7 * 24 * 3600))          # seconds
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", 256))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 50000))
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") not in ("0", "false", "no")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key         TEXT PRIMARY KEY,
+    model       TEXT NOT NULL,
+    response    TEXT NOT NULL,
+    size        INTEGER NOT NULL,
+    created_at  REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at);
+CREATE INDEX IF NOT EXISTS idx_responses_created ON responses(created_at);
+
+-- Running entry count / byte total, so eviction checks never scan the table
+CREATE TABLE IF NOT EXISTS totals (
+    id      INTEGER PRIMARY KEY CHECK (id = 0),
+    entries INTEGER NOT NULL,
+    bytes   INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO totals
+    SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM responses;
+CREATE TRIGGER IF NOT EXISTS responses_insert AFTER INSERT ON responses BEGIN
+    UPDATE totals SET entries = entries + 1, bytes = bytes + NEW.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS responses_delete AFTER DELETE ON responses BEGIN
+    UPDATE totals SET entries = entries - 1, bytes = bytes - OLD.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS responses_resize AFTER UPDATE OF size ON responses BEGIN
+    UPDATE totals SET bytes = bytes - OLD.size + NEW.size WHERE id = 0;
+END;
+"""
+
+
+def make_key(model: str, prompt: str, options=None, format=None) -> str:
+    """
+    Content address for one generation: (model, prompt hash, options, format).
+    """
+    prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    fields = {"model": model, "prompt": prompt_hash, "options": options or {}}
+    if format is not None:
+        fields["format"] = format
+    payload = json.dumps(fields, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ---------------------------------------------------------------
+# SQLite response cache (shared across processes)
+# ---------------------------------------------------------------
+class LLMCache:
+    """
+    Persistent LLM response cache with TTL and LRU size eviction.
+
+    SQLite in WAL mode lets every Streamlit session and worker process
+    share hits. Each thread gets its own connection. Entry count and
+    byte total are kept up to date by triggers, so a put() checks the
+    limits in O(1) instead of scanning the table.
+    """
+
+    def __init__(self, path: Path = LLM_CACHE_PATH, ttl: float = LLM_CACHE_TTL,
+                 max_bytes: int = int(LLM_CACHE_MAX_MB * 1024 * 1024),
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+        with self._conn() as conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    # -----------------------------------------------------------
+    # Lookup
+    # -----------------------------------------------------------
+    def get(self, key: str):
+        """
+        Returns the cached response, or None on miss / expiry.
+        """
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        response, created_at = row
+        now = time.time()
+
+        with conn:
+            if self.ttl and now - created_at > self.ttl:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+        return response
+
+    # -----------------------------------------------------------
+    # Insert + eviction
+    # -----------------------------------------------------------
+    def put(self, key: str, model: str, response: str):
+        now = time.time()
+        size = len(response.encode("utf-8"))
+
+        conn = self._conn()
+        with conn:
+            # An upsert, not INSERT OR REPLACE: the replaced row's delete
+            # trigger would not fire and the totals would drift
+            conn.execute(
+                "INSERT INTO responses "
+                "(key, model, response, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET model = excluded.model, "
+                "response = excluded.response, size = excluded.size, "
+                "created_at = excluded.created_at, accessed_at = excluded.accessed_at",
+                (key, model, response, size, now, now),
+            )
+        self.evict()
+
+    def evict(self):
+        """
+        Drops expired entries, then least-recently-used ones until the
+        cache is within max_entries and max_bytes.
+        """
+        conn = self._conn()
+        with conn:
+            if self.ttl:
+                conn.execute(
+                    "DELETE FROM responses WHERE created_at < ?",
+                    (time.time() - self.ttl,),
+                )
+
+            count, total = self.totals(conn)
+            while count > self.max_entries or total > self.max_bytes:
+                # Drop ~10% of the oldest entries per round
+                batch = max(1, count // 10, count - self.max_entries)
+                conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    "SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                    (batch,),
+                )
+                count, total = self.totals(conn)
+
+    def totals(self, conn: sqlite3.Connection = None):
+        """
+        (entries, bytes) currently cached.
+        """
+        return (conn or self._conn()).execute(
+            "SELECT entries, bytes FROM totals WHERE id = 0"
+        ).fetchone()
+
+    def clear(self):
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM responses")
+
+
+_LLM_CACHE = None
+
+
+def get_llm_cache():
+    """
+    Process-wide cache instance, or None if caching is disabled
+    or the cache file cannot be opened.
+    """
+    global _LLM_CACHE
+    if not LLM_CACHE_ENABLED:
+        return None
+    if _LLM_CACHE is None:
+        try:
+            _LLM_CACHE = LLMCache()
+        except sqlite3.Error as e:
+            print(f"[llm cache disabled] {e}")
+            return None
+    return _LLM_CACHE
@@ -0,0 +1,303 @@
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# ---------------------------------------------------------------
+# Configuration (override via environment)
+# ---------------------------------------------------------------
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434").rstrip("/")
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", 8))
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", 30))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+# ---------------------------------------------------------------
+# Typed errors
+# ---------------------------------------------------------------
+class LLMError(Exception):
+    """Base class for every LLM client failure."""
+
+
+class LLMConnectionError(LLMError):
+    """Ollama could not be reached."""
+
+
+class LLMTimeoutError(LLMError):
+    """Ollama accepted the request but did not answer in time."""
+
+
+class LLMHTTPError(LLMError):
+    """Ollama answered with a non-success HTTP status."""
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"HTTP {status_code}: {message}")
+        self.status_code = status_code
+
+
+class LLMResponseError(LLMError):
+    """Ollama answered with a body that could not be decoded."""
+
+
+class LLMOverloadedError(LLMError):
+    """Too many requests already in flight; the call was shed."""
+
+
+class LLMCircuitOpenError(LLMError):
+    """Recent calls kept failing; the circuit breaker is refusing calls."""
+
+
+# ---------------------------------------------------------------
+# Circuit breaker
+# ---------------------------------------------------------------
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and refuses calls
+    for `reset_timeout` seconds. Then a single trial call is let through
+    (half-open): success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            if self._trial_in_progress:
+                return False
+            self._trial_in_progress = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_progress = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_progress = False
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+    def release_trial(self):
+        """
+        Ends a half-open trial that finished with no verdict (e.g. a
+        stream abandoned by its consumer), so the next call may try.
+        """
+        with self._lock:
+            self._trial_in_progress = False
+
+
+# ---------------------------------------------------------------
+# Ollama client
+# ---------------------------------------------------------------
+class OllamaClient:
+    """
+    Pooled, resilient client for Ollama's /api/generate.
+
+        - one keep-alive requests.Session shared by all threads
+        - at most `max_in_flight` concurrent requests; callers wait up to
+          `queue_timeout` seconds for a slot, then get LLMOverloadedError
+        - retries with exponential backoff + jitter on connection errors,
+          timeouts and 429/5xx responses
+        - a circuit breaker that fails fast while Ollama is down
+    """
+
+    def __init__(self, host: str = OLLAMA_HOST, max_in_flight: int = LLM_MAX_IN_FLIGHT,
+                 queue_timeout: float = LLM_QUEUE_TIMEOUT, max_retries: int = LLM_MAX_RETRIES,
+                 connect_timeout: float = 5.0, read_timeout: float = 120.0,
+                 backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 breaker: CircuitBreaker = None):
+        self.host = host.rstrip("/")
+        self.generate_url = f"{self.host}/api/generate"
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.timeout = (connect_timeout, read_timeout)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_in_flight)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        self.session.close()
+
+    # -----------------------------------------------------------
+    # Backpressure
+    # -----------------------------------------------------------
+    @contextmanager
+    def _slot(self):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise LLMOverloadedError(
+                f"no free LLM slot after {self.queue_timeout:.0f}s"
+            )
+        try:
+            yield
+        finally:
+            self._slots.release()
+
+    def _backoff(self, attempt: int):
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        time.sleep(delay * random.uniform(0.5, 1.0))
+
+    # -----------------------------------------------------------
+    # Request with retries + circuit breaker
+    # -----------------------------------------------------------
+    def _post(self, payload: dict, stream: bool) -> requests.Response:
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            if not self.breaker.allow():
+                raise LLMCircuitOpenError(
+                    f"circuit open after repeated failures: {last_error or 'see earlier errors'}"
+                )
+
+            try:
+                response = self.session.post(
+                    self.generate_url, json=payload,
+                    stream=stream, timeout=self.timeout,
+                )
+            except requests.Timeout as e:
+                last_error = LLMTimeoutError(str(e))
+            except requests.ConnectionError as e:
+                last_error = LLMConnectionError(str(e))
+            except BaseException:
+                # Anything else (bad URL, interrupt): no verdict on Ollama itself
+                self.breaker.release_trial()
+                raise
+            else:
+                if response.status_code < 400:
+                    return response
+
+                error = LLMHTTPError(response.status_code, response.text[:200])
+                response.close()
+                if response.status_code not in RETRYABLE_STATUS:
+                    # Client errors (bad model name, bad payload) will not fix themselves
+                    self.breaker.record_success()
+                    raise error
+                last_error = error
+
+            self.breaker.record_failure()
+            if attempt < self.max_retries:
+                self._backoff(attempt)
+
+        raise last_error
+
+    def _payload(self, prompt, model, options, format, stream):
+        payload = {"model": model, "prompt": prompt, "stream": stream}
+        if options:
+            payload["options"] = options
+        if format is not None:
+            payload["format"] = format
+        return payload
+
+    # -----------------------------------------------------------
+    # Public API
+    # -----------------------------------------------------------
+    def generate(self, prompt: str, model: str, options: dict = None,
+                 format=None) -> str:
+        """
+        Blocking generation. Returns the response text.
+        """
+        payload = self._payload(prompt, model, options, format, stream=False)
+
+        with self._slot():
+            response = self._post(payload, stream=False)
+            try:
+                data = response.json()
+            except ValueError as e:
+                self.breaker.record_failure()
+                raise LLMResponseError(f"invalid JSON from Ollama: {e}") from e
+            finally:
+                response.close()
+
+        self.breaker.record_success()
+        return data.get("response", "")
+
+    def stream(self, prompt: str, model: str, options: dict = None, format=None):
+        """
+        Streaming generation. Yields text fragments as they arrive.
+        The in-flight slot is held until the stream is exhausted or closed.
+        """
+        payload = self._payload(prompt, model, options, format, stream=True)
+
+        with self._slot():
+            response = self._post(payload, stream=True)
+            finished = False
+            try:
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if data.get("error"):
+                        self.breaker.record_failure()
+                        raise LLMResponseError(data["error"])
+                    token = data.get("response", "")
+                    if token:
+                        yield token
+                    if data.get("done"):
+                        break
+                finished = True
+            except requests.Timeout as e:
+                self.breaker.record_failure()
+                raise LLMTimeoutError(str(e)) from e
+            except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError) as e:
+                self.breaker.record_failure()
+                raise LLMConnectionError(str(e)) from e
+            except ValueError as e:
+                self.breaker.record_failure()
+                raise LLMResponseError(f"invalid stream line from Ollama: {e}") from e
+            finally:
+                response.close()
+                if not finished:
+                    # Abandoned (GeneratorExit) or failed: never leave a trial hanging
+                    self.breaker.release_trial()
+
+        self.breaker.record_success()
+
+
+_LLM_CLIENT = None
+_LLM_CLIENT_LOCK = threading.Lock()
+
+
+def get_llm_client() -> OllamaClient:
+    """
+    Process-wide client, so every Streamlit session shares one
+    connection pool, one in-flight limit and one circuit breaker.
+    """
+    global _LLM_CLIENT
+    with _LLM_CLIENT_LOCK:
+        if _LLM_CLIENT is None:
+            _LLM_CLIENT = OllamaClient()
+        return _LLM_CLIENT
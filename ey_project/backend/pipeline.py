@@ -0,0 +1,271 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from backend.active_learning import rerank_hypotheses
+from backend.agents import LLM_MAX_CONCURRENCY, literature_agent, run_hypothesis_tasks
+from backend.knowledge_graph import build_dynamic_pathway_graph
+from backend.llm_client import get_llm_client
+
+# ---------------------------------------------------------------
+# Worker pool size (override via environment)
+# Each query also fans out its own LLM calls. The shared LLM client
+# drops calls that wait too long for one of its in-flight slots, so
+# run_batch splits those slots between workers (see llm_budget()).
+# ---------------------------------------------------------------
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", 4))
+
+
+def llm_budget(workers: int, max_in_flight: int = None):
+    """
+    (query workers, LLM calls per query) whose product fits the LLM
+    client's in-flight slots: batch calls then wait on Ollama, never in
+    the client's queue where they would time out.
+    """
+    if max_in_flight is None:
+        max_in_flight = get_llm_client().max_in_flight
+    workers = max(1, min(workers, max_in_flight))
+    return workers, max(1, min(LLM_MAX_CONCURRENCY, max_in_flight // workers))
+
+
+# ---------------------------------------------------------------
+# QUERY FILE
+# ---------------------------------------------------------------
+def load_queries(path: Path, stats: dict = None):
+    """
+    Yields (query_id, query_text) from a JSONL file.
+
+    id:    "id", "request_id" or "query_id" (else "line-<n>")
+    query: "query", else "title", else "body" / "text"
+    Blank or unparsable lines are skipped; the latter are counted in
+    stats["unparsable"] when `stats` is given.
+    """
+    with Path(path).open("r", encoding="utf-8") as f:
+        for n, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                if stats is not None:
+                    stats["unparsable"] = stats.get("unparsable", 0) + 1
+                continue
+
+            qid = row.get("id") or row.get("request_id") or row.get("query_id") or f"line-{n}"
+            text = row.get("query") or row.get("title") or row.get("body") or row.get("text")
+            if text:
+                yield str(qid), text
+
+
+# ---------------------------------------------------------------
+# ONE QUERY, END TO END
+# ---------------------------------------------------------------
+def _task_failed(task: str, value) -> bool:
+    """
+    run_hypothesis_tasks reports LLM failures in-band: an {"error": ...}
+    score, or an "LLM_UNAVAILABLE (...)" / "ERROR: ..." experiment.
+    """
+    if task == "score":
+        return not isinstance(value, dict) or "error" in value
+    return not isinstance(value, str) or value.startswith(("LLM_UNAVAILABLE", "ERROR:"))
+
+
+def run_query(query: str, query_id: str = None, tasks: bool = True,
+              llm_concurrency: int = LLM_MAX_CONCURRENCY):
+    """
+    literature_agent → rerank → evidence score + experiment per
+    hypothesis (at most `llm_concurrency` LLM calls at once) → pathway
+    graph, with per-stage timings (ms).
+
+    Returns one JSON-serializable result; status is "ok", "partial"
+    (some scores / experiments failed, listed in "failed_tasks") or "error".
+    """
+    timings = {}
+    result = {"id": query_id, "query": query, "status": "ok"}
+    started = time.perf_counter()
+
+    def stage(name, t0):
+        timings[f"{name}_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+
+    try:
+        t0 = time.perf_counter()
+        parsed, docs = literature_agent(query)
+        stage("literature", t0)
+
+        result["docs"] = [d["id"] for d in docs]
+        result["context_report"] = parsed.get("context_report")
+
+        if "hypotheses" not in parsed:
+            result["status"] = "error"
+            result["error"] = {k: v for k, v in parsed.items() if k != "context_report"}
+        else:
+            t0 = time.perf_counter()
+            hypotheses = rerank_hypotheses(parsed["hypotheses"])
+            stage("rerank", t0)
+
+            if tasks:
+                t0 = time.perf_counter()
+                items = [
+                    (h.get("text", ""), [e.get("snippet", "")[:300] for e in h.get("evidence", [])])
+                    for h in hypotheses
+                ]
+                failed = []
+                for i, task, value in run_hypothesis_tasks(items, max_workers=llm_concurrency):
+                    hypotheses[i][task] = value
+                    if _task_failed(task, value):
+                        failed.append({"index": i, "task": task})
+                stage("score_experiment", t0)
+                if failed:
+                    result["status"] = "partial"
+                    result["failed_tasks"] = sorted(failed, key=lambda f: (f["index"], f["task"]))
+
+            result["hypotheses"] = hypotheses
+
+            t0 = time.perf_counter()
+            G = build_dynamic_pathway_graph(hypotheses, docs)
+            result["pathway_edges"] = [
+                {"source": a, "target": b, **data} for a, b, data in G.edges(data=True)
+            ]
+            stage("pathway", t0)
+
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = {"error_type": type(e).__name__, "detail": str(e)}
+
+    stage("total", started)
+    result["timings"] = timings
+    return result
+
+
+# ---------------------------------------------------------------
+# RESULTS FILE (append-only, resumable)
+# ---------------------------------------------------------------
+def repair_tail(path: Path):
+    """
+    Cuts a torn last line left by a crash, so new results start on a
+    clean line.
+    """
+    path = Path(path)
+    if not path.exists():
+        return
+    with path.open("rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        if not size:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        f.seek(0)
+        f.truncate(f.read().rfind(b"\n") + 1)
+
+
+def completed_ids(path: Path):
+    """
+    Ids with an "ok" result in the output file ("partial" and "error"
+    results are retried). Repairs a torn last line first.
+    """
+    path = Path(path)
+    if not path.exists():
+        return set()
+
+    repair_tail(path)
+    done = set()
+    with path.open("rb") as f:
+        lines = f.read().splitlines()
+    for line in lines:
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if row.get("status") == "ok":
+            done.add(str(row.get("id")))
+    return done
+
+
+class ResultWriter:
+    """
+    Appends one JSON line per result; thread-safe, flushed per line.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._f = self.path.open("a", encoding="utf-8")
+
+    def write(self, result):
+        line = json.dumps(result, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._f.write(line)
+            self._f.flush()
+            os.fsync(self._f.fileno())
+
+    def close(self):
+        self._f.close()
+
+
+# ---------------------------------------------------------------
+# BATCH RUN
+# ---------------------------------------------------------------
+def run_batch(input_path: Path, output_path: Path, workers: int = PIPELINE_WORKERS,
+              resume: bool = True, limit: int = None, tasks: bool = True, progress=None):
+    """
+    Runs every query in `input_path` on a bounded thread pool and appends
+    each result to `output_path` as soon as it finishes. `workers` is
+    capped by llm_budget() so no LLM call times out waiting for a slot
+    of the shared client. With `resume`,
+    ids already completed ("ok") in the output file are skipped; `limit`
+    caps how many new queries are run.
+
+    `progress(result)` is called after each write. Returns counters:
+    total, skipped, ok, partial, error, unparsable.
+    """
+    repair_tail(output_path)
+    done = completed_ids(output_path) if resume else set()
+    stats = {"total": 0, "skipped": 0, "ok": 0, "partial": 0, "error": 0, "unparsable": 0}
+    workers, llm_concurrency = llm_budget(workers)
+
+    writer = ResultWriter(output_path)
+    max_in_flight = workers * 2
+    scheduled = set()
+
+    def finish(future):
+        result = future.result()
+        writer.write(result)
+        stats[result["status"]] += 1
+        if progress:
+            progress(result)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            in_flight = set()
+            for qid, text in load_queries(input_path, stats):
+                stats["total"] += 1
+                if qid in done or qid in scheduled:
+                    stats["skipped"] += 1
+                    continue
+                if limit is not None and len(scheduled) >= limit:
+                    stats["total"] -= 1
+                    break
+                scheduled.add(qid)
+
+                # Bounded queue: never read far ahead of the workers
+                if len(in_flight) >= max_in_flight:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        finish(future)
+
+                in_flight.add(pool.submit(run_query, text, qid, tasks, llm_concurrency))
+
+            while in_flight:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    finish(future)
+    finally:
+        writer.close()
+
+    return stats
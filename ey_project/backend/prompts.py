@@ -47,3 +47,18 @@ Avoid providing prohibited, hazardous, or actionable wet lab details.
 
 Return plain text only (no JSON).
 """
+
+BATCH_SCORER_PROMPT = """
+You are an evidence evaluation model.
+
+You are given several numbered hypotheses, each with its own evidence.
+Score EVERY hypothesis from 0 to 1 based only on the strength of its own evidence.
+
+Return ONLY valid JSON, with one entry per hypothesis index:
+
+{
+  "scores": [
+    { "index": 0, "score": 0.0, "reason": "brief justification" }
+  ]
+}
+"""
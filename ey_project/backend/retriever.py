@@ -1,19 +1,140 @@
-from backend.embedder import Embedder
+import os
+import threading
+from collections import OrderedDict
+
+from backend.embedder import Embedder, warm_up as warm_up_model
+from backend.lexical_index import reciprocal_rank_fusion
+
+# ---------------------------------------------------------------
+# Lazily create the embedder ONCE per process
+# Importing this module is cheap; the DB client is opened on the
+# first retrieve() and the model loads on the first embedding.
+# ---------------------------------------------------------------
+_EMBEDDER = None
+_EMBEDDER_LOCK = threading.Lock()
+
+
+def get_embedder() -> Embedder:
+    global _EMBEDDER
+    if _EMBEDDER is None:
+        with _EMBEDDER_LOCK:
+            if _EMBEDDER is None:
+                emb = Embedder()
+                emb.create_collection()
+                _EMBEDDER = emb
+    return _EMBEDDER
+
+
+def warm_up():
+    """
+    Optional: open the collection and load the model ahead of the first query.
+    """
+    get_embedder()
+    warm_up_model()
+
+
+# ---------------------------------------------------------------
+# QUERY EMBEDDING CACHE (LRU)
+# ---------------------------------------------------------------
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 4096))
+
+# Fuse BM25 hits with dense hits (reciprocal rank fusion)
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "1") not in ("0", "false", "no")
+
+
+class EmbeddingLRU:
+    """
+    Thread-safe LRU map from query text to its embedding.
+    """
+
+    def __init__(self, maxsize: int = QUERY_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+
+_QUERY_CACHE = EmbeddingLRU()
+
+
+def embed_queries(texts):
+    """
+    Embeddings for `texts`, in order. Cached queries are reused and all
+    misses are encoded together in one model call.
+    """
+    texts = list(texts)
+    embeddings = [_QUERY_CACHE.get(t) for t in texts]
+
+    missing = list(dict.fromkeys(t for t, e in zip(texts, embeddings) if e is None))
+    if missing:
+        fresh = dict(zip(missing, get_embedder().embed(missing)))
+        for t, e in fresh.items():
+            _QUERY_CACHE.put(t, e)
+        embeddings = [e if e is not None else fresh[t] for t, e in zip(texts, embeddings)]
+
+    return embeddings
+
+
+def _unpack(results, i: int):
+    # Defensive fallback — Chroma sometimes returns empty lists
+    ids = (results.get("ids") or [[]] * (i + 1))[i] or []
+    docs = (results.get("documents") or [[]] * (i + 1))[i] or []
+    metas = (results.get("metadatas") or [[]] * (i + 1))[i] or []
+
+    retrieved = []
+    for j in range(len(ids)):
+        retrieved.append({
+            "id": ids[j],
+            "text": docs[j],
+            "meta": metas[j] if metas else {}
+        })
+
+    return retrieved
+
 
 # ---------------------------------------------------------------
-# Initialize embedder ONCE at module import
-# This prevents reloading & rebuilding the DB on every Streamlit run
+# HYBRID FUSION (dense + BM25)
 # ---------------------------------------------------------------
-embedder = Embedder()
-embedder.create_collection()
+def _fuse(queries, dense_lists, k: int):
+    """
+    Merges each query's dense hits with its BM25 hits via reciprocal rank
+    fusion. Docs found only lexically are fetched in one batched get().
+    """
+    emb = get_embedder()
+    lexical_lists = [[doc_id for doc_id, _ in emb.lexical_search(q, k)] for q in queries]
+
+    known = {d["id"]: d for hits in dense_lists for d in hits}
+    missing = {doc_id for ids in lexical_lists for doc_id in ids if doc_id not in known}
+    for doc_id, doc in emb.get_docs(sorted(missing)).items():
+        known[doc_id] = {"id": doc_id, "text": doc["text"], "meta": doc["meta"]}
+
+    fused = []
+    for dense, lexical in zip(dense_lists, lexical_lists):
+        order = reciprocal_rank_fusion([[d["id"] for d in dense], lexical])
+        fused.append([known[doc_id] for doc_id in order if doc_id in known][:k])
+    return fused
 
 
 # ---------------------------------------------------------------
 # RETRIEVE DOCUMENTS
 # ---------------------------------------------------------------
-def retrieve(query_text: str, k: int = 5):
+def retrieve(query_text: str, k: int = 5, hybrid: bool = HYBRID_RETRIEVAL):
     """
-    Retrieve top-k semantically similar documents from ChromaDB.
+    Retrieve top-k semantically similar documents from the vector store,
+    fused with BM25 keyword hits when `hybrid` is on.
 
     Returns:
         [
@@ -28,19 +149,35 @@ def retrieve(query_text: str, k: int = 5):
     if not query_text:
         return []
 
-    results = embedder.query(query_text, k)
+    embedding = embed_queries([query_text])[0]
+    results = get_embedder().query_embeddings([embedding], k)
+    dense = _unpack(results, 0)
 
-    # Defensive fallback — Chroma sometimes returns empty lists
-    ids = results.get("ids", [[]])[0]
-    docs = results.get("documents", [[]])[0]
-    metas = results.get("metadatas", [[]])[0]
+    if hybrid:
+        return _fuse([query_text], [dense], k)[0]
+    return dense
 
-    retrieved = []
-    for i in range(len(ids)):
-        retrieved.append({
-            "id": ids[i],
-            "text": docs[i],
-            "meta": metas[i] if metas else {}
-        })
 
-    return retrieved
+# ---------------------------------------------------------------
+# RETRIEVE FOR MANY QUERIES AT ONCE
+# ---------------------------------------------------------------
+def retrieve_many(queries, k: int = 5, hybrid: bool = HYBRID_RETRIEVAL):
+    """
+    Batched retrieve(): embeds all queries in one model call and runs
+    one vector search for all of them.
+
+    Returns one result list per query, in input order
+    (an empty list for empty queries).
+    """
+    queries = list(queries)
+    active = [q for q in dict.fromkeys(queries) if q]
+    if not active:
+        return [[] for _ in queries]
+
+    results = get_embedder().query_embeddings(embed_queries(active), k)
+    dense_lists = [_unpack(results, i) for i in range(len(active))]
+    if hybrid:
+        dense_lists = _fuse(active, dense_lists, k)
+    by_query = dict(zip(active, dense_lists))
+
+    return [by_query.get(q, []) if q else [] for q in queries]
@@ -0,0 +1,905 @@
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from backend.bit_utils import popcount
+from backend.file_lock import locked
+
+# ---------------------------------------------------------------
+# Backend selection (override via environment)
+# ---------------------------------------------------------------
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")          # "chroma" | "numpy"
+IVF_THRESHOLD = int(os.getenv("VECTOR_IVF_THRESHOLD", 50000))   # rows before IVF kicks in
+IVF_NPROBE = int(os.getenv("VECTOR_IVF_NPROBE", 8))
+QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none")         # "none" | "int8" | "binary"
+RESCORE_FACTOR = int(os.getenv("VECTOR_RESCORE_FACTOR", 8))      # candidates = k * factor
+COMPACT_FRACTION = float(os.getenv("VECTOR_COMPACT_FRACTION", 0.2))  # dead rows before compaction
+
+
+# ---------------------------------------------------------------
+# Interface
+# ---------------------------------------------------------------
+class VectorStore:
+    """
+    Minimal vector-store interface used by Embedder.
+
+    query() returns Chroma-shaped results so callers do not care which
+    backend is active:
+        {"ids": [[...]], "documents": [[...]], "metadatas": [[...]], "distances": [[...]]}
+    with one inner list per query embedding.
+    """
+
+    def add(self, ids, embeddings, documents, metadatas):
+        self.upsert(ids, embeddings, documents, metadatas)
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        raise NotImplementedError
+
+    def delete(self, ids):
+        raise NotImplementedError
+
+    def get(self, ids):
+        """
+        Returns {"ids": [...], "documents": [...], "metadatas": [...]}
+        for the ids that exist.
+        """
+        raise NotImplementedError
+
+    def query(self, embeddings, k: int = 5):
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def optimize(self) -> bool:
+        """
+        Offline index maintenance (e.g. after indexing). Returns True if
+        anything was rebuilt; a no-op by default.
+        """
+        return False
+
+
+# ---------------------------------------------------------------
+# Chroma backend (persistent client, SQLite + HNSW)
+# ---------------------------------------------------------------
+class ChromaVectorStore(VectorStore):
+    def __init__(self, path: Path, name: str = "ej_docs", embedding_function=None):
+        import chromadb
+        from chromadb.config import Settings
+
+        self.client = chromadb.PersistentClient(path=str(path), settings=Settings())
+        self.collection = self.client.get_or_create_collection(
+            name=name,
+            embedding_function=embedding_function
+        )
+
+    def add(self, ids, embeddings, documents, metadatas):
+        self.collection.add(ids=ids, embeddings=embeddings,
+                            documents=documents, metadatas=metadatas)
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        self.collection.upsert(ids=ids, embeddings=embeddings,
+                               documents=documents, metadatas=metadatas)
+
+    def delete(self, ids):
+        self.collection.delete(ids=list(ids))
+
+    def get(self, ids):
+        return self.collection.get(ids=list(ids), include=["documents", "metadatas"])
+
+    def query(self, embeddings, k: int = 5):
+        return self.collection.query(query_embeddings=list(embeddings), n_results=k)
+
+    def count(self) -> int:
+        return self.collection.count()
+
+
+# ---------------------------------------------------------------
+# NumPy backend (memory-mapped float32 matrix + ID table)
+# ---------------------------------------------------------------
+class NumpyVectorStore(VectorStore):
+    """
+    Chroma-free vector store for corpora that fit on one machine.
+
+    Layout inside `directory`:
+        vectors.f32   append-only float32 rows, opened with np.memmap so
+                      worker processes share the same OS pages
+        rows.jsonl    append-only log of {"op": "put"/"del", ...} entries
+                      mapping rows to ids and payload offsets
+        docs.jsonl    append-only {"text", "meta"} payloads, read on demand
+        norms.f32     per-row squared norms (plus codes.* / scales.f32 when
+                      quantized), persisted and memory-mapped like the rows
+        ivf.npz       optional IVF partitioning (centroids + row lists)
+
+    Opening a store parses only the small row log; vectors, norms and
+    codes are mapped, and texts / metadata are read by offset for the
+    ids a query returns.
+
+    Writers (upsert / delete / compact / optimize) hold the store lock,
+    write data before the log entry that references it, and are the only
+    ones to repair a crashed write. Readers take the lock only to load,
+    never write, and pick up other processes' rows via refresh().
+
+    Search is exact L2 top-k via BLAS matrix products. Above
+    IVF_THRESHOLD live rows, optimize() (run by index_docs.py, never on
+    the query path) trains an IVF index (k-means centroids); queries then
+    scan only the `nprobe` closest partitions plus rows added since the
+    last build, and fall back to exact search until an index exists.
+    Distances match Chroma's default (squared L2).
+
+    With quantization="int8" (per-row scaled, ~4x smaller) or "binary"
+    (sign bits, 32x smaller) the scan runs on the compact codes and the
+    best k * rescore_factor candidates are rescored exactly against the
+    float32 rows.
+    """
+
+    CHUNK_ROWS = 16384
+    QUANTIZATIONS = ("none", "int8", "binary")
+
+    # Where a doc's payload lives: docs.jsonl, or inline in an old-format row log line
+    _DOCS, _LOG = 0, 1
+
+    def __init__(self, directory: Path, dim: int = None,
+                 ivf_threshold: int = IVF_THRESHOLD, nprobe: int = IVF_NPROBE,
+                 quantization: str = QUANTIZATION, rescore_factor: int = RESCORE_FACTOR,
+                 compact_fraction: float = COMPACT_FRACTION):
+        if quantization not in self.QUANTIZATIONS:
+            raise ValueError(f"unknown VECTOR_QUANTIZATION: {quantization!r}")
+
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.vectors_path = self.directory / "vectors.f32"
+        self.log_path = self.directory / "rows.jsonl"
+        self.docs_path = self.directory / "docs.jsonl"
+        self.ivf_path = self.directory / "ivf.npz"
+        self.table_path = self.directory / "rows.pkl"
+        self.meta_path = self.directory / "store.json"
+
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.quantization = quantization
+        self.rescore_factor = max(1, rescore_factor)
+        self.compact_fraction = compact_fraction
+        self.dim = dim
+
+        self._log_file = self._docs_file = None
+        self._read_lock = threading.Lock()
+        with locked(self.log_path):
+            self._load()
+
+    # -----------------------------------------------------------
+    # Loading
+    # -----------------------------------------------------------
+    def _load(self, recover: bool = False):
+        """
+        Reads the id table into memory and maps the vectors; call with
+        the store lock held. A reader ignores anything a crashed or
+        in-flight write left past the last complete log entry; only a
+        writer (`recover=True`) repairs it.
+        """
+        self.close()
+        self.row_ids = []           # row → id (None for dead rows)
+        self.id_to_row = {}
+        self.locations = {}         # id → (_DOCS | _LOG, byte offset of its payload)
+        self._log_ino, self._log_offset = None, 0
+
+        if self.meta_path.exists():
+            self.dim = json.loads(self.meta_path.read_text())["dim"]
+
+        if self.log_path.exists():
+            self._open_files()
+            self._log_offset = self._load_row_table(os.fstat(self._log_file.fileno()))
+            self._replay()
+        if recover:
+            self._recover()
+
+        self._map_vectors()
+        self.alive = np.array([i is not None for i in self.row_ids], dtype=bool)
+        self._ivf, self._ivf_stamp = None, None
+        self._refresh_ivf()
+
+    def _open_files(self):
+        """
+        Keeps the log and payload files open: reads stay on the files
+        this view was loaded from even after a compaction swaps them.
+        """
+        if self._log_file is None and self.log_path.exists():
+            self._log_file = self.log_path.open("rb")
+            self._log_ino = os.fstat(self._log_file.fileno()).st_ino
+        if self._docs_file is None and self.docs_path.exists():
+            self._docs_file = self.docs_path.open("rb")
+
+    def close(self):
+        for f in (self._log_file, self._docs_file):
+            if f is not None:
+                f.close()
+        self._log_file = self._docs_file = None
+
+    def _replay(self) -> bool:
+        """
+        Applies log entries written after the last one read, stopping
+        before an unterminated (torn or in-flight) last line. Returns
+        True if any were applied.
+        """
+        offset = self._log_offset
+        with self._read_lock:
+            self._log_file.seek(offset)
+            lines = self._log_file.readlines()
+        for line in lines:
+            if not line.endswith(b"\n"):
+                break
+            start, offset = offset, offset + len(line)
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry["op"] == "put":
+                loc = (self._DOCS, entry["doc"]) if "doc" in entry else (self._LOG, start)
+                self._apply_put(entry["row"], entry["id"], loc)
+            else:
+                self._apply_delete(entry["id"])
+        applied = offset != self._log_offset
+        self._log_offset = offset
+        return applied
+
+    def _log_stamp(self):
+        try:
+            st = os.stat(self.log_path)
+        except FileNotFoundError:
+            return None, 0
+        return st.st_ino, st.st_size
+
+    def _catch_up(self, recover: bool = False):
+        """
+        Store lock held: applies what other processes wrote since this
+        view was loaded (a full reload after a compaction).
+        """
+        ino, _ = self._log_stamp()
+        if ino != self._log_ino:
+            self._load(recover)
+            return
+        changed = self._log_file is not None and self._replay()
+        if recover:
+            changed = self._recover() or changed
+        if changed:
+            self._open_files()
+            self._map_vectors()
+            self.alive = np.array([i is not None for i in self.row_ids], dtype=bool)
+
+    def refresh(self):
+        """
+        Picks up rows written by another process (e.g. the indexer while
+        the app is running); a stat when nothing changed.
+        """
+        if self._log_stamp() == (self._log_ino, self._log_offset):
+            return
+        with locked(self.log_path):
+            self._catch_up()
+
+    def _recover(self) -> bool:
+        """
+        Crash recovery, writer lock held: drops a torn log tail and the
+        vector / sidecar bytes past the last logged row, and persists
+        sidecar rows missing on disk (a crash between writes, a store
+        from before sidecars existed). Returns True if anything changed.
+        """
+        changed = _truncate(self.log_path, self._log_offset)
+        n_rows = len(self.row_ids)
+        if not self.dim:
+            return changed
+
+        changed = _truncate(self.vectors_path, n_rows * self.dim * 4) or changed
+        sidecars = self._sidecars()
+        done = min([self._rows_on_disk(spec) for spec in sidecars.values()] + [n_rows])
+        for path, dtype, shape in sidecars.values():
+            changed = _truncate(path, done * _row_bytes(dtype, shape)) or changed
+
+        vectors = self._vector_map(n_rows)
+        for start in range(done, n_rows, self.CHUNK_ROWS):
+            self._append_sidecars(self._derive(np.asarray(vectors[start:start + self.CHUNK_ROWS])))
+            changed = True
+        return changed
+
+    def _load_row_table(self, log_stat) -> int:
+        """
+        Restores the id table saved by _save_row_table() if it matches
+        this row log; returns the log offset to replay from.
+        """
+        try:
+            with self.table_path.open("rb") as f:
+                table = pickle.load(f)
+        except FileNotFoundError:
+            return 0
+        except Exception as e:
+            print(f"[vector row table unreadable, replaying log] {e}")
+            return 0
+        if table.get("log_ino") != log_stat.st_ino or table.get("log_size", 0) > log_stat.st_size:
+            return 0
+        self.row_ids = table["row_ids"]
+        self.locations = table["locations"]
+        self.id_to_row = {doc_id: row for row, doc_id in enumerate(self.row_ids) if doc_id is not None}
+        return table["log_size"]
+
+    def _save_row_table(self):
+        """
+        Pickles the id table, so the next open only replays log entries
+        written after this point. Store lock held.
+        """
+        if self._log_ino is None:
+            return
+        table = {"log_ino": self._log_ino, "log_size": self._log_offset,
+                 "row_ids": self.row_ids, "locations": self.locations}
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix="rows.", suffix=".tmp.pkl")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(table, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.table_path)
+
+    def _sidecars(self):
+        """
+        Per-row arrays derived from the vectors: name → (path, dtype, row shape).
+        """
+        dim = self.dim or 0
+        sidecars = {"sq_norms": (self.directory / "norms.f32", np.float32, ())}
+        if self.quantization == "int8":
+            sidecars["codes"] = (self.directory / "codes.int8", np.int8, (dim,))
+            sidecars["code_scales"] = (self.directory / "scales.f32", np.float32, ())
+        elif self.quantization == "binary":
+            sidecars["codes"] = (self.directory / "codes.binary", np.uint64, (-(-dim // 64),))
+        return sidecars
+
+    @staticmethod
+    def _rows_on_disk(spec) -> int:
+        path, dtype, shape = spec
+        row_bytes = _row_bytes(dtype, shape)
+        return path.stat().st_size // row_bytes if row_bytes and path.exists() else 0
+
+    def _derive(self, block):
+        """
+        Sidecar rows for a float32 block: name → array.
+        """
+        derived = {"sq_norms": np.einsum("ij,ij->i", block, block).astype(np.float32)}
+        if self.quantization == "int8":
+            scales = np.abs(block).max(axis=1) / 127.0 if len(block) else np.zeros(0, np.float32)
+            scales = np.where(scales > 0, scales, 1.0).astype(np.float32)
+            derived["codes"] = np.clip(np.rint(block / scales[:, None]), -127, 127).astype(np.int8)
+            derived["code_scales"] = scales
+        elif self.quantization == "binary":
+            derived["codes"] = _pack_signs(block)
+        return derived
+
+    def _append_sidecars(self, derived):
+        for name, (path, _, _) in self._sidecars().items():
+            with path.open("ab") as f:
+                f.write(np.ascontiguousarray(derived[name]).tobytes())
+
+    def _vector_map(self, n_rows):
+        if self.dim and n_rows:
+            return np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(n_rows, self.dim))
+        return np.zeros((0, self.dim or 0), dtype=np.float32)
+
+    def _map_vectors(self):
+        """
+        (Re)maps the vector file and its sidecars for the logged rows;
+        never writes. Sidecar rows not on disk yet (a store no writer has
+        recovered) are derived in memory.
+        """
+        n_rows = len(self.row_ids)
+        self.vectors = self._vector_map(n_rows)
+
+        sidecars = self._sidecars()
+        done = min([self._rows_on_disk(spec) for spec in sidecars.values()] + [n_rows])
+        missing = {}
+        if done < n_rows:
+            blocks = [self._derive(np.asarray(self.vectors[start:start + self.CHUNK_ROWS]))
+                      for start in range(done, n_rows, self.CHUNK_ROWS)]
+            missing = {name: np.concatenate([b[name] for b in blocks]) for name in sidecars}
+
+        for name, (path, dtype, shape) in sidecars.items():
+            if done and self.dim:
+                array = np.memmap(path, dtype=dtype, mode="r", shape=(done, *shape))
+            else:
+                array = np.zeros((0, *shape), dtype=dtype)
+            if name in missing:
+                array = np.concatenate([array, missing[name]])
+            setattr(self, name, array)
+        if "codes" not in sidecars:
+            self.codes = np.zeros((0, 0), dtype=np.uint8)
+        if "code_scales" not in sidecars:
+            self.code_scales = np.zeros(0, dtype=np.float32)
+
+    def memory_report(self):
+        """
+        Bytes held for scanning: full-precision rows vs compact codes.
+        """
+        return {
+            "quantization": self.quantization,
+            "rows": len(self.row_ids),
+            "float32_bytes": int(len(self.row_ids) * (self.dim or 0) * 4),
+            "code_bytes": int(self.codes.nbytes + self.code_scales.nbytes),
+        }
+
+    def _apply_put(self, row, doc_id, location):
+        self._apply_delete(doc_id)
+        while len(self.row_ids) <= row:
+            self.row_ids.append(None)
+        self.row_ids[row] = doc_id
+        self.id_to_row[doc_id] = row
+        self.locations[doc_id] = location
+
+    def _apply_delete(self, doc_id):
+        row = self.id_to_row.pop(doc_id, None)
+        if row is None:
+            return
+        self.row_ids[row] = None
+        self.locations.pop(doc_id, None)
+
+    def _payloads(self, ids):
+        """
+        (texts, metadatas) for existing ids, read from disk by offset.
+        """
+        texts, metas = [], []
+        with self._read_lock:
+            for doc_id in ids:
+                source, offset = self.locations[doc_id]
+                f = self._docs_file if source == self._DOCS else self._log_file
+                f.seek(offset)
+                entry = json.loads(f.readline())
+                texts.append(entry["text"])
+                metas.append(entry["meta"])
+        return texts, metas
+
+    # -----------------------------------------------------------
+    # Writes (under the store lock, after catching up with other writers)
+    # -----------------------------------------------------------
+    def upsert(self, ids, embeddings, documents, metadatas):
+        ids = [str(i) for i in ids]
+        if not ids:
+            return
+        matrix = np.ascontiguousarray(embeddings, dtype=np.float32)
+        with locked(self.log_path):
+            self._catch_up(recover=True)
+            self._upsert(ids, matrix, list(documents), list(metadatas))
+
+    def _upsert(self, ids, matrix, documents, metadatas):
+        if self.dim is None:
+            self.dim = int(matrix.shape[1])
+            self.meta_path.write_text(json.dumps({"dim": self.dim}))
+        if matrix.shape[1] != self.dim:
+            raise ValueError(f"embedding dim {matrix.shape[1]} != store dim {self.dim}")
+
+        # Payloads, vectors and sidecar rows before the log entry: a crash
+        # (or a reader looking meanwhile) only sees bytes past the last logged row
+        offsets = []
+        with self.docs_path.open("ab") as f:
+            offset = f.tell()
+            for text, meta in zip(documents, metadatas):
+                line = (json.dumps({"text": text, "meta": meta or {}}, ensure_ascii=False) + "\n").encode("utf-8")
+                f.write(line)
+                offsets.append(offset)
+                offset += len(line)
+
+        start = len(self.row_ids)
+        with self.vectors_path.open("ab") as f:
+            f.write(matrix.tobytes())
+        self._append_sidecars(self._derive(matrix))
+
+        replaced = [self.id_to_row[i] for i in ids if i in self.id_to_row]
+        lines = []
+        for i, (doc_id, doc_offset) in enumerate(zip(ids, offsets)):
+            row = start + i
+            self._apply_put(row, doc_id, (self._DOCS, doc_offset))
+            lines.append(json.dumps({"op": "put", "row": row, "id": doc_id, "doc": doc_offset},
+                                    ensure_ascii=False))
+        self._append_log(lines)
+        self._map_vectors()
+
+        # A repeated id inside the batch: only its last row stays live
+        self.alive = np.concatenate([self.alive, np.zeros(len(ids), dtype=bool)])
+        self.alive[replaced] = False
+        self.alive[[self.id_to_row[i] for i in set(ids)]] = True
+
+    def delete(self, ids):
+        with locked(self.log_path):
+            self._catch_up(recover=True)
+            lines = []
+            for doc_id in map(str, ids):
+                row = self.id_to_row.get(doc_id)
+                if row is not None:
+                    self._apply_delete(doc_id)
+                    self.alive[row] = False
+                    lines.append(json.dumps({"op": "del", "id": doc_id}))
+            if lines:
+                self._append_log(lines)
+
+    def _append_log(self, lines):
+        data = ("\n".join(lines) + "\n").encode("utf-8")
+        with self.log_path.open("ab") as f:
+            f.write(data)
+        self._log_offset += len(data)
+        self._open_files()
+
+    def dead_rows(self) -> int:
+        return len(self.row_ids) - len(self.id_to_row)
+
+    def compact(self):
+        """
+        Rewrites vectors, payloads and log without deleted rows (and drops
+        the IVF index; run optimize() to rebuild it). The new files are
+        built aside and swapped in under the store lock, log last: a
+        reader loads either the old store or the new one, and a view
+        loaded before keeps reading the old files it holds open.
+        """
+        with locked(self.log_path):
+            self._catch_up(recover=True)
+            self._compact()
+
+    def _compact(self):
+        live = np.flatnonzero(self.alive)
+        staging = Path(tempfile.mkdtemp(dir=self.directory, prefix="compact."))
+        try:
+            fresh = NumpyVectorStore(staging, self.dim, quantization=self.quantization)
+            for start in range(0, len(live), self.CHUNK_ROWS):
+                rows = live[start:start + self.CHUNK_ROWS]
+                ids = [self.row_ids[r] for r in rows]
+                docs, metas = self._payloads(ids)
+                fresh._upsert(ids, np.array(self.vectors[rows]), docs, metas)
+            fresh._save_row_table()
+            fresh.close()
+
+            derived = [spec[0].name for spec in self._sidecars().values()]
+            names = [self.vectors_path.name, self.docs_path.name, *derived,
+                     self.ivf_path.name, self.table_path.name, self.log_path.name]
+            for name in names:
+                if (staging / name).exists():
+                    os.replace(staging / name, self.directory / name)
+                elif (self.directory / name).exists():
+                    os.unlink(self.directory / name)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        self._load()
+
+    # -----------------------------------------------------------
+    # Reads
+    # -----------------------------------------------------------
+    def count(self) -> int:
+        return len(self.id_to_row)
+
+    def get(self, ids):
+        self.refresh()
+        found = [str(i) for i in ids if str(i) in self.id_to_row]
+        docs, metas = self._payloads(found)
+        return {"ids": found, "documents": docs, "metadatas": metas}
+
+    def query(self, embeddings, k: int = 5):
+        queries = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        out = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        self.refresh()
+
+        if self.count() == 0 or k <= 0:
+            for _ in queries:
+                for key in out:
+                    out[key].append([])
+            return out
+
+        rows, dists = self._search(queries, k)
+
+        for q_rows, q_dists in zip(rows, dists):
+            ids = [self.row_ids[r] for r in q_rows]
+            docs, metas = self._payloads(ids)
+            out["ids"].append(ids)
+            out["documents"].append(docs)
+            out["metadatas"].append(metas)
+            out["distances"].append([float(d) for d in q_dists])
+        return out
+
+    def _search(self, queries, k):
+        if self.count() >= self.ivf_threshold:
+            self._refresh_ivf()
+            if self._ivf is not None:
+                return self._search_ivf(queries, k)
+        return self._search_candidates(queries, k, np.flatnonzero(self.alive))
+
+    def _search_candidates(self, queries, k, candidates):
+        """
+        Top-k over candidate rows: exact, or a scan of the quantized codes
+        followed by exact rescoring of the best k * rescore_factor rows.
+        """
+        if self.quantization == "none":
+            return self._scan(queries, k, candidates, self._exact_distances)
+
+        shortlist, _ = self._scan(queries, k * self.rescore_factor, candidates, self._code_distances)
+        rows_out, dist_out = [], []
+        for qi, rows in enumerate(shortlist):
+            rows, dists = self._scan(queries[qi:qi + 1], k, np.sort(rows), self._exact_distances)
+            rows_out.append(rows[0])
+            dist_out.append(dists[0])
+        return rows_out, dist_out
+
+    def _exact_distances(self, queries, chunk):
+        # ||q - x||² = ||q||² - 2 q·x + ||x||²
+        block = self.vectors[chunk]
+        q_norms = np.einsum("ij,ij->i", queries, queries)
+        return q_norms[:, None] - 2.0 * (queries @ block.T) + self.sq_norms[chunk][None, :]
+
+    def _code_distances(self, queries, chunk):
+        """
+        Approximate distances from the in-memory codes: squared L2 on
+        dequantized int8 rows, or Hamming distance between sign bits.
+        """
+        if self.quantization == "int8":
+            block = self.codes[chunk].astype(np.float32)
+            q_norms = np.einsum("ij,ij->i", queries, queries)
+            dots = (queries @ block.T) * self.code_scales[chunk][None, :]
+            return q_norms[:, None] - 2.0 * dots + self.sq_norms[chunk][None, :]
+
+        q_codes = _pack_signs(queries)
+        block = self.codes[chunk]
+        return np.stack([
+            popcount(np.bitwise_xor(block, q)).astype(np.float32) for q in q_codes
+        ])
+
+    def _scan(self, queries, k, candidates, distances):
+        """
+        Chunked top-k of every query over candidate rows under the given
+        distance function. Returns (rows, distances) per query, nearest first.
+        """
+        best_rows = [np.zeros(0, dtype=np.int64) for _ in queries]
+        best_dist = [np.zeros(0, dtype=np.float32) for _ in queries]
+
+        for start in range(0, len(candidates), self.CHUNK_ROWS):
+            chunk = candidates[start:start + self.CHUNK_ROWS]
+            dist = distances(queries, chunk)
+
+            for qi in range(len(queries)):
+                rows = np.concatenate([best_rows[qi], chunk])
+                d = np.concatenate([best_dist[qi], dist[qi]])
+                if len(d) > k:
+                    keep = np.argpartition(d, k - 1)[:k]
+                    rows, d = rows[keep], d[keep]
+                best_rows[qi], best_dist[qi] = rows, d
+
+        results_rows, results_dist = [], []
+        for rows, d in zip(best_rows, best_dist):
+            order = np.argsort(d, kind="stable")
+            results_rows.append(rows[order])
+            results_dist.append(np.maximum(d[order], 0.0))
+        return results_rows, results_dist
+
+    # -----------------------------------------------------------
+    # IVF partitioned index
+    # -----------------------------------------------------------
+    def _refresh_ivf(self):
+        """
+        Loads ivf.npz when it appeared or was rebuilt (e.g. by the
+        indexer in another process); a cheap stat otherwise. An index
+        built over another generation of the store (before or after a
+        compaction this view has not loaded) is ignored.
+        """
+        try:
+            st = os.stat(self.ivf_path)
+        except FileNotFoundError:
+            self._ivf, self._ivf_stamp = None, None
+            return
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stamp == self._ivf_stamp:
+            return
+        data = np.load(self.ivf_path)
+        self._ivf_stamp = stamp
+        if "log_ino" in data.files and int(data["log_ino"]) != self._log_ino:
+            self._ivf = None
+            return
+        self._ivf = self._ivf_lists(data["centroids"], data["assign"], int(data["n_rows"]))
+
+    @staticmethod
+    def _ivf_lists(centroids, assign, n_rows):
+        """
+        Groups rows by partition: rows of list c are order[offsets[c]:offsets[c + 1]].
+        """
+        assigned = np.flatnonzero(assign >= 0)
+        order = assigned[np.argsort(assign[assigned], kind="stable")]
+        counts = np.bincount(assign[assigned], minlength=len(centroids))
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+        return {"centroids": centroids, "order": order, "offsets": offsets, "n_rows": n_rows}
+
+    def ivf_due(self) -> bool:
+        """
+        True once the store is past IVF_THRESHOLD and has no index yet,
+        or more than 10% of rows were added since the last build.
+        """
+        if self.count() < self.ivf_threshold:
+            return False
+        self._refresh_ivf()
+        ivf = self._ivf
+        return ivf is None or len(self.row_ids) - ivf["n_rows"] > 0.1 * ivf["n_rows"]
+
+    def optimize(self) -> bool:
+        """
+        Offline maintenance: compacts once more than `compact_fraction`
+        of the rows are dead, saves the id table for fast opens and
+        (re)builds the IVF index if due. Returns True if it rebuilt
+        anything. Another process building meanwhile is waited for, not
+        repeated.
+        """
+        with locked(self.log_path):
+            self._catch_up(recover=True)
+            compacted = self.dead_rows() > max(0, self.compact_fraction * len(self.row_ids))
+            if compacted:
+                self._compact()
+            else:
+                self._save_row_table()
+        if not self.ivf_due():
+            return compacted
+        with locked(self.ivf_path):
+            if not self.ivf_due():
+                return compacted
+            self._build_ivf()
+        return True
+
+    def build_ivf(self, nlist: int = None, iterations: int = 10, sample: int = 100000, seed: int = 0):
+        """
+        Trains k-means centroids on a sample of live rows and assigns
+        every row to its nearest centroid. Slow on large stores: run it
+        offline (optimize() / index_docs.py), not per query.
+        """
+        with locked(self.ivf_path):
+            self._build_ivf(nlist, iterations, sample, seed)
+
+    def _build_ivf(self, nlist: int = None, iterations: int = 10, sample: int = 100000, seed: int = 0):
+        live = np.flatnonzero(self.alive)
+        if not len(live):
+            return
+        nlist = nlist or max(1, int(np.sqrt(len(live))))
+        rng = np.random.default_rng(seed)
+
+        train = np.array(self.vectors[rng.choice(live, min(sample, len(live)), replace=False)])
+        centroids = train[rng.choice(len(train), min(nlist, len(train)), replace=False)].copy()
+
+        for _ in range(iterations):
+            labels = self._nearest_centroid(train, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, train)
+            counts = np.bincount(labels, minlength=len(centroids))
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+
+        assign = np.full(len(self.row_ids), -1, dtype=np.int32)
+        for start in range(0, len(live), self.CHUNK_ROWS):
+            chunk = live[start:start + self.CHUNK_ROWS]
+            assign[chunk] = self._nearest_centroid(np.asarray(self.vectors[chunk]), centroids)
+
+        # Unique tmp name: concurrent builders never write the same file
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix="ivf.", suffix=".tmp.npz")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, centroids=centroids, assign=assign, n_rows=len(self.row_ids),
+                         log_ino=self._log_ino)
+            os.replace(tmp, self.ivf_path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        self._refresh_ivf()
+
+    @staticmethod
+    def _nearest_centroid(x, centroids):
+        d = (np.einsum("ij,ij->i", centroids, centroids)[None, :] - 2.0 * (x @ centroids.T))
+        return np.argmin(d, axis=1)
+
+    def _search_ivf(self, queries, k):
+        """
+        Scans the `nprobe` nearest partitions plus rows added after the
+        index was built (never rebuilds; see optimize()).
+        """
+        ivf = self._ivf
+        n_rows = len(self.row_ids)
+        centroids, order, offsets = ivf["centroids"], ivf["order"], ivf["offsets"]
+        nprobe = min(self.nprobe, len(centroids))
+        tail = np.arange(min(ivf["n_rows"], n_rows), n_rows)
+
+        c_dist = np.einsum("ij,ij->i", centroids, centroids)[None, :] - 2.0 * (queries @ centroids.T)
+        probes = np.argpartition(c_dist, nprobe - 1, axis=1)[:, :nprobe]
+
+        rows_out, dist_out = [], []
+        for qi, probe in enumerate(probes):
+            lists = [order[offsets[c]:offsets[c + 1]] for c in probe]
+            candidates = np.concatenate(lists + [tail])
+            # An index built by a process that has seen more rows than this one
+            candidates = candidates[candidates < n_rows]
+            candidates = candidates[self.alive[candidates]]
+            rows, dists = self._search_candidates(queries[qi:qi + 1], k, candidates)
+            rows_out.append(rows[0])
+            dist_out.append(dists[0])
+        return rows_out, dist_out
+
+    # -----------------------------------------------------------
+    # Recall report
+    # -----------------------------------------------------------
+    def measure_recall(self, queries, k: int = 10):
+        """
+        Compares the configured search (quantization / IVF) against exact
+        float32 search over all live rows.
+
+        Returns recall@k (mean fraction of exact top-k ids found), timings
+        and the memory report.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        live = np.flatnonzero(self.alive)
+        self.optimize()         # builds the IVF index if due, outside the timing
+
+        t0 = time.perf_counter()
+        exact, _ = self._scan(queries, k, live, self._exact_distances)
+        t1 = time.perf_counter()
+        approx, _ = self._search(queries, k)
+        t2 = time.perf_counter()
+
+        hits = [len(set(e.tolist()) & set(a.tolist())) / max(1, len(e))
+                for e, a in zip(exact, approx)]
+        return {
+            "k": k,
+            "queries": len(queries),
+            "recall_at_k": round(float(np.mean(hits)), 4) if hits else 0.0,
+            "exact_ms": round((t1 - t0) * 1000, 2),
+            "search_ms": round((t2 - t1) * 1000, 2),
+            "ivf": self.count() >= self.ivf_threshold and self._ivf is not None,
+            "rescore_factor": self.rescore_factor,
+            **self.memory_report(),
+        }
+
+
+def _pack_signs(block: np.ndarray) -> np.ndarray:
+    """
+    Sign bits of each row, packed into uint64 words (zero-padded).
+    """
+    bits = np.packbits(block > 0, axis=1)
+    pad = -bits.shape[1] % 8
+    if pad:
+        bits = np.pad(bits, ((0, 0), (0, pad)))
+    return np.ascontiguousarray(bits).view(np.uint64)
+
+
+def _row_bytes(dtype, shape) -> int:
+    return np.dtype(dtype).itemsize * int(np.prod(shape))
+
+
+def _truncate(path: Path, size: int) -> bool:
+    """
+    Cuts `path` down to `size` bytes if it is longer; True if it was.
+    """
+    if not path.exists() or path.stat().st_size <= size:
+        return False
+    with path.open("r+b") as f:
+        f.truncate(size)
+    return True
+
+
+# ---------------------------------------------------------------
+# Factory
+# ---------------------------------------------------------------
+def store_directory(root: Path, name: str = "ej_docs", backend: str = VECTOR_BACKEND) -> Path:
+    """
+    Where a backend keeps its files: Chroma in <root>, the NumPy store
+    in <root>/numpy_<name>.
+    """
+    if backend == "numpy":
+        return Path(root) / f"numpy_{name}"
+    if backend == "chroma":
+        return Path(root)
+    raise ValueError(f"unknown VECTOR_BACKEND: {backend!r}")
+
+
+def open_vector_store(root: Path, name: str = "ej_docs", backend: str = VECTOR_BACKEND,
+                      embedding_function=None) -> VectorStore:
+    """
+    Opens the configured backend in store_directory(root, name, backend).
+    """
+    if backend == "numpy":
+        return NumpyVectorStore(store_directory(root, name, backend))
+    if backend == "chroma":
+        return ChromaVectorStore(root, name, embedding_function=embedding_function)
+    raise ValueError(f"unknown VECTOR_BACKEND: {backend!r}")
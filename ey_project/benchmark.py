@@ -0,0 +1,538 @@
+"""
+Performance benchmarks over synthetic data, fully offline.
+
+Every bench runs in a throwaway workspace (nothing under data/ or
+chroma_db/ is touched) at each requested scale; the LLM is the local
+Ollama stub from ollama_stub.py.
+
+    # default scales 100,1000,10000; results as JSON
+    python benchmark.py --output bench.json
+
+    # no sentence-transformers here: embed with hashed bag-of-words vectors
+    python benchmark.py --embeddings hashed --scales 1000,100000
+
+    # fail (exit 1) if any p50 is >25% slower than a saved run
+    python benchmark.py --compare bench.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from ollama_stub import StubConfig, start_stub_server
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+LEXICON_FILE = PROJECT_ROOT / "data" / "entity_lexicon.jsonl"
+
+BENCHES = ("similarity", "molecules", "retrieve", "kg", "rerank", "entities", "literature")
+DEFAULT_SCALES = "100,1000,10000"
+
+
+# ---------------------------------------------------------------
+# SYNTHETIC DATA GENERATORS (seeded, any size)
+# ---------------------------------------------------------------
+FILLER = (
+    "signaling", "expression", "tumor", "patients", "cells", "inhibition", "pathway",
+    "resistance", "response", "phosphorylation", "progression", "treatment", "cohort",
+    "receptor", "activation", "downstream", "mutant", "clinical", "survival", "model",
+)
+
+# Chain fragments that stay valid SMILES when concatenated in any order
+SMILES_FRAGMENTS = (
+    "C", "CC", "O", "N", "C(=O)", "C(=O)N", "C(F)(F)", "C(Cl)", "OC",
+    "c1ccc(cc1)", "c1ccncc1", "C1CCN(CC1)", "C1CCOCC1", "c1ccc2ccccc2c1", "S(=O)(=O)N",
+)
+
+
+def _gene_symbols(path: Path = LEXICON_FILE):
+    symbols = []
+    if path.exists():
+        with path.open("r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    if row.get("type", "gene") == "gene":
+                        symbols.append(row["symbol"])
+    return symbols or ["EGFR", "KRAS", "TP53", "STAT3", "IL6", "JAK2", "VEGFA", "MTOR"]
+
+
+def synthetic_docs(n: int, seed: int = 0, sentences: int = 6):
+    """
+    Abstract-like docs (id, title, text) mentioning 2-4 lexicon genes.
+    """
+    rng = random.Random(seed)
+    genes = _gene_symbols()
+    docs = []
+    for i in range(n):
+        mentioned = rng.sample(genes, k=min(len(genes), rng.randint(2, 4)))
+        body = []
+        for _ in range(sentences):
+            words = rng.sample(FILLER, 8)
+            words.insert(rng.randrange(len(words)), rng.choice(mentioned))
+            body.append(" ".join(words).capitalize() + ".")
+        docs.append({
+            "id": f"doc{i:07d}",
+            "title": f"{mentioned[0]} and {mentioned[1]} {rng.choice(FILLER)}",
+            "text": " ".join(body),
+        })
+    return docs
+
+
+def synthetic_molecules(n: int, seed: int = 0):
+    """
+    (name, smiles) pairs built from 2-7 chained fragments.
+    """
+    rng = random.Random(seed)
+    return [
+        (f"MOL{i:07d}", "".join(rng.choice(SMILES_FRAGMENTS) for _ in range(rng.randint(2, 7))))
+        for i in range(n)
+    ]
+
+
+def synthetic_hypotheses(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    genes = _gene_symbols()
+    return [
+        f"Targeting {rng.choice(genes)} reduces {rng.choice(FILLER)} via {rng.choice(genes)} #{i}"
+        for i in range(n)
+    ]
+
+
+def synthetic_feedback(path: Path, n_rows: int, hypotheses, seed: int = 0):
+    """
+    Writes `n_rows` feedback JSONL rows over the given hypotheses.
+    """
+    rng = random.Random(seed)
+    with Path(path).open("a", encoding="utf-8") as f:
+        for _ in range(n_rows):
+            f.write(json.dumps({
+                "hypothesis": rng.choice(hypotheses),
+                "accepted": rng.random() < 0.6,
+                "ts": time.time(),
+                "user_id": None,
+                "session_id": "bench",
+            }) + "\n")
+
+
+def synthetic_evidence(rng: random.Random, n_docs: int):
+    return [{"doc_id": f"doc{rng.randrange(n_docs):07d}", "snippet": "synthetic evidence"}
+            for _ in range(rng.randint(1, 3))]
+
+
+# ---------------------------------------------------------------
+# HASHED EMBEDDINGS (for machines without sentence-transformers)
+# ---------------------------------------------------------------
+class HashedEncoder:
+    """
+    Deterministic bag-of-words vectors (token hash → signed bucket),
+    L2-normalized. Same encode() call shape as SentenceTransformer, so
+    store and fusion costs can be measured without the model.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts, show_progress_bar=False):
+        from backend.lexical_index import tokenize
+
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in tokenize(text):
+                h = zlib.crc32(token.encode("utf-8"))
+                out[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+
+# ---------------------------------------------------------------
+# TIMING
+# ---------------------------------------------------------------
+def time_calls(fn, items):
+    """
+    Calls fn(item) for each item; returns per-call seconds.
+    """
+    durations = []
+    for item in items:
+        t0 = time.perf_counter()
+        fn(item)
+        durations.append(time.perf_counter() - t0)
+    return durations
+
+
+def summarize(bench: str, scale, durations, setup_s: float = None, **extra):
+    """
+    One result row; latencies in ms.
+    """
+    ms = sorted(d * 1000 for d in durations)
+
+    def pct(p):
+        return round(ms[min(len(ms) - 1, int(p * len(ms)))], 4)
+
+    total = sum(durations)
+    return {
+        "bench": bench,
+        "scale": scale,
+        "ops": len(ms),
+        "mean_ms": round(statistics.mean(ms), 4),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "max_ms": round(ms[-1], 4),
+        "ops_per_sec": round(len(ms) / total, 1) if total else None,
+        "setup_s": round(setup_s, 3) if setup_s is not None else None,
+        **extra,
+    }
+
+
+# ---------------------------------------------------------------
+# BENCHES (each yields result rows for one scale)
+# ---------------------------------------------------------------
+def bench_similarity(ws: Path, scale: int, ops: int):
+    """
+    compute_similarity on random pairs (independent of library size).
+    """
+    from backend.chem_utils import compute_similarity
+
+    mols = synthetic_molecules(max(ops, 2), seed=1)
+    rng = random.Random(1)
+    pairs = [(rng.choice(mols)[1], rng.choice(mols)[1]) for _ in range(ops)]
+    yield summarize("compute_similarity", None, time_calls(lambda p: compute_similarity(*p), pairs))
+
+
+def bench_molecules(ws: Path, scale: int, ops: int):
+    """
+    find_similar_molecules over a library of `scale` molecules.
+    """
+    from backend import chem_utils
+
+    t0 = time.perf_counter()
+    chem_utils._MOLECULE_INDEX = chem_utils.FingerprintIndex.from_records(synthetic_molecules(scale))
+    setup = time.perf_counter() - t0
+
+    queries = [smi for _, smi in synthetic_molecules(ops, seed=2)]
+    durations = time_calls(lambda q: chem_utils.find_similar_molecules(q, top_k=10), queries)
+    yield summarize("find_similar_molecules", scale, durations, setup,
+                    library=len(chem_utils._MOLECULE_INDEX))
+    chem_utils._MOLECULE_INDEX = None
+
+
+def bench_retrieve(ws: Path, scale: int, ops: int):
+    """
+    retrieve() (dense + BM25 fusion) over `scale` indexed docs.
+    """
+    build_corpus(ws, scale)
+    from backend.retriever import retrieve
+
+    queries = [d["title"] for d in synthetic_docs(ops, seed=3)]
+    for hybrid in (False, True):
+        # Unique queries per pass, so the query-embedding LRU never hits
+        tagged = [f"{q} {'hybrid' if hybrid else 'dense'} {i}" for i, q in enumerate(queries)]
+        durations = time_calls(lambda q: retrieve(q, k=5, hybrid=hybrid), tagged)
+        yield summarize("retrieve_hybrid" if hybrid else "retrieve_dense", scale, durations,
+                        CORPUS["setup_s"])
+
+
+def bench_kg(ws: Path, scale: int, ops: int):
+    """
+    add_hypothesis_to_kg + save_knowledge_graph on a KG already holding
+    `scale` hypotheses, then a full load.
+    """
+    from backend.knowledge_graph import (
+        KnowledgeGraph, add_hypothesis_to_kg, save_knowledge_graph,
+    )
+
+    kg_dir = ws / f"kg_{scale}"
+    kg_dir.mkdir()
+    kg = KnowledgeGraph(kg_dir / "kg.json", kg_dir / "kg.log.jsonl")
+
+    rng = random.Random(4)
+    n_docs = max(1, scale // 2)
+    t0 = time.perf_counter()
+    for text in synthetic_hypotheses(scale, seed=4):
+        add_hypothesis_to_kg(kg, text, synthetic_evidence(rng, n_docs))
+    kg.compact()
+    setup = time.perf_counter() - t0
+
+    new = [(text, synthetic_evidence(rng, n_docs)) for text in synthetic_hypotheses(ops, seed=5)]
+    yield summarize("add_hypothesis_to_kg", scale,
+                    time_calls(lambda item: add_hypothesis_to_kg(kg, *item), new),
+                    setup, nodes=len(kg), edges=len(kg.edges))
+
+    # One save per added hypothesis, as the UI does
+    durations = []
+    for text, evidence in new:
+        add_hypothesis_to_kg(kg, text, evidence)
+        t0 = time.perf_counter()
+        save_knowledge_graph(kg)
+        durations.append(time.perf_counter() - t0)
+    yield summarize("save_knowledge_graph", scale, durations, setup)
+
+    load_ops = max(1, min(ops, 5))
+    yield summarize("load_knowledge_graph", scale,
+                    time_calls(lambda _: KnowledgeGraph.load(kg.json_path, kg.log_path),
+                               range(load_ops)), setup)
+
+
+def bench_rerank(ws: Path, scale: int, ops: int):
+    """
+    rerank_hypotheses with `scale` feedback rows on disk: the first call
+    (full parse), warm calls, and calls after small appends.
+    """
+    from backend import active_learning
+
+    fb_dir = ws / f"feedback_{scale}"
+    fb_dir.mkdir()
+    path = fb_dir / "feedback.jsonl"
+    hyps = synthetic_hypotheses(max(10, scale // 10), seed=6)
+
+    t0 = time.perf_counter()
+    synthetic_feedback(path, scale, hyps, seed=6)
+    setup = time.perf_counter() - t0
+
+    active_learning._FEEDBACK_STORE = active_learning.FeedbackStore(path, fb_dir / "summary.json")
+    batch = [{"text": h} for h in hyps[:10]]
+
+    def rerank(_):
+        active_learning.rerank_hypotheses([dict(h) for h in batch])
+
+    yield summarize("rerank_hypotheses_cold", scale, time_calls(rerank, [None]), setup)
+    yield summarize("rerank_hypotheses_warm", scale, time_calls(rerank, range(ops)), setup)
+
+    durations = []
+    for i in range(ops):
+        synthetic_feedback(path, 10, hyps, seed=100 + i)
+        durations += time_calls(rerank, [None])
+    yield summarize("rerank_hypotheses_append10", scale, durations, setup)
+    active_learning._FEEDBACK_STORE = None
+
+
+def bench_entities(ws: Path, scale: int, ops: int):
+    """
+    extract_entities over `scale` synthetic abstracts.
+    """
+    from backend.entity_extractor import get_entity_extractor
+    from backend.knowledge_graph import extract_entities
+
+    t0 = time.perf_counter()
+    get_entity_extractor()
+    setup = time.perf_counter() - t0
+
+    texts = [f"{d['title']}. {d['text']}" for d in synthetic_docs(scale, seed=7)]
+    durations = time_calls(extract_entities, texts)
+    chars = sum(map(len, texts))
+    yield summarize("extract_entities", scale, durations, setup,
+                    chars_per_sec=round(chars / sum(durations)) if sum(durations) else None)
+
+
+def bench_literature(ws: Path, scale: int, ops: int):
+    """
+    literature_agent end to end (retrieve + pack + stub LLM + parse)
+    over `scale` indexed docs.
+    """
+    build_corpus(ws, scale)
+    from backend.agents import literature_agent
+
+    queries = [f"{d['title']} literature {i}" for i, d in enumerate(synthetic_docs(ops, seed=8))]
+    statuses = []
+
+    def run(q):
+        parsed, _ = literature_agent(q)
+        statuses.append("hypotheses" in parsed)
+
+    durations = time_calls(run, queries)
+    yield summarize("literature_agent", scale, durations, CORPUS["setup_s"],
+                    parsed_ok=sum(statuses))
+
+
+BENCH_FUNCS = {
+    "similarity": bench_similarity,
+    "molecules": bench_molecules,
+    "retrieve": bench_retrieve,
+    "kg": bench_kg,
+    "rerank": bench_rerank,
+    "entities": bench_entities,
+    "literature": bench_literature,
+}
+
+# Indexed corpus shared by the retrieve + literature benches
+CORPUS = {"scale": None, "setup_s": None}
+
+
+def build_corpus(ws: Path, scale: int):
+    """
+    Indexes `scale` synthetic docs into a fresh NumPy vector store +
+    BM25 index and makes it the retriever's embedder (reused per scale).
+    """
+    if CORPUS["scale"] == scale:
+        return
+    from backend import retriever
+    from backend.embedder import Embedder
+
+    t0 = time.perf_counter()
+    emb = Embedder(backend="numpy", db_path=ws / f"db_{scale}")
+    emb.create_collection()
+    docs = synthetic_docs(scale)
+    for i in range(0, len(docs), 1024):
+        emb.upsert_docs(docs[i:i + 1024])
+    emb.save_lexical_index()
+
+    retriever._EMBEDDER = emb
+    CORPUS.update(scale=scale, setup_s=time.perf_counter() - t0)
+
+
+# ---------------------------------------------------------------
+# RUN + COMPARE
+# ---------------------------------------------------------------
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                              capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def run_benchmarks(benches, scales, ops: int, workdir: Path, log=print):
+    """
+    Runs each bench at each scale. A bench whose dependency is missing
+    (ImportError) is reported as skipped instead of failing the run.
+    """
+    results, skipped = [], {}
+    for name in benches:
+        for scale in scales:
+            log(f"⏱  {name} @ {scale}")
+            try:
+                for row in BENCH_FUNCS[name](workdir, scale, ops):
+                    results.append(row)
+                    log(f"   {row['bench']}: p50 {row['p50_ms']} ms, p95 {row['p95_ms']} ms")
+            except ImportError as e:
+                skipped[name] = f"{type(e).__name__}: {e}"
+                log(f"   skipped ({skipped[name]})")
+                break
+            if name == "similarity":
+                break       # scale-independent: one pass is enough
+    return results, skipped
+
+
+def compare(results, baseline, tolerance: float):
+    """
+    Rows whose p50 grew by more than `tolerance` (fraction) vs. the
+    baseline run, matched on (bench, scale).
+    """
+    before = {(r["bench"], r["scale"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for row in results:
+        old = before.get((row["bench"], row["scale"]))
+        if not old or not old.get("p50_ms"):
+            continue
+        ratio = row["p50_ms"] / old["p50_ms"]
+        if ratio > 1 + tolerance:
+            regressions.append({"bench": row["bench"], "scale": row["scale"],
+                                "baseline_p50_ms": old["p50_ms"], "p50_ms": row["p50_ms"],
+                                "ratio": round(ratio, 3)})
+    return regressions
+
+
+# ---------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline performance benchmarks on synthetic data")
+    parser.add_argument("--benches", default=",".join(BENCHES),
+                        help=f"comma-separated subset of: {', '.join(BENCHES)}")
+    parser.add_argument("--scales", default=DEFAULT_SCALES,
+                        help="comma-separated sizes (docs / molecules / feedback rows / KG hypotheses)")
+    parser.add_argument("--ops", type=int, default=50, help="timed calls per bench and scale")
+    parser.add_argument("--embeddings", choices=("model", "hashed"), default="model",
+                        help="SentenceTransformer model, or hashed bag-of-words vectors")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="stub seconds to first token")
+    parser.add_argument("--llm-tokens-per-sec", type=float, default=0.0, help="stub token rate (0 = instant)")
+    parser.add_argument("--output", type=Path, default=None, help="write JSON results here (default: stdout)")
+    parser.add_argument("--compare", type=Path, default=None, help="baseline JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown vs. baseline")
+    parser.add_argument("--workdir", type=Path, default=None, help="keep the synthetic workspace here")
+    args = parser.parse_args()
+
+    benches = [b.strip() for b in args.benches.split(",") if b.strip()]
+    unknown = set(benches) - set(BENCHES)
+    if unknown:
+        parser.error(f"unknown benches: {', '.join(sorted(unknown))}")
+    scales = [int(float(s)) for s in args.scales.split(",") if s.strip()]
+
+    workdir = args.workdir or Path(tempfile.mkdtemp(prefix="ey_bench_"))
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    # Stub LLM + isolated caches; set before any backend module is imported
+    stub = StubConfig(args.llm_latency, args.llm_tokens_per_sec)
+    server, url = start_stub_server(config=stub)
+    os.environ["OLLAMA_HOST"] = url
+    os.environ["LLM_CACHE_ENABLED"] = "0"
+    os.environ["FP_CACHE_DIR"] = str(workdir / "fp_cache")
+    os.environ["VECTOR_BACKEND"] = "numpy"
+
+    try:
+        from rdkit import RDLogger
+        RDLogger.DisableLog("rdApp.*")      # per-call deprecation warnings flood stderr
+    except ImportError:
+        pass
+
+    if args.embeddings == "hashed":
+        from backend import embedder
+        embedder._MODEL = HashedEncoder()
+
+    log = lambda msg: print(msg, file=sys.stderr)
+    started = time.perf_counter()
+    try:
+        results, skipped = run_benchmarks(benches, scales, args.ops, workdir, log)
+    finally:
+        server.shutdown()
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "scales": scales,
+            "ops": args.ops,
+            "embeddings": args.embeddings,
+            "llm_latency_s": args.llm_latency,
+            "llm_tokens_per_sec": args.llm_tokens_per_sec,
+            "llm_requests": stub.requests,
+            "elapsed_s": round(time.perf_counter() - started, 2),
+        },
+        "skipped": skipped,
+        "results": results,
+    }
+
+    regressions = []
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text(encoding="utf-8")),
+                              args.tolerance)
+        report["regressions"] = regressions
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+        log(f"✔ {len(results)} results written to {args.output}")
+    else:
+        print(text)
+
+    if regressions:
+        for r in regressions:
+            log(f"✘ {r['bench']} @ {r['scale']}: p50 {r['baseline_p50_ms']} → {r['p50_ms']} ms "
+                f"(x{r['ratio']})")
+        sys.exit(1)
@@ -1,56 +1,283 @@
+import argparse
+import hashlib
 import json
+import os
+import sqlite3
+import time
 from pathlib import Path
+
+from tqdm import tqdm
+
+from backend.cooccurrence import COOC_INDEX_PATH, CooccurrenceIndex
 from backend.embedder import Embedder
 
+PROJECT_ROOT = Path(__file__).resolve().parent
+DOCS_FILE = PROJECT_ROOT / "data" / "docs.jsonl"
+
+DEFAULT_BATCH_SIZE = 256
+# Docs between checkpoints; the interval also grows with the BM25 and
+# co-occurrence indexes so re-pickling them stays linear in corpus size
+DEFAULT_CHECKPOINT_DOCS = int(os.getenv("INDEX_CHECKPOINT_DOCS", "20000"))
+
 
 # ---------------------------------------------------------------
-# LOAD DOCUMENTS (JSON or JSONL)
+# STREAM DOCUMENTS (JSONL line by line, or a JSON array)
 # ---------------------------------------------------------------
-def load_docs():
+def iter_docs(data_path: Path = DOCS_FILE, start: int = 0):
     """
-    Loads documents from ey_project/data/docs.jsonl.
+    Yields (doc, position) pairs from docs.jsonl.
+
+    `position` is a resume token: the byte offset just after the doc for
+    JSONL, or the item count for a JSON array file. Passing it back as
+    `start` continues right after that doc.
     Supports:
-    - JSON array ([ {...}, {...} ])
-    - JSONL (one JSON per line)
+    - JSONL (one JSON per line) — streamed, never fully loaded
+    - JSON array ([ {...}, {...} ]) — loaded at once
     """
-
-    data_path = Path(__file__).resolve().parents[1] / "data" / "docs.jsonl"
-
     if not data_path.exists():
         raise FileNotFoundError(f"docs.jsonl not found at: {data_path}")
 
-    raw = data_path.read_text(encoding="utf-8").strip()
-    if not raw:
-        raise ValueError("docs.jsonl is empty")
-
-    docs = []
+    with data_path.open("rb") as f:
+        head = f.read(64).lstrip()
 
     # JSON array format
-    if raw.startswith("["):
-        docs = json.loads(raw)
+    if head.startswith(b"["):
+        docs = json.loads(data_path.read_text(encoding="utf-8"))
+        for i in range(start, len(docs)):
+            yield docs[i], i + 1
+        return
 
-    else:  # JSONL
-        for line in raw.splitlines():
-            clean = line.strip().rstrip(",")
+    with data_path.open("rb") as f:
+        f.seek(start)
+        offset = start
+        for line in f:
+            offset += len(line)
+            clean = line.decode("utf-8").strip().rstrip(",")
             if clean:
-                docs.append(json.loads(clean))
+                yield json.loads(clean), offset
+
 
+def load_docs():
+    """
+    Loads all documents from ey_project/data/docs.jsonl into a list.
+    """
+    docs = [doc for doc, _ in iter_docs()]
+    if not docs:
+        raise ValueError("docs.jsonl is empty")
     return docs
 
 
+def content_hash(doc) -> str:
+    payload = json.dumps(
+        {"text": doc.get("text", ""), "title": doc.get("title") or ""},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+# ---------------------------------------------------------------
+# MANIFEST: what is indexed + resumable checkpoint
+# ---------------------------------------------------------------
+class IndexManifest:
+    """
+    SQLite record of every indexed doc's content hash, plus the
+    checkpoint (run id + resume position) of the current indexing run.
+    One per vector store (Embedder.manifest_path): switching backends
+    must not mark docs as indexed in a store that never saw them.
+    """
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path))
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS docs (
+                id     TEXT PRIMARY KEY,
+                hash   TEXT NOT NULL,
+                run_id TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_docs_run ON docs(run_id);
+            CREATE TABLE IF NOT EXISTS checkpoint (
+                key   TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+
+    def hashes(self, ids):
+        rows = self.conn.execute(
+            f"SELECT id, hash FROM docs WHERE id IN ({','.join('?' * len(ids))})",
+            list(ids),
+        ).fetchall()
+        return dict(rows)
+
+    def mark(self, entries, run_id: str):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO docs (id, hash, run_id) VALUES (?, ?, ?)",
+            [(doc_id, h, run_id) for doc_id, h in entries],
+        )
+
+    def stale_ids(self, run_id: str, limit: int):
+        rows = self.conn.execute(
+            "SELECT id FROM docs WHERE run_id != ? LIMIT ?", (run_id, limit)
+        ).fetchall()
+        return [r[0] for r in rows]
+
+    def forget(self, ids):
+        self.conn.executemany("DELETE FROM docs WHERE id = ?", [(i,) for i in ids])
+
+    def load_checkpoint(self):
+        return dict(self.conn.execute("SELECT key, value FROM checkpoint").fetchall())
+
+    def save_checkpoint(self, **values):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO checkpoint (key, value) VALUES (?, ?)",
+            [(k, str(v)) for k, v in values.items()],
+        )
+
+    def clear_checkpoint(self):
+        self.conn.execute("DELETE FROM checkpoint")
+
+    def commit(self):
+        self.conn.commit()
+
+
+# ---------------------------------------------------------------
+# INCREMENTAL INDEXING
+# ---------------------------------------------------------------
+def run_incremental_index(embedder, data_path: Path = DOCS_FILE,
+                          manifest: IndexManifest = None,
+                          batch_size: int = DEFAULT_BATCH_SIZE, resume: bool = True,
+                          checkpoint_docs: int = DEFAULT_CHECKPOINT_DOCS,
+                          cooc: CooccurrenceIndex = None, cooc_path: Path = COOC_INDEX_PATH):
+    """
+    Brings the vector DB in line with docs.jsonl:
+        - new or changed docs (by content hash) are embedded + upserted
+        - unchanged docs are skipped
+        - docs no longer in the file are deleted
+    The entity co-occurrence index is kept in step with the same changes.
+    Vectors are written per batch; the BM25 and co-occurrence indexes and
+    the manifest are saved together at checkpoints (every `checkpoint_docs`
+    docs, or 10% of the indexed docs if larger), so an interrupted run
+    resumes from the last checkpoint and re-processes only the docs after it.
+
+    Returns counters: seen, upserted, unchanged, deleted.
+    """
+    manifest = manifest or IndexManifest(embedder.manifest_path)
+    cooc = cooc if cooc is not None else CooccurrenceIndex.load(cooc_path)
+    source = str(data_path.resolve())
+
+    checkpoint = manifest.load_checkpoint()
+    if resume and checkpoint.get("source") == source:
+        run_id = checkpoint["run_id"]
+        start = int(checkpoint["position"])
+        # Keep backfilling indexes that an interrupted run started on
+        backfill_lexical = checkpoint.get(
+            "backfill_lexical", str(int(len(embedder.lexical) == 0))
+        ) == "1"
+        backfill_cooc = checkpoint.get("backfill_cooc", str(int(len(cooc) == 0))) == "1"
+        print(f"↩ Resuming run {run_id} from position {start}")
+    else:
+        run_id = f"{time.time():.6f}"
+        start = 0
+        # Vector DB already populated but no BM25 / co-occurrence index yet: backfill
+        backfill_lexical = len(embedder.lexical) == 0
+        backfill_cooc = len(cooc) == 0
+        manifest.clear_checkpoint()
+        manifest.save_checkpoint(run_id=run_id, source=source, position=0,
+                                 backfill_lexical=int(backfill_lexical),
+                                 backfill_cooc=int(backfill_cooc))
+        manifest.commit()
+
+    stats = {"seen": 0, "upserted": 0, "unchanged": 0, "deleted": 0}
+    batch, position = {}, start
+    pending = 0
+
+    def commit_checkpoint():
+        # The manifest only records docs whose index entries are on disk
+        embedder.save_lexical_index()
+        cooc.save(cooc_path)
+        manifest.save_checkpoint(position=position)
+        manifest.commit()
+
+    def flush():
+        nonlocal pending
+        known = manifest.hashes(list(batch))
+        changed = [doc for doc_id, (doc, h) in batch.items() if known.get(doc_id) != h]
+
+        unchanged = [doc for doc_id, (doc, h) in batch.items() if known.get(doc_id) == h]
+
+        embedder.upsert_docs(changed)
+        if backfill_lexical:
+            embedder.add_lexical(unchanged)
+
+        cooc.add_docs(changed + (unchanged if backfill_cooc else []))
+
+        manifest.mark([(doc_id, h) for doc_id, (_, h) in batch.items()], run_id)
+
+        stats["upserted"] += len(changed)
+        stats["unchanged"] += len(batch) - len(changed)
+        pending += len(batch)
+        batch.clear()
+
+        if pending >= max(checkpoint_docs, max(len(embedder.lexical), len(cooc)) // 10):
+            commit_checkpoint()
+            pending = 0
+
+    for doc, position in tqdm(iter_docs(data_path, start), desc="Indexing", unit="doc"):
+        stats["seen"] += 1
+        # A repeated id inside one batch: the later doc wins
+        batch[str(doc["id"])] = (doc, content_hash(doc))
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+    commit_checkpoint()
+
+    # Anything not touched by this run was removed from the corpus
+    while True:
+        stale = manifest.stale_ids(run_id, batch_size)
+        if not stale:
+            break
+        embedder.delete_docs(stale)
+        cooc.remove_docs(stale)
+        manifest.forget(stale)
+        stats["deleted"] += len(stale)
+    commit_checkpoint()
+
+    # Heavy index maintenance happens here, never on the query path
+    if embedder.optimize_index():
+        print("🧭 Vector index compacted / partitions rebuilt")
+
+    manifest.clear_checkpoint()
+    manifest.commit()
+    return stats
+
+
 # ---------------------------------------------------------------
 # MAIN EXECUTION: INDEX DOCUMENTS
 # ---------------------------------------------------------------
 if __name__ == "__main__":
-    print("📄 Loading docs.jsonl ...")
-    docs = load_docs()
+    parser = argparse.ArgumentParser(description="Incrementally index docs.jsonl")
+    parser.add_argument("--path", type=Path, default=DOCS_FILE)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--checkpoint-docs", type=int, default=DEFAULT_CHECKPOINT_DOCS,
+                        help="docs between index saves / resumable checkpoints")
+    parser.add_argument("--restart", action="store_true",
+                        help="ignore any checkpoint and start a fresh run")
+    args = parser.parse_args()
 
-    print(f"Loaded {len(docs)} documents.")
+    print(f"📄 Streaming {args.path} ...")
 
     embedder = Embedder()
     embedder.create_collection()
 
-    print("🔄 Indexing into ChromaDB (this runs only once)...")
-    embedder.index_docs(docs)
+    stats = run_incremental_index(
+        embedder, args.path, batch_size=args.batch_size, resume=not args.restart,
+        checkpoint_docs=args.checkpoint_docs,
+    )
 
-    print("✔ Indexing completed — ChromaDB is ready!")
+    print(
+        f"✔ Indexing completed — {stats['seen']} docs seen, "
+        f"{stats['upserted']} embedded, {stats['unchanged']} unchanged, "
+        f"{stats['deleted']} deleted."
+    )
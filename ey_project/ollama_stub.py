@@ -0,0 +1,250 @@
+"""
+Local stand-in for Ollama's /api/generate, for offline testing.
+
+    # serve on :11434 (point OLLAMA_HOST at it if you use another port)
+    python ollama_stub.py serve --port 11434 --latency 0.5 --tokens-per-sec 40
+
+    # burst-test the pooled LLM client against an in-process stub
+    python ollama_stub.py loadtest --requests 500 --concurrency 64
+"""
+import argparse
+import json
+import random
+import re
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# ---------------------------------------------------------------
+# CANNED RESPONSES (shaped like the real agents' outputs)
+# ---------------------------------------------------------------
+def canned_response(prompt: str) -> str:
+    if '"hypotheses"' in prompt:
+        return json.dumps({
+            "hypotheses": [
+                {
+                    "text": "Inhibiting IL-6/JAK/STAT3 signaling reduces tumor progression.",
+                    "evidence": [{"doc_id": "doc002", "snippet": "IL-6 activates JAK/STAT3."}],
+                },
+                {
+                    "text": "EGFR inhibitors improve outcomes in EGFR-mutant NSCLC.",
+                    "evidence": [{"doc_id": "doc001", "snippet": "EGFR inhibitors such as gefitinib."}],
+                },
+            ]
+        })
+    if '"scores"' in prompt:
+        n = len(re.findall(r"^\[\d+\] HYPOTHESIS:", prompt, flags=re.MULTILINE))
+        return json.dumps({"scores": [
+            {"index": i, "score": 0.7, "reason": "stub evidence assessment"} for i in range(n)
+        ]})
+    if '"score"' in prompt:
+        return json.dumps({"score": 0.7, "reason": "stub evidence assessment"})
+    return (
+        "1. Culture the relevant cell line.\n"
+        "2. Treat with the candidate compound across a dose range.\n"
+        "3. Measure pathway marker expression.\n"
+        "4. Compare against vehicle control."
+    )
+
+
+def tokenize(text: str, size: int = 4):
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+# ---------------------------------------------------------------
+# HTTP HANDLER
+# ---------------------------------------------------------------
+class StubConfig:
+    def __init__(self, latency: float = 0.0, tokens_per_sec: float = 0.0,
+                 failure_rate: float = 0.0, responder=canned_response):
+        self.latency = latency              # seconds before the first token
+        self.tokens_per_sec = tokens_per_sec  # 0 = emit everything at once
+        self.failure_rate = failure_rate    # fraction of requests answered with 503
+        self.responder = responder
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def count(self):
+        with self._lock:
+            self.requests += 1
+
+
+class OllamaStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"       # keep-alive, like Ollama
+    disable_nagle_algorithm = True
+    config = StubConfig()
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json(200, {"models": [{"name": "stub"}]})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": "invalid JSON"})
+            return
+
+        if self.path != "/api/generate":
+            self._send_json(404, {"error": "not found"})
+            return
+
+        cfg = self.config
+        cfg.count()
+
+        if cfg.failure_rate and random.random() < cfg.failure_rate:
+            self._send_json(503, {"error": "stub overloaded"})
+            return
+
+        time.sleep(cfg.latency)
+        tokens = tokenize(cfg.responder(payload.get("prompt", "")))
+        delay = 1.0 / cfg.tokens_per_sec if cfg.tokens_per_sec else 0.0
+        model = payload.get("model", "stub")
+
+        if not payload.get("stream", True):
+            time.sleep(delay * len(tokens))
+            self._send_json(200, {"model": model, "response": "".join(tokens), "done": True})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        for token in tokens:
+            if delay:
+                time.sleep(delay)
+            line = {"model": model, "response": token, "done": False}
+            self._write_chunk((json.dumps(line) + "\n").encode("utf-8"))
+
+        final = {"model": model, "response": "", "done": True}
+        self._write_chunk((json.dumps(final) + "\n").encode("utf-8"))
+        self._write_chunk(b"")
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256    # default of 5 drops connections under bursts
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0, config: StubConfig = None):
+    """
+    Starts the stub in a daemon thread.
+    Returns (server, base_url). Call server.shutdown() to stop it.
+    """
+    handler = type("ConfiguredStubHandler", (OllamaStubHandler,),
+                   {"config": config or StubConfig()})
+    server = StubServer((host, port), handler)
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+# ---------------------------------------------------------------
+# LOAD TEST FOR THE POOLED CLIENT
+# ---------------------------------------------------------------
+def load_test(n_requests: int, concurrency: int, config: StubConfig, max_in_flight: int,
+              queue_timeout: float):
+    from backend.llm_client import OllamaClient
+
+    server, url = start_stub_server(config=config)
+    client = OllamaClient(host=url, max_in_flight=max_in_flight,
+                          queue_timeout=queue_timeout, backoff_base=0.05)
+
+    def one_call(i):
+        start = time.perf_counter()
+        try:
+            client.generate(f"load test {i}", "stub")
+            return "ok", time.perf_counter() - start
+        except Exception as e:
+            return type(e).__name__, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one_call, range(n_requests)))
+    elapsed = time.perf_counter() - start
+
+    server.shutdown()
+    client.close()
+
+    latencies = sorted(t for status, t in results if status == "ok")
+    outcome = Counter(status for status, _ in results)
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else None
+
+    return {
+        "requests": n_requests,
+        "concurrency": concurrency,
+        "max_in_flight": max_in_flight,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(n_requests / elapsed, 1) if elapsed else None,
+        "outcomes": dict(outcome),
+        "server_requests": config.requests,
+        "latency_mean_s": round(statistics.mean(latencies), 4) if latencies else None,
+        "latency_p50_s": pct(0.50),
+        "latency_p95_s": pct(0.95),
+        "latency_p99_s": pct(0.99),
+    }
+
+
+# ---------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline Ollama stub + client load test")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    for name in ("serve", "loadtest"):
+        p = sub.add_parser(name)
+        p.add_argument("--latency", type=float, default=0.05)
+        p.add_argument("--tokens-per-sec", type=float, default=0.0)
+        p.add_argument("--failure-rate", type=float, default=0.0)
+
+    sub.choices["serve"].add_argument("--host", default="127.0.0.1")
+    sub.choices["serve"].add_argument("--port", type=int, default=11434)
+
+    lt = sub.choices["loadtest"]
+    lt.add_argument("--requests", type=int, default=200)
+    lt.add_argument("--concurrency", type=int, default=32)
+    lt.add_argument("--max-in-flight", type=int, default=8)
+    lt.add_argument("--queue-timeout", type=float, default=30.0)
+
+    args = parser.parse_args()
+    cfg = StubConfig(args.latency, args.tokens_per_sec, args.failure_rate)
+
+    if args.cmd == "serve":
+        server, url = start_stub_server(args.host, args.port, cfg)
+        print(f"🧪 Ollama stub listening on {url} (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+    else:
+        report = load_test(args.requests, args.concurrency, cfg,
+                           args.max_in_flight, args.queue_timeout)
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,46 @@
+import argparse
+from pathlib import Path
+
+from tqdm import tqdm
+
+from backend.pipeline import PIPELINE_WORKERS, llm_budget, run_batch
+
+PROJECT_ROOT = Path(__file__).resolve().parent
+
+
+# ---------------------------------------------------------------
+# MAIN EXECUTION: HEADLESS BATCH PIPELINE
+# ---------------------------------------------------------------
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run literature → hypotheses → score → experiment over a JSONL file of queries"
+    )
+    parser.add_argument("input", type=Path, help="JSONL with id/request_id + query/title/body")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="results JSONL (default: <input>.results.jsonl)")
+    parser.add_argument("--workers", type=int, default=PIPELINE_WORKERS)
+    parser.add_argument("--limit", type=int, default=None, help="run at most N new queries")
+    parser.add_argument("--restart", action="store_true",
+                        help="do not skip ids already completed in the output file")
+    parser.add_argument("--no-tasks", action="store_true",
+                        help="skip evidence scoring + experiment design")
+    args = parser.parse_args()
+
+    output = args.output or args.input.with_suffix(".results.jsonl")
+    workers, llm_concurrency = llm_budget(args.workers)
+    print(f"📄 {args.input} → {output} ({workers} workers × {llm_concurrency} LLM calls)")
+
+    bar = tqdm(desc="Queries", unit="query")
+    stats = run_batch(
+        args.input, output, workers=args.workers, resume=not args.restart,
+        limit=args.limit, tasks=not args.no_tasks, progress=lambda result: bar.update(1),
+    )
+    bar.close()
+
+    print(
+        f"✔ Pipeline completed — {stats['ok']} ok, {stats['partial']} partial, "
+        f"{stats['error']} failed, "
+        f"{stats['skipped']} already done (of {stats['total']})."
+    )
+    if stats["unparsable"]:
+        print(f"⚠ {stats['unparsable']} unparsable lines skipped in {args.input}")
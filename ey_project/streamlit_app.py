@@ -12,11 +12,12 @@ from pathlib import Path
 from typing import Dict, Any, List, Set
 import datetime
 import re
+import uuid
 import networkx as nx
 from pyvis.network import Network
 
 # Backend Imports
-from backend.agents import literature_agent, evidence_scorer, experiment_recommender
+from backend.agents import literature_agent_stream, run_hypothesis_tasks
 from backend.active_learning import save_feedback, rerank_hypotheses
 from backend.chem_utils import compute_similarity
 from backend.knowledge_graph import (
@@ -25,7 +26,9 @@ from backend.knowledge_graph import (
     add_hypothesis_to_kg,
     build_dynamic_pathway_graph,
     draw_knowledge_graph_html,
-    draw_pathway_graph_html
+    draw_pathway_graph_html,
+    LOD_MODES,
+    KG_MAX_RENDER_NODES,
 )
 
 # ============================================================
@@ -47,13 +50,52 @@ if "last_query" not in st.session_state:
 if "last_results" not in st.session_state:
     st.session_state.last_results = {}
 
+if "lit_cache" not in st.session_state:
+    st.session_state.lit_cache = {}
+
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+
+# Reviewer identity for feedback entries (optional)
+REVIEWER_ID = os.getenv("REVIEWER_ID")
+
+# Most matches offered when picking a neighborhood's center node
+CENTER_NODE_CHOICES = int(os.getenv("KG_CENTER_NODE_CHOICES", 50))
+
 # ============================================================
 # CACHING FOR SPEED
 # ============================================================
 
-@st.cache_data(show_spinner=False)
 def cached_literature_agent(query: str):
-    return literature_agent(query)
+    """
+    Streams hypotheses into a live preview while the LLM generates,
+    then caches the final (parsed, docs) for this session when it
+    contains hypotheses.
+    """
+    if query in st.session_state.lit_cache:
+        return st.session_state.lit_cache[query]
+
+    preview = st.empty()
+    parsed, docs, streamed = {}, [], []
+
+    for event, payload in literature_agent_stream(query):
+        if event == "docs":
+            docs = payload
+            preview.info("⏳ Generating hypotheses...")
+        elif event == "hypothesis":
+            streamed.append(payload)
+            preview.markdown(
+                "**Hypotheses so far:**\n\n"
+                + "\n".join(f"- {h.get('text', '')}" for h in streamed)
+            )
+        elif event == "done":
+            parsed = payload
+
+    preview.empty()
+    # Errors (LLM_UNAVAILABLE, JSON_PARSE_FAILED) are retried on the next run
+    if isinstance(parsed.get("hypotheses"), list):
+        st.session_state.lit_cache[query] = (parsed, docs)
+    return parsed, docs
 
 @st.cache_data(show_spinner=False)
 def cached_similarity(smi1: str, smi2: str):
@@ -80,6 +122,13 @@ if run:
     parsed, docs = cached_literature_agent(query)
 
     st.subheader("📄 Retrieved Documents")
+    report = parsed.get("context_report")
+    if report:
+        st.caption(
+            f"Context: {report['packed_tokens']}/{report['token_budget']} tokens used, "
+            f"{report['dropped_tokens']} tokens dropped "
+            f"({report['duplicate_sentences']} duplicate sentences)"
+        )
     for d in docs:
         with st.expander(f"{d['id']} — {d['meta']['title']}"):
             st.write(d["text"])
@@ -110,6 +159,8 @@ if run:
 
         st.subheader("🧠 Hypotheses")
 
+        score_slots, exp_slots, task_inputs = [], [], []
+
         for i, h in enumerate(parsed["hypotheses"]):
             st.markdown(f"### Hypothesis {i + 1}")
             st.write(h["text"])
@@ -121,24 +172,25 @@ if run:
             for s in evidence_snips:
                 st.write(f"- {s}")
 
-            # Score
-            score = evidence_scorer(h["text"], evidence_snips)
-            st.info(f"Evidence Score: {score}")
-
-            # Experiment Recommendation
-            exp_text = experiment_recommender(h["text"], evidence_snips)
-            st.success(exp_text)
+            # Score + Experiment placeholders (filled as LLM calls finish)
+            score_slots.append(st.empty())
+            exp_slots.append(st.empty())
+            score_slots[i].info("⏳ Scoring evidence...")
+            exp_slots[i].info("⏳ Designing experiment...")
+            task_inputs.append((h["text"], evidence_snips))
 
             # Buttons
             col1, col2, col3 = st.columns(3)
 
             # Feedback buttons
             if col1.button(f"Accept {i+1}", key=f"acc_{i}_{h['text']}"):
-                save_feedback(h["text"], True)
+                save_feedback(h["text"], True, user_id=REVIEWER_ID,
+                              session_id=st.session_state.session_id)
                 st.success("Feedback saved ✔")
 
             if col2.button(f"Reject {i+1}", key=f"rej_{i}_{h['text']}"):
-                save_feedback(h["text"], False)
+                save_feedback(h["text"], False, user_id=REVIEWER_ID,
+                              session_id=st.session_state.session_id)
                 st.error("Feedback saved ✘")
 
             # Add to KG button
@@ -147,6 +199,16 @@ if run:
                 save_knowledge_graph(st.session_state.kg)
                 st.success("Added to Knowledge Graph!")
 
+        # Score + Experiment Recommendation (concurrent)
+        for i, task, result in run_hypothesis_tasks(task_inputs):
+            if task == "score":
+                score_slots[i].info(f"Evidence Score: {result}")
+            else:
+                exp_slots[i].success(result)
+
+    elif parsed.get("error") == "LLM_UNAVAILABLE":
+        st.error(f"LLM unavailable ({parsed.get('error_type')}): {parsed.get('detail')}")
+
     # =======================================================
     # DYNAMIC PATHWAY GRAPH
     # =======================================================
@@ -165,8 +227,32 @@ if run:
     # =======================================================
     st.subheader("🧠 Knowledge Graph")
 
-    if len(st.session_state.kg["nodes"]) > 0:
-        kg_path = draw_knowledge_graph_html(st.session_state.kg)
+    if len(st.session_state.kg) > 0:
+        # Level-of-detail controls (keeps large graphs interactive)
+        c1, c2, c3 = st.columns(3)
+        view_mode = c1.selectbox("View", LOD_MODES, key="kg_view_mode")
+        max_nodes = c2.number_input("Max nodes", 20, 5000, KG_MAX_RENDER_NODES, step=20,
+                                    key="kg_max_nodes")
+        center = None
+        if view_mode == "neighborhood":
+            # Search the label index instead of listing every node id
+            kg = st.session_state.kg
+            term = c3.text_input("Find center node", key="kg_center_term").strip()
+            matches = []
+            if term:
+                exact = [term] if term in kg.nodes else []
+                matches = list(dict.fromkeys(exact + kg.find_nodes(term)))[:CENTER_NODE_CHOICES]
+            if matches:
+                center = c3.selectbox(
+                    "Center node", matches, key="kg_center",
+                    format_func=lambda n: f"{n} — {kg.nodes[n].get('label', n)}"[:80],
+                )
+            elif term:
+                c3.caption(f"No node mentions “{term}”.")
+
+        kg_path = draw_knowledge_graph_html(
+            st.session_state.kg, mode=view_mode, center=center, hops=2, max_nodes=int(max_nodes)
+        )
         st.components.v1.html(open(kg_path).read(), height=420)
     else:
         st.info("No Knowledge Graph entries yet. Add hypotheses using the ➕ button!")
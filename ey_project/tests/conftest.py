@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Tests import the app the way the scripts do: `from backend... import ...`
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
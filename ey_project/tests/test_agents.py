@@ -0,0 +1,49 @@
+import json
+import sqlite3
+
+from backend import agents
+
+
+def test_batch_scorer_tolerates_bad_indices(monkeypatch):
+    scores = [
+        {"index": None, "score": 0.9, "reason": "null index"},
+        {"index": "one", "score": 0.4},
+        {"index": 7, "score": 0.1},
+        {"index": -1, "score": 0.2},
+        {"index": "2", "score": 1.5},
+    ]
+    monkeypatch.setattr(agents, "llm", lambda prompt, format=None: json.dumps({"scores": scores}))
+
+    result = agents.evidence_scorer_batch([("h0", "e0"), ("h1", "e1"), ("h2", "e2"), ("h3", "e3")])
+    assert result[0] == {"score": 0.9, "reason": "null index"}
+    assert result[1] == {"score": 0.4, "reason": ""}
+    assert result[2] == {"score": 1.0, "reason": ""}
+    assert result[3] == {"error": "MISSING_SCORE"}
+
+
+class _BrokenCache:
+    def get(self, key):
+        raise sqlite3.OperationalError("database is locked")
+
+    def put(self, key, model, response):
+        raise sqlite3.DatabaseError("file is not a database")
+
+
+def test_llm_falls_back_to_uncached_call_on_cache_errors(monkeypatch):
+    calls = []
+
+    class Client:
+        def generate(self, prompt, model, options, format):
+            calls.append(prompt)
+            return " generated "
+
+        def stream(self, prompt, model, options):
+            calls.append(prompt)
+            yield from ["gen", "erated"]
+
+    monkeypatch.setattr(agents, "get_llm_cache", lambda: _BrokenCache())
+    monkeypatch.setattr(agents, "get_llm_client", lambda: Client())
+
+    assert agents.llm("p") == "generated"
+    assert "".join(agents.llm_stream("p")) == "generated"
+    assert calls == ["p", "p"]
@@ -0,0 +1,15 @@
+import numpy as np
+
+from backend import bit_utils
+
+
+def test_popcount_matches_python_with_and_without_bitwise_count(monkeypatch):
+    rng = np.random.default_rng(0)
+    words = rng.integers(0, 2**63, size=(50, 3, 32), dtype=np.uint64) | np.uint64(1 << 63)
+    expected = [[sum(bin(int(w)).count("1") for w in row) for row in block] for block in words]
+
+    assert bit_utils.popcount(words).tolist() == expected
+    # Strided slices take the NumPy < 2.0 lookup-table path too
+    monkeypatch.delattr(np, "bitwise_count", raising=False)
+    assert bit_utils.popcount(words).tolist() == expected
+    assert bit_utils.popcount(words[:, 1]).tolist() == [block[1] for block in expected]
@@ -0,0 +1,174 @@
+import itertools
+
+import numpy as np
+import pytest
+from rdkit import Chem, DataStructs
+from rdkit.Chem import AllChem
+
+from backend import chem_utils
+from backend.chem_utils import (
+    FingerprintIndex,
+    FingerprintStore,
+    SubstructureIndex,
+    compute_fingerprints_batch,
+    load_molecule_records,
+    morgan_fingerprint,
+    similarity_matrix,
+)
+
+# Small combinatorial library: every core with every substituent
+CORES = ["c1ccccc1{}", "c1ccncc1{}", "C1CCCCC1{}", "c1ccc2ccccc2c1{}", "O=C(O)c1ccc({})cc1",
+         "CC(=O)Nc1ccc({})cc1", "c1cc[nH]c1{}"]
+SUBSTITUENTS = ["C", "O", "N", "Cl", "C(=O)O", "OC", "C#N", "S(=O)(=O)N", "CCN(C)C", "F"]
+LIBRARY = [(f"m{i}", core.format(sub)) for i, (core, sub)
+           in enumerate(itertools.product(CORES, SUBSTITUENTS))]
+
+
+def _library():
+    return LIBRARY + list(load_molecule_records()) + [("broken", "C1CC(")]
+
+
+def _rdkit_fp(smi):
+    """Reference Morgan bit vector, straight from RDKit."""
+    return AllChem.GetMorganFingerprintAsBitVect(
+        Chem.MolFromSmiles(smi), chem_utils.FP_RADIUS, nBits=chem_utils.FP_BITS)
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    """Fingerprint stores in tmp_path instead of data/fp_cache."""
+    for kind in chem_utils.FINGERPRINTERS:
+        monkeypatch.setitem(chem_utils._FINGERPRINT_STORES, kind, FingerprintStore(tmp_path, kind))
+    return chem_utils._FINGERPRINT_STORES["morgan"]
+
+
+def test_store_round_trip_and_aliases(store, tmp_path):
+    fp = store.get_or_compute("OCC")
+    assert np.array_equal(fp, morgan_fingerprint("CCO"))
+    assert store.get_or_compute("not a smiles") is None
+
+    # A fresh reader sees canonical form, raw alias and the invalid marker
+    reader = FingerprintStore(tmp_path)
+    assert np.array_equal(reader.get("CCO")[1], fp)
+    assert np.array_equal(reader.get("OCC")[1], fp)
+    assert reader.get("not a smiles") == (True, None)
+    assert reader.get("CCN") == (False, None)
+    assert len(reader) == 1
+
+
+def test_batch_refreshes_the_index_once(store, monkeypatch):
+    refreshes = []
+    refresh = store.refresh
+    monkeypatch.setattr(store, "refresh", lambda: refreshes.append(1) or refresh())
+
+    # 50 misses: one refresh for the lookups, one under the write lock
+    fps, valid = compute_fingerprints_batch([f"C{'C' * i}O" for i in range(50)], n_jobs=1)
+    assert valid.all() and len(refreshes) == 2
+
+    # All hits, index unchanged: the refresh is a stat, never a read
+    opens = []
+    path_open = type(store.index_path).open
+    monkeypatch.setattr(type(store.index_path), "open",
+                        lambda self, *a, **kw: opens.append(self) or path_open(self, *a, **kw))
+    fps, valid = compute_fingerprints_batch(["CCO", "CCCO"] * 50, n_jobs=1)
+    assert valid.all() and opens == []
+
+
+def test_batch_sees_keys_from_other_writers(store, tmp_path):
+    other = FingerprintStore(tmp_path)
+    other.get_or_compute("c1ccccc1")
+
+    compute_fingerprints_batch(["c1ccccc1"], n_jobs=1, chunk_size=1)
+    assert store.get("c1ccccc1", refresh=False)[0]
+
+
+def test_keys_with_tabs_or_newlines_are_not_stored(store, tmp_path):
+    bad = ["CCO\n0\t0", "CC\tO", "CCO\r"]
+    fps, valid = compute_fingerprints_batch(bad + ["CCN"], n_jobs=1)
+    assert valid[-1]
+
+    reader = FingerprintStore(tmp_path)
+    lines = reader.index_path.read_text().split("\n")[:-1]
+    assert all(line.count("\t") == 1 for line in lines)
+    for key in bad:
+        assert not reader.get(key)[0]
+    assert np.array_equal(reader.get("CCN")[1], morgan_fingerprint("CCN"))
+
+
+def test_index_top_k_matches_brute_force_tanimoto():
+    records = _library()
+    index = FingerprintIndex.from_records(records)
+    # Invalid SMILES (one in the shipped library too) are skipped
+    assert len(index) == sum(Chem.MolFromSmiles(smi) is not None for _, smi in records)
+    assert "broken" not in index.names
+
+    library_fps = [_rdkit_fp(smi) for smi in index.smiles]
+    for query in ["Cc1ccccc1", "CC(=O)Oc1ccccc1C(=O)O", "Clc1ccncc1", "CCN(CC)CC"]:
+        expected = sorted(DataStructs.BulkTanimotoSimilarity(_rdkit_fp(query), library_fps),
+                          reverse=True)
+        hits = index.search(query, top_k=5)
+        assert [score for *_, score in hits] == pytest.approx(expected[:5])
+        for name, smi, score in hits:
+            assert index.names[index.smiles.index(smi)] == name
+            assert score == pytest.approx(DataStructs.TanimotoSimilarity(_rdkit_fp(query), _rdkit_fp(smi)))
+
+    assert index.search("not a smiles") == [] and index.search("CCO", top_k=0) == []
+    assert len(index.search("CCO", top_k=10_000)) == len(index)
+
+
+@pytest.mark.parametrize("use_cache", [False, True])
+def test_batch_fingerprints_match_one_by_one(use_cache):
+    smiles = [smi for _, smi in _library()] + ["", None]
+    expected = [morgan_fingerprint(smi) if isinstance(smi, str) else None for smi in smiles]
+
+    # Small chunks over a real process pool
+    fps, valid = compute_fingerprints_batch(smiles, n_jobs=2, chunk_size=16, use_cache=use_cache)
+    assert valid.tolist() == [fp is not None for fp in expected]
+    for row, fp in zip(fps, expected):
+        assert np.array_equal(row, fp if fp is not None else np.zeros_like(row))
+
+    # Second pass is served from the store (or recomputed) identically
+    again, valid_again = compute_fingerprints_batch(smiles, n_jobs=1, use_cache=use_cache)
+    assert np.array_equal(again, fps) and np.array_equal(valid_again, valid)
+
+
+def test_similarity_matrix_matches_pairwise_tanimoto():
+    smiles = ["CCO", "OCC", "c1ccccc1O", "C1CC(", "CC(=O)Oc1ccccc1C(=O)O"]
+    other = ["CCN", "c1ccccc1", "not a smiles"]
+
+    sims, valid_a, valid_b = similarity_matrix(smiles)
+    assert valid_a.tolist() == [True, True, True, False, True] and valid_b is valid_a
+    assert np.isnan(sims[3]).all() and np.isnan(sims[:, 3]).all()
+    ok = np.flatnonzero(valid_a)
+    assert np.allclose(sims[np.ix_(ok, ok)], sims[np.ix_(ok, ok)].T)
+    assert np.allclose(np.diag(sims)[ok], 1.0) and sims[0, 1] == 1.0   # same molecule
+
+    sims, valid_a, valid_b = similarity_matrix(smiles, other, n_jobs=1)
+    assert sims.shape == (5, 3) and valid_b.tolist() == [True, True, False]
+    for i, j in itertools.product(ok, range(2)):
+        expected = DataStructs.TanimotoSimilarity(_rdkit_fp(smiles[i]), _rdkit_fp(other[j]))
+        assert sims[i, j] == pytest.approx(expected)
+    assert np.isnan(sims[:, 2]).all()
+
+
+SMARTS = ["c1ccccc1", "[OX2H]", "C(=O)[OH]", "[#7]", "c[Cl,F]", "C#N", "S(=O)(=O)N",
+          "[nH]", "c1ccc2ccccc2c1", "[CX4][NX3]([CH3])[CH3]", "[Br]"]
+
+
+@pytest.mark.parametrize("n_jobs, chunk_size", [(1, 256), (2, 4)])
+def test_substructure_screen_has_no_false_negatives(n_jobs, chunk_size):
+    index = SubstructureIndex.from_records(_library(), n_jobs=1)
+    mols = [Chem.MolFromSmiles(smi) for smi in index.smiles]
+
+    for smarts in SMARTS:
+        pattern = Chem.MolFromSmarts(smarts)
+        expected = {i for i, mol in enumerate(mols) if mol.HasSubstructMatch(pattern)}
+
+        screened = set(index.screen(smarts).tolist())
+        assert expected <= screened, smarts
+        hits = list(index.search(smarts, n_jobs=n_jobs, chunk_size=chunk_size))
+        assert sorted(hits) == sorted((index.names[i], index.smiles[i]) for i in expected)
+
+    # The screen actually prunes: no library molecule has bromine
+    assert len(index.screen("[Br]")) < len(index) // 2
+    assert list(index.search("[C(")) == [] and len(index.screen("")) == 0
@@ -0,0 +1,30 @@
+from backend.context_packer import estimate_tokens, pack_context, truncate_to_tokens
+
+
+def test_truncate_to_tokens_cuts_at_a_word():
+    text = "STAT3 phosphorylation drives IL-6 transcription in tumour cells " * 10
+    cut = truncate_to_tokens(text, 20)
+    assert estimate_tokens(cut) <= 20 and cut.endswith("…")
+    assert text.startswith(cut[:-1]) and text[len(cut) - 1] == " "
+    assert truncate_to_tokens("short", 20) == "short"
+
+
+def test_over_long_sentence_is_truncated_not_dropped():
+    long_sentence = "STAT3 " + "signalling " * 200 + "ends here."
+    docs = [{"id": "d1", "text": long_sentence}]
+
+    text, report = pack_context("STAT3 signalling", docs, token_budget=100)
+    assert text.startswith("ID:d1\nSTAT3 signalling") and text.endswith("…")
+    assert report["truncated_sentences"] == 1
+    assert report["packed_tokens"] <= 100 and report["docs_included"] == 1
+
+
+def test_whole_sentences_still_preferred_when_they_fit():
+    docs = [{"id": "d1", "text": "STAT3 binds DNA. STAT3 is phosphorylated by JAK2."}]
+    text, report = pack_context("STAT3", docs, token_budget=100)
+    assert text == "ID:d1\nSTAT3 binds DNA. STAT3 is phosphorylated by JAK2."
+    assert report["truncated_sentences"] == 0
+
+    # Too little room left for a useful fragment: dropped as before
+    text, report = pack_context("STAT3", docs, token_budget=8)
+    assert report["truncated_sentences"] == 0 and report["sentences_kept"] <= 1
@@ -0,0 +1,75 @@
+import math
+
+import pytest
+
+from backend.cooccurrence import CooccurrenceIndex
+from backend.entity_extractor import EntityExtractor
+
+DOCS = {
+    "d1": "STAT3 drives IL-6. JAK2 phosphorylates STAT3.",
+    "d2": "STAT3 and IL6 co-operate. IL-6 signals via STAT3 in tumours.",
+    "d3": "TNF induces IL6.",
+    "d4": "EGFR alone.",
+}
+
+
+@pytest.fixture
+def extractor():
+    ex = EntityExtractor()
+    for symbol, aliases in [("STAT3", []), ("IL6", ["IL-6"]), ("JAK2", []), ("TNF", []), ("EGFR", [])]:
+        ex.add(f"HGNC:{symbol}", symbol, aliases=aliases)
+    return ex.build()
+
+
+def _index(extractor, docs):
+    index = CooccurrenceIndex()
+    index.add_docs(({"id": d, "text": t} for d, t in docs.items()), extractor)
+    return index
+
+
+def _counts(index):
+    return index.n_docs, index.entity_docs, index.pair_docs, index.pair_sents
+
+
+def test_counts_and_pmi(extractor):
+    index = _index(extractor, DOCS)
+
+    assert len(index) == 4
+    assert index.entity_docs == {"STAT3": 2, "IL6": 3, "JAK2": 1, "TNF": 1, "EGFR": 1}
+    assert index.pair_docs == {("IL6", "STAT3"): 2, ("JAK2", "STAT3"): 1,
+                               ("IL6", "JAK2"): 1, ("IL6", "TNF"): 1}
+    # IL6 and JAK2 share a doc but never a sentence
+    assert index.pair_sents == {("IL6", "STAT3"): 3, ("JAK2", "STAT3"): 1,
+                                ("IL6", "JAK2"): 0, ("IL6", "TNF"): 1}
+
+    assert index.pmi("STAT3", "IL6") == pytest.approx(math.log(4 * 2 / (2 * 3)))
+    assert index.pmi("IL6", "STAT3") == index.pmi("STAT3", "IL6")
+    assert index.pmi("STAT3", "EGFR") == 0.0
+
+    G = index.subgraph(["d1", "missing"])
+    assert set(G.nodes) == {"STAT3", "IL6", "JAK2"}
+    assert G.edges["STAT3", "IL6"]["count"] == 1 and G.edges["STAT3", "IL6"]["docs"] == 1
+    assert G.edges["STAT3", "IL6"]["weight"] == round(index.pmi("STAT3", "IL6"), 4)
+
+
+def test_remove_and_replace_match_a_fresh_build(extractor):
+    index = _index(extractor, DOCS)
+    index.remove_docs(["d2", "never added"])
+    index.add_docs([{"id": "d3", "text": "TNF and STAT3."}], extractor)
+
+    remaining = {"d1": DOCS["d1"], "d3": "TNF and STAT3.", "d4": DOCS["d4"]}
+    assert _counts(index) == _counts(_index(extractor, remaining))
+    assert ("IL6", "TNF") not in index.pair_docs
+    assert index.pmi("STAT3", "TNF") == pytest.approx(math.log(3 * 1 / (2 * 1)))
+
+    # Nothing lingers at zero once every doc is gone
+    index.remove_docs(list(remaining))
+    assert _counts(index) == (0, {}, {}, {})
+    assert index.doc_entities == {} and index.doc_pairs == {}
+
+
+def test_save_load_round_trip(extractor, tmp_path):
+    index = _index(extractor, DOCS)
+    index.save(tmp_path / "cooc.pkl")
+    assert _counts(CooccurrenceIndex.load(tmp_path / "cooc.pkl")) == _counts(index)
+    assert len(CooccurrenceIndex.load(tmp_path / "missing.pkl")) == 0
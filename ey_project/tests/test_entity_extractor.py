@@ -0,0 +1,67 @@
+import pytest
+
+from backend.entity_extractor import EntityExtractor, get_entity_extractor, load_lexicon_jsonl
+
+
+@pytest.fixture
+def extractor():
+    ex = EntityExtractor()
+    ex.add("HGNC:9966", "REST", aliases=["NRSF"], names=["RE1 silencing transcription factor"])
+    ex.add("HGNC:2082", "CLOCK", names=["clock circadian regulator"])
+    ex.add("HGNC:6019", "IMPACT")
+    ex.add("HGNC:7029", "MET", aliases=["c-Met"])
+    ex.add("HGNC:6407", "KRAS", aliases=["K-RAS", "K-Ras"])
+    ex.add("HGNC:6018", "IL6", aliases=["IL-6"], names=["interleukin 6"])
+    ex.add("CHEMBL25", "aspirin", "drug", case_sensitive=False)
+    return ex.build()
+
+
+def _symbols(extractor, text):
+    return [m["symbol"] for m in extractor.extract(text)]
+
+
+def test_symbols_that_are_words_do_not_match_prose(extractor):
+    text = "Rest and a regular clock had an impact; we met at the clinic."
+    assert _symbols(extractor, text) == []
+    assert _symbols(extractor, "Rest of the cohort. Met criteria.") == []
+
+
+def test_symbols_and_aliases_match_as_written_or_upper(extractor):
+    assert _symbols(extractor, "REST binds NRSF sites; CLOCK and IMPACT too.") == \
+        ["REST", "REST", "CLOCK", "IMPACT"]
+    assert _symbols(extractor, "c-Met, C-MET and c-met") == ["MET", "MET"]
+    assert _symbols(extractor, "K-Ras vs K-RAS vs k-ras") == ["KRAS", "KRAS"]
+    assert _symbols(extractor, "Il6 and IL 6") == ["IL6"]
+
+
+def test_full_names_match_in_any_casing(extractor):
+    assert _symbols(extractor, "Interleukin-6 and INTERLEUKIN 6 and interleukin 6") == ["IL6"] * 3
+    assert _symbols(extractor, "Clock circadian regulator levels") == ["CLOCK"]
+    assert _symbols(extractor, "Aspirin, ASPIRIN") == ["aspirin", "aspirin"]
+
+
+def test_word_boundaries_and_longest_match(extractor):
+    assert _symbols(extractor, "IL6R and pIL6 are not IL6") == ["IL6"]
+    mentions = extractor.extract("RE1 silencing transcription factor")
+    assert [(m["start"], m["end"], m["symbol"]) for m in mentions] == [(0, 34, "REST")]
+
+
+def test_extract_symbols_vs_ids(extractor):
+    text = "IL-6 drives K-Ras"
+    assert extractor.extract_symbols(text) == {"IL6", "KRAS"}
+    assert extractor.extract_ids(text) == {"HGNC:6018", "HGNC:6407"}
+    assert extractor.extract_ids(text, types=("drug",)) == set()
+
+
+def test_symbol_beats_other_entitys_alias():
+    ex = EntityExtractor()
+    ex.add("FAMILY:AKT", "AKT", "gene_family", aliases=["PKB"])
+    ex.add("HGNC:391", "AKT1", aliases=["AKT"])
+    assert ex.extract_symbols("AKT signalling") == {"AKT"}
+
+
+def test_seed_lexicon_names_and_prose(tmp_path):
+    ex = load_lexicon_jsonl(EntityExtractor()).build()
+    assert ex.extract_symbols("Tumor necrosis factor and Janus kinase 2 activate STAT3.") == \
+        {"TNF", "JAK2", "STAT3"}
+    assert get_entity_extractor().extract_symbols("We rest, then met again at noon.") == set()
@@ -0,0 +1,157 @@
+import json
+
+import pytest
+
+import index_docs
+from backend.cooccurrence import CooccurrenceIndex
+from backend.lexical_index import BM25Index
+
+
+class _Crash(Exception):
+    pass
+
+
+class _FakeEmbedder:
+    """Vector store stand-in around a real, file-backed BM25 index."""
+
+    def __init__(self, path, crash_after_upserts=None, crash_at_lexical=None):
+        self.path = path
+        self.lexical = BM25Index.load(path)
+        self.vectors = set()
+        self.saves = 0
+        self.crash_after_upserts = crash_after_upserts
+        self.crash_at_lexical = crash_at_lexical
+
+    def add_lexical(self, docs):
+        if self.crash_at_lexical is not None and len(self.lexical) >= self.crash_at_lexical:
+            raise _Crash()
+        self.lexical.add_docs(docs)
+
+    def save_lexical_index(self):
+        self.lexical.save(self.path)
+        self.saves += 1
+
+    def upsert_docs(self, docs):
+        if self.crash_after_upserts is not None:
+            if self.crash_after_upserts == 0:
+                raise _Crash()
+            self.crash_after_upserts -= 1
+        self.vectors.update(str(d["id"]) for d in docs)
+        self.add_lexical(docs)
+
+    def delete_docs(self, ids):
+        self.vectors.difference_update(ids)
+        self.lexical.remove_docs(ids)
+
+    def optimize_index(self):
+        return False
+
+
+def _write_docs(path, ids):
+    path.write_text("".join(
+        json.dumps({"id": i, "text": f"STAT3 drives IL-6 in doc {i}"}) + "\n" for i in ids
+    ))
+
+
+def _run(tmp_path, embedder, docs, **kwargs):
+    kwargs.setdefault("batch_size", 10)
+    kwargs.setdefault("checkpoint_docs", 30)
+    manifest = index_docs.IndexManifest(tmp_path / "manifest.sqlite")
+    try:
+        return index_docs.run_incremental_index(
+            embedder, docs, manifest=manifest,
+            cooc=CooccurrenceIndex.load(tmp_path / "cooc.pkl"), cooc_path=tmp_path / "cooc.pkl",
+            **kwargs,
+        )
+    finally:
+        # Like a dead process: anything not committed is rolled back
+        manifest.conn.close()
+
+
+def test_bm25_saved_at_checkpoints_not_per_batch(tmp_path):
+    docs = tmp_path / "docs.jsonl"
+    _write_docs(docs, range(100))
+    embedder = _FakeEmbedder(tmp_path / "bm25.pkl")
+
+    stats = _run(tmp_path, embedder, docs)
+    assert stats["upserted"] == 100
+    # 3 interval checkpoints + end of scan + end of deletes, not one per batch
+    assert embedder.saves == 5
+    assert len(BM25Index.load(tmp_path / "bm25.pkl")) == 100
+    assert len(CooccurrenceIndex.load(tmp_path / "cooc.pkl")) == 100
+
+
+def test_interrupted_run_resumes_from_last_checkpoint(tmp_path):
+    docs = tmp_path / "docs.jsonl"
+    _write_docs(docs, range(100))
+
+    with pytest.raises(_Crash):
+        _run(tmp_path, _FakeEmbedder(tmp_path / "bm25.pkl", crash_after_upserts=5), docs)
+    assert len(BM25Index.load(tmp_path / "bm25.pkl")) == 30
+    assert len(CooccurrenceIndex.load(tmp_path / "cooc.pkl")) == 30
+
+    # Docs after the checkpoint were never recorded, so they are re-indexed
+    embedder = _FakeEmbedder(tmp_path / "bm25.pkl")
+    stats = _run(tmp_path, embedder, docs)
+    assert stats["seen"] == 70 and stats["upserted"] == 70
+    assert len(BM25Index.load(tmp_path / "bm25.pkl")) == 100
+    assert len(CooccurrenceIndex.load(tmp_path / "cooc.pkl")) == 100
+
+
+def test_interrupted_backfill_keeps_backfilling_on_resume(tmp_path):
+    docs = tmp_path / "docs.jsonl"
+    _write_docs(docs, range(100))
+    _run(tmp_path, _FakeEmbedder(tmp_path / "bm25.pkl"), docs)
+
+    # BM25 index lost while the vectors and manifest survive: backfill it
+    (tmp_path / "bm25.pkl").unlink()
+    with pytest.raises(_Crash):
+        _run(tmp_path, _FakeEmbedder(tmp_path / "bm25.pkl", crash_at_lexical=40), docs)
+    assert 0 < len(BM25Index.load(tmp_path / "bm25.pkl")) < 100
+
+    stats = _run(tmp_path, _FakeEmbedder(tmp_path / "bm25.pkl"), docs)
+    assert stats["upserted"] == 0
+    assert len(BM25Index.load(tmp_path / "bm25.pkl")) == 100
+
+
+def test_interrupted_cooc_backfill_keeps_backfilling_on_resume(tmp_path, monkeypatch):
+    docs = tmp_path / "docs.jsonl"
+    _write_docs(docs, range(100))
+    _run(tmp_path, _FakeEmbedder(tmp_path / "bm25.pkl"), docs)
+
+    (tmp_path / "cooc.pkl").unlink()
+    add_docs = CooccurrenceIndex.add_docs
+
+    def crashing_add_docs(self, batch, extractor=None):
+        if len(self) >= 40:
+            raise _Crash()
+        add_docs(self, batch, extractor)
+
+    with monkeypatch.context() as m:
+        m.setattr(CooccurrenceIndex, "add_docs", crashing_add_docs)
+        with pytest.raises(_Crash):
+            _run(tmp_path, _FakeEmbedder(tmp_path / "bm25.pkl"), docs)
+    assert 0 < len(CooccurrenceIndex.load(tmp_path / "cooc.pkl")) < 100
+
+    stats = _run(tmp_path, _FakeEmbedder(tmp_path / "bm25.pkl"), docs)
+    assert stats["upserted"] == 0
+    assert len(CooccurrenceIndex.load(tmp_path / "cooc.pkl")) == 100
+
+
+def test_each_store_keeps_its_own_manifest(tmp_path):
+    docs = tmp_path / "docs.jsonl"
+    _write_docs(docs, range(20))
+
+    def run(store_dir):
+        embedder = _FakeEmbedder(tmp_path / "bm25.pkl")
+        embedder.manifest_path = tmp_path / store_dir / "index_manifest.sqlite"
+        stats = index_docs.run_incremental_index(
+            embedder, docs, cooc=CooccurrenceIndex(), cooc_path=tmp_path / "cooc.pkl",
+        )
+        return embedder, stats
+
+    assert run("chroma")[1]["upserted"] == 20
+    # Switching backends: the new store is filled, not skipped as "unchanged"
+    numpy_store, stats = run("numpy_ej_docs")
+    assert stats["upserted"] == 20 and len(numpy_store.vectors) == 20
+    assert run("chroma")[1]["unchanged"] == 20
@@ -0,0 +1,31 @@
+import pytest
+
+from backend.json_utils import JSONArrayStreamParser, repair_json
+
+
+def test_curly_quotes_inside_strings_are_kept():
+    raw = '```json\n{"reason": "the patient’s “baseline” values", "score": 0.5,}\n```'
+    assert repair_json(raw) == {"reason": "the patient’s “baseline” values", "score": 0.5}
+    assert repair_json('{"a": "‘x’"}') == {"a": "‘x’"}
+
+
+def test_curly_quotes_as_delimiters_are_straightened():
+    assert repair_json('{“score”: 0.8, “reason”: “fits the patient’s data”}') == \
+        {"score": 0.8, "reason": "fits the patient’s data"}
+    assert repair_json('Sure! {“a”: "b", "c": “d"}') == {"a": "b", "c": "d"}
+
+
+def test_prose_trailing_commas_and_truncation():
+    assert repair_json('Here you go: [1, 2, 3,] thanks') == [1, 2, 3]
+    assert repair_json('{"hypotheses": [{"text": "IL6 drives STAT3", "evid') == \
+        {"hypotheses": [{"text": "IL6 drives STAT3"}]}
+    with pytest.raises(ValueError):
+        repair_json("no json here")
+
+
+def test_stream_parser_yields_objects_as_they_complete():
+    parser = JSONArrayStreamParser("hypotheses")
+    chunks = ['{"hypotheses": [{"text": "a ', '} b"}, {"te', 'xt": "c"}', "]}"]
+    seen = [parser.feed(c) for c in chunks]
+    assert seen == [[], [{"text": "a } b"}], [{"text": "c"}], []]
+    assert parser.done
@@ -0,0 +1,168 @@
+import multiprocessing
+import re
+
+from backend import knowledge_graph
+from backend.knowledge_graph import KnowledgeGraph, add_hypothesis_to_kg
+
+
+def _paths(tmp_path):
+    return tmp_path / "kg.json", tmp_path / "kg.log.jsonl"
+
+
+def _hypotheses(kg):
+    """label → ids of the docs supporting it"""
+    return {
+        n["label"]: sorted(e["source"] for e in kg.edges if e["target"] == n["id"])
+        for n in kg["nodes"] if n["type"] == "hypothesis"
+    }
+
+
+def test_log_replay_matches_live_graph(tmp_path):
+    kg = KnowledgeGraph.load(*_paths(tmp_path))
+    add_hypothesis_to_kg(kg, "h1", [{"doc_id": "d1"}, {"doc_id": "d2"}])
+    kg.save()
+    add_hypothesis_to_kg(kg, "h2", [{"doc_id": "d2"}, {}])
+    kg.save()
+
+    reloaded = KnowledgeGraph.load(*_paths(tmp_path))
+    assert reloaded.to_dict() == kg.to_dict()
+    assert reloaded.content_hash == kg.content_hash
+    assert reloaded.version == kg.version == 9
+
+
+def test_compact_then_replay(tmp_path):
+    kg = KnowledgeGraph.load(*_paths(tmp_path))
+    add_hypothesis_to_kg(kg, "h1", [{"doc_id": "d1"}])
+    kg.compact()
+    add_hypothesis_to_kg(kg, "h2", [{"doc_id": "d1"}])
+    kg.save()
+
+    reloaded = KnowledgeGraph.load(*_paths(tmp_path))
+    assert _hypotheses(reloaded) == {"h1": ["d1"], "h2": ["d1"]}
+    assert reloaded.next_id("HYP") == "HYP_3"
+
+
+def _scan(kg, term, node_type=None):
+    """find_nodes by brute force over every label"""
+    pattern = re.compile(rf"(?<![A-Za-z0-9]){re.escape(term)}(?![A-Za-z0-9])", re.IGNORECASE)
+    return [n["id"] for n in kg["nodes"]
+            if (node_type is None or n["type"] == node_type) and pattern.search(n["label"])]
+
+
+def test_find_nodes_matches_a_label_scan(tmp_path):
+    kg = KnowledgeGraph.load(*_paths(tmp_path))
+    for label in ["STAT3 drives IL-6", "pSTAT3 in T cells", "IL-6/STAT3 loop",
+                  "stat3 knockdown", "IL-60 is unrelated", "TNF-α and IL6"]:
+        add_hypothesis_to_kg(kg, label, [{"doc_id": "STAT3 review"}])
+
+    for term in ["STAT3", "stat3", "IL-6", "IL", "6", "IL-6/STAT3", "T cells",
+                 "TNF-α", "-", "", "BRCA1"]:
+        for node_type in (None, "hypothesis", "document", "gene"):
+            assert kg.find_nodes(term, node_type) == _scan(kg, term, node_type), term
+            assert kg.query_engine().find_nodes(term, node_type) == _scan(kg, term, node_type)
+
+
+def test_label_index_follows_rebase(tmp_path):
+    a = KnowledgeGraph.load(*_paths(tmp_path))
+    b = KnowledgeGraph.load(*_paths(tmp_path))
+    add_hypothesis_to_kg(a, "STAT3 from a", [])
+    add_hypothesis_to_kg(b, "STAT3 from b", [])
+    a.save()
+    b.save()
+
+    # b rolled back its HYP_1 and re-added it as HYP_2 on top of a's
+    assert b.find_nodes("stat3") == _scan(b, "stat3") == ["HYP_1", "HYP_2"]
+    assert b.nodes["HYP_2"]["label"] == "STAT3 from b"
+
+
+def test_query_engine_rebuilt_lazily(tmp_path, monkeypatch):
+    builds = []
+    engine_cls = knowledge_graph.KGQueryEngine
+    monkeypatch.setattr(knowledge_graph, "KGQueryEngine",
+                        lambda kg: builds.append(1) or engine_cls(kg))
+
+    kg = KnowledgeGraph.load(*_paths(tmp_path))
+    for i in range(20):
+        add_hypothesis_to_kg(kg, f"h{i}", [{"doc_id": f"d{i}"}])
+        kg.find_nodes(f"h{i}")
+    assert builds == []
+
+    assert kg.query_engine() is kg.query_engine()
+    assert len(builds) == 1
+    add_hypothesis_to_kg(kg, "h20", [{"doc_id": "d0"}])
+    assert kg.query_engine().k_hop("d0", 1) == {"d0": 0, "HYP_1": 1, "HYP_21": 1}
+    assert len(builds) == 2
+
+
+def test_concurrent_sessions_do_not_collide(tmp_path):
+    a = KnowledgeGraph.load(*_paths(tmp_path))
+    b = KnowledgeGraph.load(*_paths(tmp_path))
+    add_hypothesis_to_kg(a, "from a", [{"doc_id": "da"}])
+    add_hypothesis_to_kg(b, "from b", [{"doc_id": "db"}])
+    a.save()
+    b.save()
+
+    reloaded = KnowledgeGraph.load(*_paths(tmp_path))
+    assert _hypotheses(reloaded) == {"from a": ["da"], "from b": ["db"]}
+    assert len({n["id"] for n in reloaded["nodes"]}) == 4
+    # b merged a's entry and renumbered its own hypothesis
+    assert b.to_dict() == reloaded.to_dict()
+
+
+def test_snapshot_keeps_other_sessions_entries(tmp_path):
+    a = KnowledgeGraph.load(*_paths(tmp_path), snapshot_every=1)
+    b = KnowledgeGraph.load(*_paths(tmp_path))
+    add_hypothesis_to_kg(b, "from b", [{"doc_id": "db"}])
+    b.save()
+    add_hypothesis_to_kg(a, "from a", [{"doc_id": "da"}])
+    a.save()    # snapshots; must include b's entries
+    add_hypothesis_to_kg(b, "b again", [])
+    b.save()    # must pick up a's snapshot, not append past it blindly
+
+    reloaded = KnowledgeGraph.load(*_paths(tmp_path))
+    assert _hypotheses(reloaded) == {"from a": ["da"], "from b": ["db"], "b again": []}
+    assert len(reloaded) == 5
+
+
+def test_torn_log_tail_is_repaired_before_append(tmp_path):
+    json_path, log_path = _paths(tmp_path)
+    kg = KnowledgeGraph.load(json_path, log_path)
+    add_hypothesis_to_kg(kg, "h1", [{"doc_id": "d1"}])
+    kg.save()
+    with log_path.open("ab") as f:
+        f.write(b'{"seq":99,"op":"no')      # writer crashed mid-line
+
+    add_hypothesis_to_kg(kg, "h2", [{"doc_id": "d2"}])
+    kg.save()
+
+    reloaded = KnowledgeGraph.load(json_path, log_path)
+    assert _hypotheses(reloaded) == {"h1": ["d1"], "h2": ["d2"]}
+    assert reloaded.content_hash == kg.content_hash
+
+
+def _add_many(json_path, log_path, tag, n):
+    kg = KnowledgeGraph.load(json_path, log_path, snapshot_every=7)
+    for i in range(n):
+        add_hypothesis_to_kg(kg, f"{tag}-{i}", [{"doc_id": f"{tag}-doc"}, {}])
+        kg.save()
+
+
+def test_concurrent_processes(tmp_path):
+    json_path, log_path = _paths(tmp_path)
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_add_many, args=(json_path, log_path, tag, 15)) for tag in "abc"]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join(30)
+        assert p.exitcode == 0
+
+    reloaded = KnowledgeGraph.load(json_path, log_path)
+    hyps = _hypotheses(reloaded)
+    assert len(hyps) == 45
+    for label, docs in hyps.items():
+        tag = label.split("-")[0]
+        assert len(docs) == 2 and f"{tag}-doc" in docs
+    # every minted fallback doc id supports exactly one hypothesis
+    minted = [e["source"] for e in reloaded.edges if e["source"].startswith("doc_")]
+    assert len(minted) == len(set(minted)) == 45
@@ -0,0 +1,51 @@
+import math
+import random
+from collections import Counter
+
+import pytest
+
+from backend.lexical_index import BM25Index, tokenize
+
+VOCAB = ["stat3", "il-6", "jak2", "tnf", "egfr", "kras", "apoptosis", "tumour",
+         "inflammation", "kinase", "receptor", "signalling"]
+
+
+def _brute_force(docs, query, k1=1.5, b=0.75):
+    """BM25 over every live doc, straight from the definition."""
+    tokens = {d: tokenize(text) for d, text in docs.items()}
+    avgdl = sum(map(len, tokens.values())) / len(tokens)
+    scores = {}
+    for term in dict.fromkeys(tokenize(query)):
+        df = sum(term in t for t in tokens.values())
+        if not df:
+            continue
+        idf = math.log(1 + (len(tokens) - df + 0.5) / (df + 0.5))
+        for d, t in tokens.items():
+            tf = Counter(t)[term]
+            if tf:
+                norm = k1 * (1 - b + b * len(t) / avgdl)
+                scores[d] = scores.get(d, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+    return scores
+
+
+def test_search_matches_brute_force_after_updates():
+    rng = random.Random(0)
+    docs = {f"d{i}": " ".join(rng.choices(VOCAB, k=rng.randint(3, 30))) for i in range(300)}
+    index = BM25Index()
+    index.add_docs({"id": d, "text": t} for d, t in docs.items())
+
+    # Tombstoned and replaced rows must not score
+    removed = [f"d{i}" for i in range(0, 300, 3)]
+    index.remove_docs(removed)
+    for d in removed:
+        del docs[d]
+    docs["d1"] = "stat3 stat3 jak2"
+    index.add_docs([{"id": "d1", "text": docs["d1"]}])
+
+    for query in ["STAT3", "stat3 jak2 kinase", "IL-6 tumour", "kras receptor signalling", "brca1"]:
+        expected = _brute_force(docs, query)
+        hits = index.search(query, k=10)
+        # Best first, the true top 10 scores (ties may come in any order)
+        assert [s for _, s in hits] == pytest.approx(sorted(expected.values(), reverse=True)[:10])
+        for d, score in hits:
+            assert score == pytest.approx(expected[d])
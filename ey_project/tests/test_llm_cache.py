@@ -0,0 +1,77 @@
+import sqlite3
+import time
+
+from backend.llm_cache import LLMCache, make_key
+
+
+def test_make_key_covers_model_prompt_options_format():
+    base = make_key("llama3", "prompt")
+    assert make_key("llama3", "prompt") == base
+    assert len({base, make_key("mistral", "prompt"), make_key("llama3", "prompt 2"),
+                make_key("llama3", "prompt", {"temperature": 0}),
+                make_key("llama3", "prompt", format="json")}) == 5
+
+
+def test_ttl_expires_entries(tmp_path, monkeypatch):
+    cache = LLMCache(tmp_path / "c.sqlite", ttl=60)
+    cache.put("k", "m", "answer")
+    assert cache.get("k") == "answer"
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert cache.get("k") is None
+    assert cache.totals() == (0, 0)
+
+
+def test_lru_eviction_by_entries_and_bytes(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: clock[0])
+
+    cache = LLMCache(tmp_path / "c.sqlite", ttl=0, max_entries=10, max_bytes=10**6)
+    for i in range(10):
+        clock[0] += 1
+        cache.put(f"k{i}", "m", "x")
+    clock[0] += 1
+    assert cache.get("k0") == "x"           # recently used: survives
+    clock[0] += 1
+    cache.put("k10", "m", "x")
+    assert cache.get("k0") == "x" and cache.get("k1") is None
+    assert cache.totals()[0] <= 10
+
+    small = LLMCache(tmp_path / "s.sqlite", ttl=0, max_entries=100, max_bytes=50)
+    for i in range(10):
+        clock[0] += 1
+        small.put(f"k{i}", "m", "y" * 10)
+    entries, size = small.totals()
+    assert size <= 50 and small.get("k9") == "y" * 10 and small.get("k0") is None
+
+
+def test_totals_track_overwrites_and_clear(tmp_path):
+    path = tmp_path / "c.sqlite"
+    cache = LLMCache(path, ttl=0)
+    cache.put("a", "m", "12345")
+    cache.put("a", "m", "123")
+    cache.put("b", "m", "1")
+    assert cache.totals() == (2, 4)
+
+    exact = sqlite3.connect(path).execute("SELECT COUNT(*), SUM(size) FROM responses").fetchone()
+    assert cache.totals() == exact
+    cache.clear()
+    assert cache.totals() == (0, 0)
+
+
+def test_totals_seeded_from_existing_cache_file(tmp_path):
+    path = tmp_path / "old.sqlite"
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE responses (key TEXT PRIMARY KEY, model TEXT NOT NULL, response TEXT NOT NULL,
+                                size INTEGER NOT NULL, created_at REAL NOT NULL,
+                                accessed_at REAL NOT NULL);
+        INSERT INTO responses VALUES ('a', 'm', 'abc', 3, 1, 1), ('b', 'm', 'de', 2, 1, 1);
+    """)
+    conn.commit()
+    conn.close()
+
+    cache = LLMCache(path, ttl=0)
+    assert cache.totals() == (2, 5)
+    assert cache.get("a") == "abc"
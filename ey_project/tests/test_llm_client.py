@@ -0,0 +1,67 @@
+import json
+import threading
+import time
+
+import pytest
+
+from backend.llm_client import (
+    CircuitBreaker, LLMCircuitOpenError, LLMResponseError, OllamaClient,
+)
+from ollama_stub import OllamaStubHandler, StubConfig, StubServer, start_stub_server
+
+
+@pytest.fixture
+def stub():
+    server, url = start_stub_server(config=StubConfig(tokens_per_sec=0))
+    yield url
+    server.shutdown()
+
+
+def _open_breaker(reset_timeout=0.05):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=reset_timeout)
+    breaker.record_failure()
+    time.sleep(reset_timeout * 1.5)
+    assert breaker.state == "half_open"
+    return breaker
+
+
+def test_abandoned_trial_stream_releases_breaker(stub):
+    breaker = _open_breaker()
+    client = OllamaClient(host=stub, breaker=breaker)
+
+    tokens = client.stream("experiment please", "stub")
+    next(tokens)            # the half-open trial is now running
+    tokens.close()          # consumer walks away (Streamlit rerun)
+
+    assert client.generate("experiment please", "stub")
+    assert breaker.state == "closed"
+    client.close()
+
+
+class _ErrorLineHandler(OllamaStubHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self._write_chunk((json.dumps({"error": "model crashed"}) + "\n").encode("utf-8"))
+        self._write_chunk(b"")
+
+
+def test_in_band_stream_error_counts_as_failure():
+    server = StubServer(("127.0.0.1", 0), _ErrorLineHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    client = OllamaClient(host=url, breaker=breaker)
+    for _ in range(2):
+        with pytest.raises(LLMResponseError):
+            list(client.stream("x", "stub"))
+
+    assert breaker.state == "open"
+    with pytest.raises(LLMCircuitOpenError):
+        list(client.stream("x", "stub"))
+    client.close()
+    server.shutdown()
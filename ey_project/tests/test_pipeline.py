@@ -0,0 +1,84 @@
+import json
+
+import networkx as nx
+
+from backend import pipeline
+
+
+def _fake_agents(monkeypatch, fail_ids=(), fan_out=None):
+    def literature_agent(query):
+        return {"hypotheses": [{"text": f"{query} h0", "evidence": []},
+                               {"text": f"{query} h1", "evidence": []}]}, [{"id": "doc1"}]
+
+    def run_hypothesis_tasks(items, max_workers=4):
+        if fan_out is not None:
+            fan_out.append(max_workers)
+        failing = any(qid in items[0][0] for qid in fail_ids)
+        for i in range(len(items)):
+            yield i, "score", {"error": "LLM_UNAVAILABLE"} if failing and i == 1 else {"score": 0.5}
+            yield i, "experiment", "LLM_UNAVAILABLE (LLMTimeoutError): slow" if failing else "protocol"
+
+    monkeypatch.setattr(pipeline, "literature_agent", literature_agent)
+    monkeypatch.setattr(pipeline, "run_hypothesis_tasks", run_hypothesis_tasks)
+    monkeypatch.setattr(pipeline, "rerank_hypotheses", lambda hyps: hyps)
+    monkeypatch.setattr(pipeline, "build_dynamic_pathway_graph", lambda hyps, docs: nx.Graph())
+
+
+def _write_queries(path, ids):
+    path.write_text("".join(json.dumps({"id": q, "query": f"query {q}"}) + "\n" for q in ids))
+
+
+def _results(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_task_failures_are_partial_and_retried(tmp_path, monkeypatch):
+    queries, out = tmp_path / "q.jsonl", tmp_path / "out.jsonl"
+    _write_queries(queries, ["a", "b"])
+
+    _fake_agents(monkeypatch, fail_ids=["b"])
+    stats = pipeline.run_batch(queries, out, workers=2)
+    assert stats["ok"] == 1 and stats["partial"] == 1
+    partial = [r for r in _results(out) if r["id"] == "b"][0]
+    assert partial["status"] == "partial"
+    assert partial["failed_tasks"] == [{"index": 0, "task": "experiment"},
+                                       {"index": 1, "task": "experiment"},
+                                       {"index": 1, "task": "score"}]
+
+    _fake_agents(monkeypatch)
+    stats = pipeline.run_batch(queries, out, workers=2)
+    assert stats == {"total": 2, "skipped": 1, "ok": 1, "partial": 0, "error": 0, "unparsable": 0}
+    assert pipeline.completed_ids(out) == {"a", "b"}
+
+
+def test_torn_tail_repaired_without_resume(tmp_path, monkeypatch):
+    queries, out = tmp_path / "q.jsonl", tmp_path / "out.jsonl"
+    _write_queries(queries, ["a"])
+    out.write_text('{"id": "old", "status": "ok"}\n{"id": "torn", "sta')
+
+    _fake_agents(monkeypatch)
+    pipeline.run_batch(queries, out, resume=False)
+    assert [r["id"] for r in _results(out)] == ["old", "a"]
+
+
+def test_llm_budget_fits_client_slots():
+    assert pipeline.llm_budget(4, max_in_flight=8) == (4, 2)
+    assert pipeline.llm_budget(1, max_in_flight=8) == (1, pipeline.LLM_MAX_CONCURRENCY)
+    assert pipeline.llm_budget(20, max_in_flight=8) == (8, 1)
+    for workers in range(1, 20):
+        w, per_query = pipeline.llm_budget(workers, max_in_flight=8)
+        assert w * per_query <= 8
+
+
+def test_batch_splits_llm_slots_and_counts_bad_lines(tmp_path, monkeypatch):
+    queries, out = tmp_path / "q.jsonl", tmp_path / "out.jsonl"
+    _write_queries(queries, ["a", "b", "c"])
+    with queries.open("a") as f:
+        f.write("{not json\n")
+
+    fan_out = []
+    _fake_agents(monkeypatch, fan_out=fan_out)
+    monkeypatch.setattr(pipeline.get_llm_client(), "max_in_flight", 6)
+    stats = pipeline.run_batch(queries, out, workers=3)
+    assert stats["ok"] == 3 and stats["unparsable"] == 1
+    assert fan_out == [2, 2, 2]
@@ -0,0 +1,256 @@
+import numpy as np
+import pytest
+
+from backend.vector_store import NumpyVectorStore
+
+
+def _vectors(n, dim=32, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+
+
+def _clustered(n, dim=128, clusters=40, seed=0):
+    """Embedding-like data: points around a few dozen topic centers."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim))
+    points = centers[rng.integers(clusters, size=n)] + 0.4 * rng.standard_normal((n, dim))
+    return points.astype(np.float32)
+
+
+def _fill(store, vectors, prefix="d"):
+    ids = [f"{prefix}{i}" for i in range(len(vectors))]
+    store.upsert(ids, vectors, [f"text {i}" for i in ids], [{"n": i} for i in range(len(ids))])
+    return ids
+
+
+def _exact_top(vectors, query, k):
+    return list(np.argsort(((vectors - query) ** 2).sum(axis=1), kind="stable")[:k])
+
+
+@pytest.mark.parametrize("quantization", NumpyVectorStore.QUANTIZATIONS)
+def test_fresh_store_fill_and_query(tmp_path, quantization):
+    store = NumpyVectorStore(tmp_path, quantization=quantization)
+    vectors = _vectors(200)
+    ids = _fill(store, vectors)
+
+    out = store.query(vectors[17], k=3)
+    assert out["ids"][0][0] == ids[17]
+    assert out["documents"][0][0] == "text d17"
+    assert out["metadatas"][0][0] == {"n": 17}
+    assert out["distances"][0][0] == pytest.approx(0.0, abs=1e-4)
+
+
+@pytest.mark.parametrize("quantization", NumpyVectorStore.QUANTIZATIONS)
+def test_upsert_delete_reopen(tmp_path, quantization):
+    store = NumpyVectorStore(tmp_path, quantization=quantization)
+    vectors = _vectors(50)
+    ids = _fill(store, vectors)
+
+    moved = _vectors(1, seed=9)
+    store.upsert(["d3"], moved, ["moved"], [{"n": -1}])
+    store.delete(["d5", "missing"])
+
+    for s in (store, NumpyVectorStore(tmp_path, quantization=quantization)):
+        assert s.count() == 49
+        assert s.get(["d3", "d5"]) == {"ids": ["d3"], "documents": ["moved"],
+                                       "metadatas": [{"n": -1}]}
+        assert s.query(moved[0], k=1)["ids"][0] == ["d3"]
+        assert "d5" not in s.query(vectors[5], k=49)["ids"][0]
+
+    reopened = NumpyVectorStore(tmp_path, quantization=quantization)
+    reopened.compact()
+    assert reopened.count() == 49
+    assert reopened.query(vectors[7], k=1)["ids"][0] == [ids[7]]
+
+
+def test_torn_vector_write_is_truncated(tmp_path):
+    store = NumpyVectorStore(tmp_path)
+    _fill(store, _vectors(10))
+    with store.vectors_path.open("ab") as f:
+        f.write(b"\0" * 40)     # vectors written, log entry never was
+
+    reopened = NumpyVectorStore(tmp_path)
+    assert reopened.count() == 10
+    _fill(reopened, _vectors(5, seed=1), prefix="e")
+    assert NumpyVectorStore(tmp_path).query(_vectors(5, seed=1)[2], k=1)["ids"][0] == ["e2"]
+
+
+@pytest.mark.parametrize("quantization, min_recall", [("none", 1.0), ("int8", 0.95), ("binary", 0.8)])
+def test_recall_against_exact(tmp_path, quantization, min_recall):
+    store = NumpyVectorStore(tmp_path, quantization=quantization, rescore_factor=8)
+    vectors = _clustered(2000)
+    _fill(store, vectors)
+    queries = vectors[:20] + 0.2 * _vectors(20, dim=128, seed=3)
+
+    report = store.measure_recall(queries, k=10)
+    assert report["recall_at_k"] >= min_recall
+
+    top = store.query(queries[0], k=10)["ids"][0]
+    exact = [f"d{i}" for i in _exact_top(vectors, queries[0], 10)]
+    assert len(set(top) & set(exact)) >= int(min_recall * 10) - 1
+
+
+def test_queries_never_build_ivf(tmp_path):
+    store = NumpyVectorStore(tmp_path, ivf_threshold=500, nprobe=4)
+    vectors = _clustered(1000)
+    _fill(store, vectors)
+
+    assert store.query(vectors[3], k=1)["ids"][0] == ["d3"]   # exact fallback
+    assert not store.ivf_path.exists()
+
+    assert store.optimize() is True
+    assert store.optimize() is False            # not due again yet
+    assert not list(tmp_path.glob("ivf.*.tmp.npz"))
+
+    # Another process picks the index up without building it
+    reader = NumpyVectorStore(tmp_path, ivf_threshold=500, nprobe=4)
+    assert reader._ivf is not None
+    queries = vectors[:20] + 0.2 * _vectors(20, dim=128, seed=3)
+    assert reader.measure_recall(queries, k=10)["recall_at_k"] >= 0.9
+
+    # Rows added after the build are still found (scanned as the tail)
+    fresh = _clustered(1, seed=11)
+    reader.upsert(["new"], fresh, ["new"], [{}])
+    assert reader.query(fresh[0], k=1)["ids"][0] == ["new"]
+    assert reader._ivf["n_rows"] == 1000
+
+
+def test_reopen_uses_persisted_norms_and_payloads(tmp_path):
+    store = NumpyVectorStore(tmp_path, quantization="int8")
+    vectors = _vectors(300)
+    _fill(store, vectors)
+    norms = np.array(store.sq_norms)
+
+    reopened = NumpyVectorStore(tmp_path, quantization="int8")
+    assert isinstance(reopened.sq_norms, np.memmap)
+    assert isinstance(reopened.codes, np.memmap)
+    np.testing.assert_allclose(reopened.sq_norms, norms)
+    assert not hasattr(reopened, "documents")
+    assert reopened.get(["d42"])["documents"] == ["text d42"]
+
+
+def test_reads_legacy_inline_payload_log(tmp_path):
+    vectors = _vectors(3)
+    (tmp_path / "store.json").write_text('{"dim": 32}')
+    (tmp_path / "vectors.f32").write_bytes(vectors.tobytes())
+    with (tmp_path / "rows.jsonl").open("w", encoding="utf-8") as f:
+        for i in range(3):
+            f.write(f'{{"op": "put", "row": {i}, "id": "d{i}", "text": "old {i}", "meta": {{"n": {i}}}}}\n')
+        f.write('{"op": "del", "id": "d1"}\n{"op": "put", "row": 3, "id"')     # torn tail
+
+    store = NumpyVectorStore(tmp_path)
+    assert store.count() == 2
+    assert store.get(["d0", "d1", "d2"]) == {"ids": ["d0", "d2"], "documents": ["old 0", "old 2"],
+                                             "metadatas": [{"n": 0}, {"n": 2}]}
+    assert store.query(vectors[2], k=1)["ids"][0] == ["d2"]
+
+    _fill(store, _vectors(2, seed=5), prefix="e")
+    assert NumpyVectorStore(tmp_path).get(["e1", "d0"])["documents"] == ["text e1", "old 0"]
+
+
+def test_saved_row_table_plus_log_tail(tmp_path):
+    store = NumpyVectorStore(tmp_path)
+    vectors = _vectors(100)
+    _fill(store, vectors)
+    store.optimize()                            # saves the id table
+    assert store.table_path.exists()
+
+    store.upsert(["d1"], vectors[2:3], ["dup"], [{}])
+    store.delete(["d4"])
+    reopened = NumpyVectorStore(tmp_path)
+    assert reopened.count() == 99
+    assert reopened.get(["d1", "d4"])["documents"] == ["dup"]
+
+    # A table saved against an older log (before compaction) is ignored
+    reopened.compact()
+    reopened.upsert(["z"], vectors[:1], ["z"], [{}])
+    again = NumpyVectorStore(tmp_path)
+    assert again.count() == 100 and again.get(["z"])["documents"] == ["z"]
+
+
+def _sizes(directory):
+    return {p.name: p.stat().st_size for p in directory.iterdir() if p.is_file()}
+
+
+@pytest.mark.parametrize("quantization", NumpyVectorStore.QUANTIZATIONS)
+def test_reader_never_cuts_an_in_flight_write(tmp_path, quantization):
+    writer = NumpyVectorStore(tmp_path, quantization=quantization)
+    _fill(writer, _vectors(10))
+    # A write caught between its data files and the end of its log line
+    with writer.vectors_path.open("ab") as f:
+        f.write(_vectors(1, seed=4).tobytes())
+    with writer.log_path.open("ab") as f:
+        f.write(b'{"op": "put", "row": 10, "id": "half')
+    before = _sizes(tmp_path)
+
+    reader = NumpyVectorStore(tmp_path, quantization=quantization)
+    assert reader.count() == 10
+    assert reader.query(_vectors(10)[4], k=1)["ids"][0] == ["d4"]
+    assert _sizes(tmp_path) == before
+
+    # The next write is what repairs it
+    _fill(writer, _vectors(3, seed=6), prefix="e")
+    assert NumpyVectorStore(tmp_path, quantization=quantization).count() == 13
+
+
+def test_reader_picks_up_writes_and_compaction(tmp_path):
+    writer = NumpyVectorStore(tmp_path)
+    vectors = _vectors(50)
+    _fill(writer, vectors)
+    reader = NumpyVectorStore(tmp_path)
+
+    moved = _vectors(1, seed=8)
+    writer.upsert(["new"], moved, ["new doc"], [{}])
+    writer.delete([f"d{i}" for i in range(40)])
+    assert reader.query(moved[0], k=1)["ids"][0] == ["new"]
+    assert reader.count() == 11
+
+    writer.compact()
+    assert writer.dead_rows() == 0
+    assert reader.get(["d45", "new"])["documents"] == ["text d45", "new doc"]
+    assert reader.query(vectors[45], k=1)["ids"][0] == ["d45"]
+    assert not list(tmp_path.glob("compact.*"))
+
+
+def test_concurrent_writer_and_opening_readers(tmp_path):
+    import threading
+
+    vectors = _vectors(400)
+    errors = []
+
+    def write():
+        store = NumpyVectorStore(tmp_path, quantization="int8")
+        for start in range(0, 400, 20):
+            _fill(store, vectors[start:start + 20], prefix=f"b{start}_")
+
+    def read():
+        try:
+            for _ in range(30):
+                NumpyVectorStore(tmp_path, quantization="int8").query(vectors[0], k=3)
+        except Exception as e:      # noqa: BLE001 - surfaced by the assert below
+            errors.append(e)
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    store = NumpyVectorStore(tmp_path, quantization="int8")
+    assert store.count() == 400
+    assert store.query(vectors[123], k=1)["ids"][0] == ["b120_3"]
+
+
+def test_optimize_compacts_dead_rows(tmp_path):
+    store = NumpyVectorStore(tmp_path, compact_fraction=0.2)
+    vectors = _vectors(100)
+    _fill(store, vectors)
+    store.delete([f"d{i}" for i in range(10)])
+    assert store.optimize() is False and store.dead_rows() == 10
+
+    store.upsert(["d50"], vectors[:1], ["again"], [{}])
+    store.delete([f"d{i}" for i in range(10, 20)])
+    assert store.optimize() is True
+    assert store.dead_rows() == 0 and store.count() == 80
+    assert store.vectors_path.stat().st_size == 80 * 32 * 4
+    assert NumpyVectorStore(tmp_path).get(["d50"])["documents"] == ["again"]